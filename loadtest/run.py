@@ -0,0 +1,383 @@
+"""
+اختبار حمل كامل: تصفح القائمة، السلة، وإتمام الطلب
+
+يملأ قاعدة اختبار منفصلة (loadtest.seed)، يشغّل السيرفر محلياً بإعدادات
+loadtest.settings، ثم يرسل جلسات زبائن متزامنة: القائمة وتمريرها، قسم، بحث، إضافة
+وتعديل وحذف من السلة، ثم create_order لنسبة منهم. لكل نقطة (endpoint):
+عدد الطلبات والأخطاء، الطلبات في الثانية، p50/p95/p99، ومتوسط وأقصى عدد
+استعلامات SQL، ومتوسط زمن SQL وزمن السيرفر (من رأس Server-Timing).
+
+    python -m loadtest.run --seed --sessions 50 --duration 30 --output loadtest/results/base.json
+    python -m loadtest.run --sessions 50 --duration 30 --baseline loadtest/results/base.json
+
+مع --baseline يخرج بالرمز 1 إذا زاد p95 لأي نقطة أكثر من --max-regression
+أو زاد عدد استعلاماتها، فيصلح كخطوة في CI.
+
+مع --flood N يرسل N طلب cart_add في الثانية من عنوان واحد بجانب الزبائن
+(سكربت أو عميل يعيد المحاولة بلا توقف)، ونتيجته في flood منفصلة. المقارنة مع
+RATE_LIMIT_ENABLED=False تُظهر أثر حدود الطلبات على زمن القائمة:
+
+    python -m loadtest.run --sessions 20 --think-ms 300 --flood 50
+    RATE_LIMIT_ENABLED=False python -m loadtest.run --sessions 20 --think-ms 300 --flood 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from loadtest.seed import SEARCH_TERMS
+from loadtest.server_modes import BASE_DIR, SERVERS, Client, free_port, percentile, wait_for_port
+
+SETTINGS_MODULE = 'loadtest.settings'
+# Server-Timing يُرسل فقط مع هذا المفتاح
+METRICS_TOKEN = 'loadtest'
+
+# عنوان السكربت المغرق (توثيق، RFC 5737)؛ الزبائن في 10.0.0.0/8
+FLOOD_ADDRESS = '203.0.113.7'
+FLOOD_SESSIONS = 10
+# حد الاتصالات المفتوحة للإغراق حين لا يلحق السيرفر
+FLOOD_MAX_PENDING = 200
+
+SERVER_COMMANDS = {
+    **SERVERS,
+    'runserver': [sys.executable, 'manage.py', 'runserver', '127.0.0.1:{port}', '--noreload'],
+}
+
+_ITEM_RE = re.compile(rb'data-id="(\d+)"')
+_CATEGORY_RE = re.compile(rb'\?category=(\d+)')
+_CURSOR_RE = re.compile(rb'data-cursor="([^"]+)"')
+_TIMING_RE = re.compile(r'(\w+)(?:;desc="([^"]*)")?;dur=([\d.]+)')
+
+
+# ============ القياس ============
+
+class Stats:
+    """الأزمنة والأخطاء وعدد الاستعلامات لكل نقطة"""
+
+    KEYS = ('latencies', 'errors', 'queries', 'db_ms', 'server_ms')
+
+    def __init__(self):
+        self.endpoints = {}
+
+    def record(self, name, seconds, status, timing=None):
+        endpoint = self.endpoints.setdefault(
+            name, {'latencies': [], 'errors': 0, 'queries': [], 'db_ms': [], 'server_ms': []},
+        )
+        endpoint['latencies'].append(seconds)
+        if status is None or status >= 400:
+            endpoint['errors'] += 1
+        if timing:
+            for key in ('queries', 'db_ms', 'server_ms'):
+                endpoint[key].append(timing[key])
+
+    def summary(self, elapsed):
+        def mean(values):
+            return round(sum(values) / len(values), 2) if values else None
+
+        def summarize(latencies, errors, queries, db_ms, server_ms):
+            latencies = sorted(latencies)
+            return {
+                'requests': len(latencies),
+                'errors': errors,
+                'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0,
+                'p50_ms': percentile(latencies, 0.50),
+                'p95_ms': percentile(latencies, 0.95),
+                'p99_ms': percentile(latencies, 0.99),
+                'queries_mean': mean(queries),
+                'queries_max': max(queries) if queries else None,
+                'db_ms_mean': mean(db_ms),
+                'server_ms_mean': mean(server_ms),
+            }
+
+        endpoints = {
+            name: summarize(*(data[key] for key in self.KEYS))
+            for name, data in sorted(self.endpoints.items())
+        }
+        total = summarize(*(
+            sum(data[key] for data in self.endpoints.values()) if key == 'errors'
+            else [value for data in self.endpoints.values() for value in data[key]]
+            for key in self.KEYS
+        ))
+        return total, endpoints
+
+
+# ============ جلسة زبون ============
+
+def parse_server_timing(header):
+    """عدد الاستعلامات وزمن SQL وزمن السيرفر من رأس Server-Timing"""
+    if not header:
+        return None
+    timing = {'queries': 0, 'db_ms': 0.0, 'server_ms': None}
+    for name, desc, duration in _TIMING_RE.findall(header):
+        if name == 'total':
+            timing['server_ms'] = float(duration)
+        elif name == 'db':
+            timing['queries'] = int(desc.split()[0])
+            timing['db_ms'] = float(duration)
+    return timing if timing['server_ms'] is not None else None
+
+
+async def call(client, stats, name, method, path, body=None):
+    start = time.perf_counter()
+    try:
+        status, content = await client.request(method, path, body)
+    except OSError:
+        stats.record(name, time.perf_counter() - start, None)
+        return None
+    stats.record(name, time.perf_counter() - start, status,
+                 parse_server_timing(client.headers.get('server-timing')))
+    return content
+
+
+async def customer(port, stats, rng, args):
+    """زبون واحد بجلسة وعنوان جديدين من فتح القائمة حتى الطلب (أو المغادرة)"""
+    address = f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+    client = Client(port, 0, address=address, token=METRICS_TOKEN)
+    think = args.think_ms / 1000
+
+    async def pause():
+        if think:
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+
+    content = await call(client, stats, 'menu', 'GET', '/')
+    if not content:
+        return
+    item_ids = [int(i) for i in dict.fromkeys(_ITEM_RE.findall(content))]
+    category_ids = [int(i) for i in dict.fromkeys(_CATEGORY_RE.findall(content))]
+    if not item_ids:
+        return
+    # مثل app.js: الصفحة مشتركة، فالسلة وكوكي CSRF من طلب منفصل
+    await call(client, stats, 'cart_hydrate', 'GET', '/api/cart/content/?format=json')
+
+    # التمرير: صفحة أو صفحتان من /api/menu/
+    match = _CURSOR_RE.search(content)
+    cursor = match.group(1).decode() if match else None
+    for _ in range(rng.randint(0, 2)):
+        if not cursor:
+            break
+        await pause()
+        page = await call(client, stats, 'menu_items', 'GET', f'/api/menu/?cursor={cursor}')
+        cursor = json.loads(page).get('next_cursor') if page else None
+
+    await pause()
+    if category_ids:
+        await call(client, stats, 'menu?category', 'GET', f'/?category={rng.choice(category_ids)}')
+    if rng.random() < args.search_rate:
+        term = rng.choice(SEARCH_TERMS)
+        await call(client, stats, 'menu_search', 'GET', f'/api/menu/search/?q={quote(term)}')
+        await call(client, stats, 'menu?search', 'GET', f'/?search={quote(term)}')
+
+    chosen = rng.sample(item_ids, min(len(item_ids), rng.randint(1, 4)))
+    for item_id in chosen:
+        await pause()
+        await call(client, stats, 'cart_add', 'POST', '/api/cart/add/', {'item_id': item_id, 'quantity': 1})
+    await call(client, stats, 'cart_content', 'GET', '/api/cart/content/?format=json')
+    await call(client, stats, 'cart_update', 'POST', '/api/cart/update/',
+               {'item_id': chosen[0], 'quantity': rng.randint(2, 3)})
+    if len(chosen) > 1 and rng.random() < 0.3:
+        await call(client, stats, 'cart_remove', 'POST', '/api/cart/remove/', {'item_id': chosen[-1]})
+
+    if rng.random() < args.checkout_rate:
+        await pause()
+        delivery = rng.choice(['pickup', 'delivery'])
+        await call(client, stats, 'create_order', 'POST', '/api/order/create/', {
+            'name': 'زبون تجريبي',
+            'phone': f'06{rng.randrange(10 ** 8):08d}',
+            'delivery_type': delivery,
+            'address': 'جليز، مراكش' if delivery == 'delivery' else '',
+            'idempotency_key': uuid.uuid4().hex,
+        })
+
+
+async def flooder(port, stats, rate, deadline):
+    """
+    cart_add بمعدل ثابت (rate في الثانية) من عنوان واحد وعدة جلسات، بدون
+    انتظار الردود ولا احترام Retry-After، فالحمل المعروض نفسه مع الحدود وبدونها.
+    """
+    first = Client(port, 0, address=FLOOD_ADDRESS)
+    match = _ITEM_RE.search(await call(first, stats, 'menu', 'GET', '/') or b'')
+    if not match:
+        return
+    body = {'item_id': int(match.group(1)), 'quantity': 1}
+    sessions = []
+    for _ in range(FLOOD_SESSIONS):
+        client = Client(port, 0, address=FLOOD_ADDRESS)
+        await call(client, stats, 'cart_hydrate', 'GET', '/api/cart/content/?format=json')
+        sessions.append(client.cookies)
+
+    async def send(cookies):
+        # عميل لكل طلب: الطلبات متزامنة ورؤوس الرد (Server-Timing) لكل منها
+        client = Client(port, 0, address=FLOOD_ADDRESS)
+        client.cookies = dict(cookies)
+        await call(client, stats, 'cart_add', 'POST', '/api/cart/add/', body)
+
+    pending, sent = set(), 0
+    next_at = time.monotonic()
+    while next_at < deadline:
+        if len(pending) >= FLOOD_MAX_PENDING:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        task = asyncio.create_task(send(sessions[sent % len(sessions)]))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        sent += 1
+        next_at += 1 / rate
+        await asyncio.sleep(max(0, next_at - time.monotonic()))
+    if pending:
+        await asyncio.wait(pending)
+
+
+async def run_sessions(port, args):
+    stats, flood_stats = Stats(), Stats()
+    deadline = time.monotonic() + args.duration
+    rng = random.Random(args.random_seed)
+
+    async def worker(number):
+        worker_rng = random.Random(rng.random() + number)
+        while time.monotonic() < deadline:
+            await customer(port, stats, worker_rng, args)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(worker(number) for number in range(args.sessions)),
+        *([flooder(port, flood_stats, args.flood, deadline)] if args.flood else []),
+    )
+    elapsed = time.perf_counter() - started
+    flood = flood_stats.summary(elapsed)[1] if args.flood else None
+    return (*stats.summary(elapsed), flood)
+
+
+# ============ السيرفر والنتائج ============
+
+def django_env():
+    return {**os.environ, 'DJANGO_SETTINGS_MODULE': SETTINGS_MODULE, 'DEBUG': 'False',
+            'METRICS_TOKEN': METRICS_TOKEN}
+
+
+def start_server(args, port):
+    command = [
+        part.format(port=port, workers=args.workers, threads=args.threads)
+        for part in SERVER_COMMANDS[args.server]
+    ]
+    env = django_env()
+    if args.server != 'asgi':
+        env['ASYNC_VIEWS'] = '0'
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    try:
+        wait_for_port(port, process)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process, ' '.join(command[1:])
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(result, baseline, max_regression):
+    """النقاط التي ساء فيها p95 أو عدد الاستعلامات مقارنة بتشغيل سابق"""
+    problems = []
+    for name, current in result['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+        if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + max_regression):
+            problems.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous['queries_max'] is not None and (current['queries_max'] or 0) > previous['queries_max']:
+            problems.append(f"{name}: queries {previous['queries_max']} -> {current['queries_max']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20, help='عدد الزبائن المتزامنين')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--server', choices=sorted(SERVER_COMMANDS), default='wsgi')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='خيوط كل عامل gunicorn')
+    parser.add_argument('--port', type=int, default=None,
+                        help='استعمال سيرفر يعمل مسبقاً بإعدادات loadtest.settings على هذا المنفذ')
+    parser.add_argument('--seed', action='store_true', help='إعادة ملء قاعدة الاختبار قبل التشغيل')
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--items', type=int, default=25, help='منتجات كل قسم (مع --seed)')
+    parser.add_argument('--checkout-rate', type=float, default=0.3, help='نسبة الزبائن الذين يطلبون')
+    parser.add_argument('--search-rate', type=float, default=0.5, help='نسبة الزبائن الذين يبحثون')
+    parser.add_argument('--think-ms', type=int, default=0, help='متوسط التوقف بين الخطوات')
+    parser.add_argument('--flood', type=float, default=0,
+                        help='طلبات cart_add في الثانية من عنوان واحد بجانب الزبائن')
+    parser.add_argument('--random-seed', type=int, default=1)
+    parser.add_argument('--output', help='حفظ النتيجة JSON في هذا الملف')
+    parser.add_argument('--baseline', help='نتيجة سابقة للمقارنة')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='الزيادة المسموحة في p95 مقارنة بـ --baseline (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.seed:
+        subprocess.run(
+            [sys.executable, '-m', 'loadtest.seed',
+             '--categories', str(args.categories), '--items', str(args.items)],
+            cwd=BASE_DIR, env=django_env(), check=True,
+        )
+
+    process, command = None, None
+    port = args.port
+    if port is None:
+        port = free_port()
+        process, command = start_server(args, port)
+    try:
+        total, endpoints, flood = asyncio.run(run_sessions(port, args))
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+
+    result = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'server': command or f'127.0.0.1:{port}',
+            'sessions': args.sessions,
+            'duration': args.duration,
+            'checkout_rate': args.checkout_rate,
+            'search_rate': args.search_rate,
+            'think_ms': args.think_ms,
+            'flood': args.flood,
+            'rate_limit': os.environ.get('RATE_LIMIT_ENABLED', 'True') == 'True',
+        },
+        'total': total,
+        'endpoints': endpoints,
+    }
+    if flood:
+        result['flood'] = flood
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            fh.write(output + '\n')
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fh:
+            problems = regressions(result, json.load(fh), args.max_regression)
+        for problem in problems:
+            print(f'REGRESSION {problem}', file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
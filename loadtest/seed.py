@@ -0,0 +1,135 @@
+"""
+كتالوج واقعي لاختبار الحمل
+
+يمسح قاعدة بيانات اختبار الحمل (loadtest/data) ويملؤها بأقسام ومنتجات
+بأسماء وأوصاف عربية، بعضها غير متوفر وبعضها مميز، مع صورة لكل قسم
+ونسخها المتجاوبة، حتى تكون الصفحات بحجمها الحقيقي.
+
+    python -m loadtest.seed --categories 10 --items 25
+"""
+import argparse
+import io
+import os
+import random
+from decimal import Decimal
+
+CATEGORIES = [
+    ('الفطور', 'bx-coffee'), ('الطواجين', 'bx-bowl-hot'), ('الكسكس', 'bx-bowl-rice'),
+    ('المشويات', 'bx-restaurant'), ('السلطات', 'bx-leaf'), ('الشوربات', 'bx-bowl-hot'),
+    ('البسطيلة', 'bx-cake'), ('الحلويات', 'bx-cookie'), ('العصائر', 'bx-drink'),
+    ('المشروبات الساخنة', 'bx-coffee-togo'), ('السندويشات', 'bx-food-menu'), ('البيتزا', 'bx-pizza'),
+]
+
+DISHES = [
+    'طاجين لحم بالبرقوق', 'طاجين دجاج بالزيتون', 'طاجين كفتة بالبيض', 'كسكس بالخضر',
+    'كسكس تفاية', 'حريرة', 'بيصارة', 'بسطيلة دجاج', 'بسطيلة حوت', 'مشوي خروف',
+    'بروشيت', 'سلطة مغربية', 'زعلوك', 'تكتوكة', 'رفيسة', 'مسمن بالعسل', 'بغرير',
+    'حرشة', 'شباكية', 'كعب الغزال', 'عصير برتقال', 'عصير أفوكادو', 'شاي بالنعناع',
+    'قهوة نص نص', 'سندويش كفتة', 'بيتزا خضر', 'tajine berbère', 'couscous royal',
+]
+
+VARIANTS = ['', 'صغير', 'كبير', 'عائلي', 'حار', 'بالجبن', 'الخاص', 'للأطفال']
+
+DESCRIPTIONS = [
+    'محضّر على الطريقة التقليدية بتوابل مراكشية',
+    'يقدّم ساخناً مع الخبز البلدي',
+    'مكونات طازجة من السوق كل صباح',
+    'وصفة الجدة مع زيت الزيتون البلدي',
+    '',
+]
+
+# كلمات بحث يكتبها الزبائن فعلاً (مع أخطاء وكتابة لاتينية)
+SEARCH_TERMS = ['طاجين', 'tajine', 'كسكس', 'couscous', 'حريره', 'بسطيلة', 'عصير', 'شاي', 'مشوي', 'طجين']
+
+COLORS = ['#556B2F', '#FFD700', '#8B4513', '#CD853F', '#6B8E23', '#DAA520']
+
+
+def make_image(storage, name, color):
+    """صورة JPEG بسيطة (1200px) في مساحة الوسائط"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (1200, 900), color)
+    draw = ImageDraw.Draw(image)
+    for offset in range(0, 1200, 80):
+        draw.ellipse((offset, offset // 2, offset + 300, offset // 2 + 300), outline='#ffffff', width=6)
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, io.BytesIO(buffer.getvalue()))
+
+
+def seed(categories=10, items=25, unavailable=0.1, seed_value=1):
+    """مسح بيانات الاختبار وإنشاء الكتالوج. تُرجع (عدد الأقسام، عدد المنتجات)"""
+    from django.core.files.storage import default_storage
+    from django.db import transaction
+
+    from menu import catalog, images
+    from menu.models import Cart, Category, MenuItem, Order
+
+    rng = random.Random(seed_value)
+
+    with transaction.atomic():
+        Order.objects.all().delete()
+        Cart.objects.all().delete()
+        MenuItem.objects.all().delete()
+        Category.objects.all().delete()
+
+        created = Category.objects.bulk_create(
+            Category(name=name if index < len(CATEGORIES) else f'{name} {index}', icon=icon, order=index)
+            for index, (name, icon) in (
+                (index, CATEGORIES[index % len(CATEGORIES)]) for index in range(categories)
+            )
+        )
+
+        image_names = [
+            make_image(default_storage, f'products/loadtest-{index}.jpg', color)
+            for index, color in enumerate(COLORS)
+        ]
+
+        MenuItem.objects.bulk_create(
+            MenuItem(
+                category=category,
+                name=f'{rng.choice(DISHES)} {rng.choice(VARIANTS)}'.strip(),
+                description=rng.choice(DESCRIPTIONS),
+                price=Decimal(rng.randrange(1500, 25000, 50)) / 100,
+                image=image_names[(category.order + position) % len(image_names)],
+                is_available=rng.random() >= unavailable,
+                is_vegetarian=rng.random() < 0.3,
+                is_spicy=rng.random() < 0.2,
+                is_featured=rng.random() < 0.1,
+                order=position,
+            )
+            for category in created
+            for position in range(items)
+        )
+
+    # bulk_create لا يرسل post_save: النسخ المتجاوبة والكتالوج يدوياً
+    for name in image_names:
+        images.ensure_derivatives(MenuItem(image=name).image)
+    catalog.invalidate()
+    return len(created), len(created) * items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--items', type=int, default=25, help='عدد المنتجات في كل قسم')
+    parser.add_argument('--unavailable', type=float, default=0.1, help='نسبة المنتجات غير المتوفرة')
+    parser.add_argument('--seed', type=int, default=1, help='بذرة العشوائية (نفس الكتالوج في كل تشغيل)')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'loadtest.settings')
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    django.setup()
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    call_command('migrate', verbosity=0)
+    categories, items = seed(args.categories, args.items, args.unavailable, args.seed)
+    print(f'{categories} categories, {items} items')
+
+
+if __name__ == '__main__':
+    main()
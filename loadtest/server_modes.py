@@ -0,0 +1,233 @@
+"""
+مقارنة الأداء المتزامن بين WSGI (gunicorn) و ASGI (uvicorn)
+
+يشغّل السيرفر بكل وضع على نفس قاعدة البيانات، ثم يرسل طلبات متزامنة من
+عملاء يتصفحون القائمة ويضيفون للسلة ويفتحونها. مع --slow-client-ms يرسل كل
+عميل جسم الطلب بعد تأخير (مثل هاتف على شبكة بطيئة)، وهنا يظهر الفرق: عامل
+WSGI ينتظر العميل، و ASGI لا يحجز شيئاً.
+
+    pip install gunicorn uvicorn
+    python manage.py migrate && python manage.py loaddata ...   # قائمة فيها منتجات
+    python loadtest/server_modes.py --concurrency 100 --duration 20 --slow-client-ms 200
+
+النتيجة JSON لكل وضع: عدد الطلبات، الأخطاء، الطلبات في الثانية، و p50/p95/p99.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    'wsgi': [
+        sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+        '--workers', '{workers}', '--threads', '{threads}', '--bind', '127.0.0.1:{port}',
+        '--log-level', 'warning',
+    ],
+    'asgi': [
+        sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+        '--workers', '{workers}', '--host', '127.0.0.1', '--port', '{port}',
+        '--log-level', 'warning', '--no-access-log',
+    ],
+}
+
+_COOKIE_RE = re.compile(r'^([^=;\s]+)=([^;]*)')
+_ITEM_RE = re.compile(rb'data-id="(\d+)"')
+
+
+# ============ عميل HTTP بسيط ============
+
+class Client:
+    """
+    عميل HTTP/1.1 (اتصال لكل طلب) مع كوكيز وCSRF، ورؤوس آخر رد في headers.
+    address يُرسل في X-Real-IP (عنوان زبون مختلف مع RATE_LIMIT_IP_HEADER)،
+    و token في Authorization (METRICS_TOKEN حتى يُرسل السيرفر Server-Timing).
+    """
+
+    def __init__(self, port, slow_ms, address=None, token=None):
+        self.port = port
+        self.slow = slow_ms / 1000
+        self.address = address
+        self.token = token
+        self.cookies = {}
+        self.headers = {}
+
+    async def request(self, method, path, body=None):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        try:
+            payload = json.dumps(body).encode() if body is not None else b''
+            headers = [
+                f'{method} {path} HTTP/1.1',
+                f'Host: 127.0.0.1:{self.port}',
+                'Connection: close',
+                'Accept-Encoding: identity',
+            ]
+            if self.address:
+                headers.append(f'X-Real-IP: {self.address}')
+            if self.token:
+                headers.append(f'Authorization: Bearer {self.token}')
+            if self.cookies:
+                headers.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+            if method == 'POST':
+                headers += [
+                    'Content-Type: application/json',
+                    f'Content-Length: {len(payload)}',
+                    f"X-CSRFToken: {self.cookies.get('csrftoken', '')}",
+                ]
+            writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode())
+            if payload:
+                await writer.drain()
+                if self.slow:
+                    await asyncio.sleep(self.slow)
+                writer.write(payload)
+            await writer.drain()
+
+            raw = await reader.read()
+        finally:
+            writer.close()
+
+        head, _, content = raw.partition(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        self.headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            self.headers[name.strip().lower()] = value.strip()
+            if name.lower() == 'set-cookie':
+                match = _COOKIE_RE.match(value.strip())
+                if match:
+                    self.cookies[match.group(1)] = match.group(2)
+        return status, content
+
+
+async def visitor(client, deadline, latencies, errors):
+    """زائر: القائمة، ثم إضافة منتجات وفتح السلة، ثم تعديل الكمية"""
+    item_ids = []
+
+    async def timed(method, path, body=None):
+        start = time.perf_counter()
+        try:
+            status, content = await client.request(method, path, body)
+        except OSError:
+            errors.append('connection')
+            return None
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append(status)
+        return content
+
+    while time.monotonic() < deadline:
+        content = await timed('GET', '/')
+        if content and not item_ids:
+            item_ids = [int(i) for i in dict.fromkeys(_ITEM_RE.findall(content))][:5]
+        await timed('GET', '/api/cart/content/?format=json')  # السلة وكوكي CSRF (app.js)
+        for item_id in item_ids[:3]:
+            await timed('POST', '/api/cart/add/', {'item_id': item_id, 'quantity': 1})
+        await timed('GET', '/api/cart/content/?format=json')
+        if item_ids:
+            await timed('POST', '/api/cart/update/', {'item_id': item_ids[0], 'quantity': 2})
+
+
+async def run_load(port, concurrency, duration, slow_ms):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        visitor(Client(port, slow_ms), deadline, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    index = min(len(values) - 1, round(fraction * (len(values) - 1)))
+    return round(values[index] * 1000, 2)
+
+
+def summarize(latencies, errors, elapsed):
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+# ============ تشغيل السيرفرات ============
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def benchmark(mode, args):
+    port = free_port()
+    command = [
+        part.format(port=port, workers=args.workers, threads=args.threads)
+        for part in SERVERS[mode]
+    ]
+    # كل عميل هنا يكرر نفس الجلسة بلا توقف: المقارنة بين السيرفرات لا الحدود
+    env = {**os.environ, 'DEBUG': 'False', 'RATE_LIMIT_ENABLED': 'False'}
+    if mode == 'wsgi':
+        env['ASYNC_VIEWS'] = '0'
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    try:
+        wait_for_port(port, process)
+        result = asyncio.run(run_load(port, args.concurrency, args.duration, args.slow_client_ms))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {'mode': mode, 'command': ' '.join(command[1:]), **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='خيوط كل عامل gunicorn')
+    parser.add_argument('--slow-client-ms', type=int, default=0,
+                        help='تأخير إرسال جسم طلبات POST (عميل بطيء)')
+    args = parser.parse_args()
+
+    results = [benchmark(mode, args) for mode in args.modes.split(',')]
+    print(json.dumps({
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'slow_client_ms': args.slow_client_ms,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""
+إعدادات اختبار الحمل (DJANGO_SETTINGS_MODULE=loadtest.settings)
+
+قاعدة بيانات وملفات وسائط منفصلة في loadtest/data حتى لا يُلمس المطعم
+الحقيقي. DATABASE_URL يبقى قابلاً للتغيير (مثلاً لاختبار PostgreSQL).
+"""
+import os
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{DATA_DIR / 'db.sqlite3'}")
+
+from config.settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+MEDIA_ROOT = DATA_DIR / 'media'
+if not SHARED_CACHE_URL:
+    CACHES['shared']['LOCATION'] = str(DATA_DIR / 'cache')
+
+# الأداة تقرأ رأس Server-Timing (يُرسل فقط مع METRICS_TOKEN، loadtest/run.py)
+PERFORMANCE_METRICS = True
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or 'loadtest'
+
+# كل زبون في الأداة يرسل عنواناً مختلفاً في X-Real-IP (كلهم من 127.0.0.1)
+RATE_LIMIT_IP_HEADER = 'HTTP_X_REAL_IP'
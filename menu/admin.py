@@ -1,5 +1,20 @@
-from django.contrib import admin
+import io
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Count, Q
+from django.shortcuts import redirect
+from django.template.defaultfilters import filesizeformat
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from django.utils.html import format_html
+from . import catalog, importexport, reports
+from .images import responsive_image
 from .models import Category, MenuItem, Cart, CartItem, Order, OrderItem
 
 
@@ -11,19 +26,46 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name']
     ordering = ['order']
 
+    def get_queryset(self, request):
+        # عدد المنتجات في نفس الاستعلام بدل استعلام لكل سطر
+        return super().get_queryset(request).annotate(
+            available_items=Count('items', filter=Q(items__is_available=True)),
+        )
+
+    @admin.display(description='عدد المنتجات', ordering='available_items')
+    def items_count(self, obj):
+        return obj.available_items
+
     def icon_preview(self, obj):
         return format_html('<i class="bx {}"></i> {}', obj.icon, obj.icon)
     icon_preview.short_description = 'الأيقونة'
 
 
+class MenuImportForm(forms.Form):
+    file = forms.FileField(label='الملف', help_text='CSV أو JSON Lines (.jsonl) بنفس أعمدة التصدير')
+    dry_run = forms.BooleanField(label='تحقق فقط بدون حفظ', required=False)
+
+    def clean_file(self):
+        # الاستيراد والصور داخل الطلب نفسه: الملفات الكبيرة عبر الأمر (بدون مهلة العامل)
+        upload = self.cleaned_data['file']
+        if upload.size > settings.MENU_IMPORT_MAX_BYTES:
+            raise forms.ValidationError(
+                f'الملف أكبر من {filesizeformat(settings.MENU_IMPORT_MAX_BYTES)}: '
+                f'استورده بالأمر python manage.py import_menu'
+            )
+        return upload
+
+
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/menu/menuitem/change_list.html'
     list_display = ['image_preview', 'name', 'category', 'price_display', 
                     'is_available', 'is_featured', 'order']
     list_editable = ['is_available', 'is_featured', 'order']
     list_filter = ['category', 'is_available', 'is_vegetarian', 'is_spicy', 'is_featured']
     search_fields = ['name', 'description']
     list_per_page = 20
+    list_select_related = ['category']
     ordering = ['category', 'order']
 
     fieldsets = (
@@ -39,7 +81,7 @@ class MenuItemAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width:50px;height:50px;object-fit:cover;border-radius:8px;">',
-                obj.image.url
+                responsive_image(obj.image).thumbnail_url
             )
         return "—"
     image_preview.short_description = 'الصورة'
@@ -48,21 +90,95 @@ class MenuItemAdmin(admin.ModelAdmin):
         return format_html('<strong>{} درهم</strong>', obj.price)
     price_display.short_description = 'السعر'
 
-    actions = ['make_available', 'make_unavailable']
+    actions = ['make_available', 'make_unavailable', 'export_selected']
 
     @admin.action(description='تحديد كـ متوفر')
     def make_available(self, request, queryset):
-        queryset.update(is_available=True)
+        # update() لا يحدّث auto_now: ETag القائمة وكاش الكروت يعتمدان على updated_at
+        queryset.update(is_available=True, updated_at=timezone.now())
+        transaction.on_commit(catalog.invalidate)
 
     @admin.action(description='تحديد كـ غير متوفر')
     def make_unavailable(self, request, queryset):
-        queryset.update(is_available=False)
+        queryset.update(is_available=False, updated_at=timezone.now())
+        transaction.on_commit(catalog.invalidate)
+
+    @admin.action(description='تصدير المحدد (CSV)')
+    def export_selected(self, request, queryset):
+        rows = importexport.export_rows(queryset)
+        return importexport.streaming_download(
+            importexport.encode_rows(rows, importexport.COLUMNS, 'csv'), 'menu-selected.csv', 'csv',
+        )
+
+    # ============ الاستيراد والتصدير ============
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name='menu_menuitem_import'),
+            path('export/', self.admin_site.admin_view(self.export_view),
+                 name='menu_menuitem_export'),
+        ] + super().get_urls()
+
+    def export_view(self, request):
+        """كل القائمة (مع الأقسام الفارغة) بصيغة ?format=csv أو jsonl"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in importexport.FORMATS:
+            fmt = 'csv'
+        lines = importexport.encode_rows(importexport.export_rows(), importexport.COLUMNS, fmt)
+        return importexport.streaming_download(lines, f'menu-{timezone.localdate():%Y-%m-%d}.{fmt}', fmt)
+
+    def import_view(self, request):
+        """رفع ملف CSV أو JSON Lines وإنشاء/تحديث الأقسام والمنتجات"""
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+
+        form = MenuImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                counts = importexport.import_menu(
+                    importexport.read_rows(stream, importexport.guess_format(upload.name)),
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except (importexport.MenuImportError, UnicodeDecodeError) as exc:
+                form.add_error('file', str(exc))
+            else:
+                verb = 'سيُستورد' if form.cleaned_data['dry_run'] else 'تم استيراد'
+                messages.success(request, (
+                    f"{verb} {counts['rows']} صف: {counts['items_created']} منتج جديد، "
+                    f"{counts['items_updated']} منتج معدّل، {counts['categories_created']} قسم جديد"
+                ))
+                for name in counts.get('failed_images', []):
+                    messages.warning(request, f'تعذرت معالجة الصورة {name}')
+                if not form.cleaned_data['dry_run']:
+                    return redirect('admin:menu_menuitem_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'استيراد القائمة',
+            'opts': self.model._meta,
+            'form': form,
+            'columns': importexport.COLUMNS,
+            'max_size': settings.MENU_IMPORT_MAX_BYTES,
+        }
+        return TemplateResponse(request, 'admin/menu/menuitem/import_menu.html', context)
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    readonly_fields = ['name', 'price', 'quantity', 'subtotal']
+    # أسطر الطلب نسخة ثابتة وقت الطلب: بدون قائمة منسدلة لكل المنتجات في كل سطر
+    readonly_fields = ['menu_item', 'name', 'price', 'quantity', 'subtotal']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('menu_item')
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
     def subtotal(self, obj):
         return f"{obj.subtotal} درهم"
@@ -71,6 +187,7 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    change_list_template = 'admin/menu/order/change_list.html'
     list_display = ['order_number', 'customer_name', 'customer_phone', 
                     'total_display', 'status', 'delivery_type', 'created_at']
     list_filter = ['status', 'delivery_type', 'created_at']
@@ -101,10 +218,91 @@ class OrderAdmin(admin.ModelAdmin):
         return format_html('<strong style="color:#556B2F;">{} درهم</strong>', obj.total)
     total_display.short_description = 'المجموع'
 
+    actions = ['export_selected']
+
+    @admin.action(description='تصدير المحدد (CSV)')
+    def export_selected(self, request, queryset):
+        return importexport.streaming_download(
+            importexport.export_orders(queryset, 'csv'), 'orders-selected.csv', 'csv',
+        )
+
+    # ============ لوحة المبيعات والتصدير ============
+
+    SALES_PERIODS = (7, 30, 90)
+
+    def get_urls(self):
+        return [
+            path('sales/', self.admin_site.admin_view(self.sales_dashboard),
+                 name='menu_order_sales'),
+            path('export/', self.admin_site.admin_view(self.export_view),
+                 name='menu_order_export'),
+        ] + super().get_urls()
+
+    def export_view(self, request):
+        """كل طلبات القائمة المفلترة (نفس فلاتر وبحث وتاريخ صفحة الطلبات) بصيغة ?format="""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        # format ليس فلتراً: ChangeList يرفض أي معامل لا يعرفه
+        request.GET = request.GET.copy()
+        fmt = request.GET.pop('format', ['csv'])[-1]
+        if fmt not in importexport.FORMATS:
+            fmt = 'csv'
+        try:
+            orders = self.get_changelist_instance(request).get_queryset(request)
+        except IncorrectLookupParameters:
+            return redirect('admin:menu_order_changelist')
+
+        lines = importexport.export_orders(orders, fmt)
+        return importexport.streaming_download(lines, f'orders-{timezone.localdate():%Y-%m-%d}.{fmt}', fmt)
+
+    def sales_dashboard(self, request):
+        """تقرير المبيعات من جداول الملخصات فقط"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        if request.method == 'POST':
+            days = reports.update_sales_rollups()
+            messages.success(request, f'تم تحديث ملخصات {days} يوم')
+            return redirect(request.get_full_path())
+
+        try:
+            period = int(request.GET.get('days', 30))
+        except ValueError:
+            period = 30
+        if period not in self.SALES_PERIODS:
+            period = 30
+
+        summary = reports.sales_summary(days=period)
+        peak_revenue = max((day['revenue'] for day in summary['days']), default=0) or 1
+        peak_orders = max((hour['orders'] for hour in summary['hours']), default=0) or 1
+        for day in summary['days']:
+            day['percent'] = round(day['revenue'] * 100 / peak_revenue)
+        for hour in summary['hours']:
+            hour['percent'] = round(hour['orders'] * 100 / peak_orders)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'تقرير المبيعات',
+            'opts': self.model._meta,
+            'summary': summary,
+            'period': period,
+            'periods': self.SALES_PERIODS,
+            'state': reports.get_state(),
+        }
+        return TemplateResponse(request, 'admin/menu/sales_dashboard.html', context)
+
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
+    readonly_fields = ['menu_item']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('menu_item')
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Cart)
@@ -112,3 +310,15 @@ class CartAdmin(admin.ModelAdmin):
     list_display = ['session_key', 'items_count', 'total', 'created_at']
     readonly_fields = ['session_key', 'created_at', 'updated_at']
     inlines = [CartItemInline]
+
+    def get_queryset(self, request):
+        # المجموع وعدد القطع في نفس استعلام القائمة
+        return super().get_queryset(request).with_totals()
+
+    @admin.display(description='عدد القطع', ordering='items_quantity')
+    def items_count(self, obj):
+        return obj.items_count
+
+    @admin.display(description='المجموع', ordering='items_total')
+    def total(self, obj):
+        return obj.total
@@ -0,0 +1,173 @@
+"""
+بناء الملفات الثابتة للإنتاج
+
+يُستعمل عبر collectstatic (STORAGES['staticfiles']) ويقوم بـ:
+- حذف قواعد CSS غير المستعملة في القوالب و JavaScript، وحذف القواعد المكررة
+  بين ملفات CSS المتداخلة (STATIC_CSS_PURGE)، ثم ضغط CSS
+- أسماء ملفات ببصمة المحتوى (ManifestStaticFilesStorage)
+- نسخ مضغوطة مسبقاً .gz و .br (Brotli اختياري: pip install brotli)
+"""
+import gzip
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - اختياري
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.xml')
+MIN_COMPRESS_SIZE = 256
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_WORD_RE = re.compile(r'[A-Za-z_][\w-]*')
+_NAME_RE = re.compile(r'[.#](-?[A-Za-z_][\w-]*)')
+_KEEP_AT_RULES = ('@font-face', '@keyframes', '@-webkit-keyframes', '@page', '@import', '@charset')
+
+
+# ============ CSS ============
+
+def used_names(directories, patterns=('*.html', '*.js')):
+    """كل الكلمات التي قد تكون أسماء classes أو ids في القوالب وملفات JS"""
+    names = set()
+    for directory in directories:
+        for pattern in patterns:
+            for path in Path(directory).rglob(pattern):
+                names.update(_WORD_RE.findall(path.read_text(encoding='utf-8', errors='ignore')))
+    return names
+
+
+def _split_rules(css):
+    """تقسيم CSS إلى (prelude, body) في المستوى الأعلى؛ body = None للقواعد بدون {}"""
+    rules = []
+    depth = 0
+    start = 0
+    prelude_end = None
+    for index, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude_end = index
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((css[start:prelude_end].strip(), css[prelude_end + 1:index]))
+                start = index + 1
+        elif char == ';' and depth == 0:
+            rules.append((css[start:index].strip(), None))
+            start = index + 1
+    return rules
+
+
+def _split_selectors(prelude):
+    selectors, depth, current = [], 0, ''
+    for char in prelude:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        if char == ',' and depth == 0:
+            selectors.append(current.strip())
+            current = ''
+        else:
+            current += char
+    selectors.append(current.strip())
+    return [selector for selector in selectors if selector]
+
+
+def _minify_block(body):
+    body = re.sub(r'\s+', ' ', body).strip()
+    body = re.sub(r'\s*([:;,{}])\s*', r'\1', body)
+    return body.rstrip(';')
+
+
+def optimize_css(css, names, exclude=frozenset(), found=None, context=''):
+    """
+    حذف المحددات التي تذكر class أو id غير موجود في names، وحذف القواعد
+    الموجودة في exclude (قواعد ملف سابق)، مع ضغط النتيجة.
+    القواعد الناتجة تُضاف إلى found بالشكل (context, rule).
+    """
+    found = set() if found is None else found
+    output = []
+    for prelude, body in _split_rules(_COMMENT_RE.sub('', css)):
+        if body is None:
+            if prelude:
+                output.append(f'{prelude};')
+            continue
+
+        if prelude.startswith('@'):
+            prelude = re.sub(r'\s+', ' ', prelude)
+            if prelude.startswith(_KEEP_AT_RULES):
+                output.append(f'{prelude}{{{_minify_block(body)}}}')
+                continue
+            inner = optimize_css(body, names, exclude, found, context + prelude)
+            if inner:
+                output.append(f'{prelude}{{{inner}}}')
+            continue
+
+        selectors = [
+            selector for selector in _split_selectors(prelude)
+            if all(name in names for name in _NAME_RE.findall(selector))
+        ]
+        if not selectors:
+            continue
+
+        rule = f'{",".join(selectors)}{{{_minify_block(body)}}}'
+        found.add((context, rule))
+        if (context, rule) not in exclude:
+            output.append(rule)
+    return ''.join(output)
+
+
+# ============ Storage ============
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage مع تنظيف CSS ونسخ gzip و brotli"""
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # لم يُشغَّل collectstatic بعد (مثلاً أثناء الاختبارات): الاسم الأصلي
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self._optimize_stylesheets(paths)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        if not dry_run:
+            for name in set(self.hashed_files.values()):
+                self._compress(name)
+
+    def _optimize_stylesheets(self, paths):
+        stylesheets = [name for name in getattr(settings, 'STATIC_CSS_PURGE', []) if name in paths]
+        if not stylesheets:
+            return
+        names = used_names([*settings.TEMPLATES[0]['DIRS'], *settings.STATICFILES_DIRS])
+        seen = set()
+        for name in stylesheets:
+            path = Path(self.path(name))
+            found = set()
+            path.write_text(
+                optimize_css(path.read_text(encoding='utf-8'), names, exclude=frozenset(seen), found=found),
+                encoding='utf-8',
+            )
+            seen |= found
+
+    def _compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        path = Path(self.path(name))
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        path.with_name(path.name + '.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            path.with_name(path.name + '.br').write_bytes(brotli.compress(data, quality=11))
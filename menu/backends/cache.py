@@ -0,0 +1,99 @@
+"""
+كاش LRU داخل العملية بحد للحجم
+
+مثل LocMemCache (قاموس لكل عامل بترتيب آخر استعمال) مع:
+- حد بالبايت OPTIONS['MAX_BYTES'] بجانب MAX_ENTRIES: عند التجاوز يُحذف
+  الأقدم استعمالاً واحداً تلو الآخر حتى يعود الحجم تحت الحد، بدل حذف
+  ثلث الكاش دفعة واحدة (CULL_FREQUENCY)
+- النصوص تُحفظ كما هي بدون pickle (أجزاء HTML من {% cache %})، فالقراءة
+  بحث في قاموس فقط. النصوص لا تتغير، فلا خطر من تعديل القيمة المحفوظة.
+"""
+import pickle
+import sys
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+# الحجم لكل مفتاح ومجموعه، لكل اسم كاش (مثل _caches في locmem)
+_usage = {}
+
+
+class _Usage:
+    __slots__ = ('sizes', 'total')
+
+    def __init__(self):
+        self.sizes = {}
+        self.total = 0
+
+
+class LRUCache(LocMemCache):
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._max_bytes = int(params.get('OPTIONS', {}).get('MAX_BYTES', 0))
+        self._usage = _usage.setdefault(name, _Usage())
+
+    def _dump(self, value):
+        return value if isinstance(value, str) else pickle.dumps(value, self.pickle_protocol)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self._dump(value)
+        with self._lock:
+            if self._has_expired(key):
+                self._set(key, value, timeout)
+                return True
+            return False
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            if self._has_expired(key):
+                self._delete(key)
+                return default
+            value = self._cache[key]
+            self._cache.move_to_end(key, last=False)
+        return value if isinstance(value, str) else pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self._dump(value)
+        with self._lock:
+            self._set(key, value, timeout)
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._forget(key)
+        super()._set(key, value, timeout)
+        size = sys.getsizeof(value)
+        self._usage.sizes[key] = size
+        self._usage.total += size
+        if self._max_bytes:
+            # الأقدم استعمالاً في آخر القاموس (LocMemCache يضع الأحدث أولاً)
+            while self._usage.total > self._max_bytes and len(self._cache) > 1:
+                self._evict()
+
+    def _evict(self):
+        key, _ = self._cache.popitem()
+        del self._expire_info[key]
+        self._forget(key)
+
+    def _cull(self):
+        # عند MAX_ENTRIES: مفتاح واحد فقط
+        if self._cache:
+            self._evict()
+
+    def _forget(self, key):
+        self._usage.total -= self._usage.sizes.pop(key, 0)
+
+    def _delete(self, key):
+        deleted = super()._delete(key)
+        if deleted:
+            self._forget(key)
+        return deleted
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._expire_info.clear()
+            self._usage.sizes.clear()
+            self._usage.total = 0
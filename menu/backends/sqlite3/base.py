@@ -0,0 +1,36 @@
+"""
+SQLite مضبوط للإنتاج
+
+مثل django.db.backends.sqlite3 مع:
+- PRAGMAs عند فتح كل اتصال (WAL، synchronous=NORMAL، mmap، cache...)
+  من OPTIONS['pragmas']
+- المعاملات تبدأ بـ BEGIN IMMEDIATE (OPTIONS['transaction_mode']): الكاتب
+  يحجز القفل من البداية وينتظر busy_timeout بدل أن يفشل فوراً بـ
+  "database is locked" عند ترقية قفل القراءة إلى كتابة
+"""
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        # قاعدة في الذاكرة (الاختبارات) لا تدعم WAL
+        pragmas = {} if self.is_in_memory_db() else self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = str(self.settings_dict['OPTIONS'].get('transaction_mode', 'DEFERRED')).upper()
+        if mode not in TRANSACTION_MODES:
+            mode = 'DEFERRED'
+        self.cursor().execute(f'BEGIN {mode}')
@@ -0,0 +1,457 @@
+"""
+مخازن السلة
+
+كل المشاهد (views) تتعامل مع السلة عبر واجهة CartStore فقط، والتخزين الفعلي
+يُحدَّد في الإعداد CART_STORE:
+- DatabaseCartStore: جدولا Cart و CartItem (الافتراضي)
+- SessionCartStore: داخل الجلسة نفسها، بدون أي جدول (مع SESSION_ENGINE
+  مبني على الكاش لا يكتب شيئاً في قاعدة البيانات)
+
+السلة لا تُنشأ إلا عند أول إضافة فعلية، فالزائر الذي يفتح السلة أو صفحة
+الطلب فقط لا يسبب أي كتابة. الأسماء والأسعار تأتي دائماً من كتالوج القائمة.
+
+نسخة واحدة من المخزن لكل طلب HTTP (يتشاركها المشهد والقوالب)، والأسطر
+تُقرأ مرة واحدة ثم تُحدَّث في الذاكرة مع كل تعديل، فعدد الاستعلامات ثابت
+مهما كان عدد الأسطر.
+
+لكل عملية نسخة async بنفس الاسم مع البادئة a (aadd، alines...) للمشاهد
+async تحت ASGI. النسخ الافتراضية تستدعي النسخة العادية في خيط عبر
+sync_to_async، و DatabaseCartStore يستعمل ORM الـ async مباشرة.
+"""
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .catalog import aget_catalog, get_catalog
+from .models import Cart, CartItem
+
+
+class CartLine(namedtuple('CartLine', ['item', 'quantity', 'notes'])):
+    """سطر في السلة: منتج من الكتالوج مع الكمية"""
+
+    __slots__ = ()
+
+    @property
+    def subtotal(self):
+        return self.item.price * self.quantity
+
+
+class CartStore(ABC):
+    """الواجهة المشتركة لكل مخازن السلة (المخزن الناقص يفشل عند إنشائه)"""
+
+    def __init__(self, request):
+        self.request = request
+        self._rows = None
+        self._lines = None
+        self._catalog = None
+
+    # ---------- يجب تنفيذها في كل مخزن ----------
+
+    @abstractmethod
+    def exists(self):
+        """هل توجد سلة لهذه الجلسة؟ (بدون إنشائها)"""
+
+    @property
+    @abstractmethod
+    def version(self):
+        """معرّف يتغير مع كل تعديل على السلة ('' إذا لم توجد)"""
+
+    @abstractmethod
+    def load_rows(self):
+        """قراءة الأسطر الخام: قاموس item_id -> (quantity, notes)"""
+
+    @abstractmethod
+    def add(self, item_id, quantity=1):
+        """إضافة كمية لمنتج (تنشئ السلة عند الحاجة)"""
+
+    @abstractmethod
+    def set(self, item_id, quantity):
+        """تعيين كمية منتج موجود، والصفر يحذفه. تُرجع False إذا لم يكن في السلة"""
+
+    @abstractmethod
+    def remove(self, item_id):
+        """حذف منتج من السلة"""
+
+    @abstractmethod
+    def clear(self):
+        """تفريغ السلة"""
+
+    # ---------- مشتركة ----------
+
+    def lock(self):
+        """قفل السلة حتى نهاية المعاملة الحالية وإعادة قراءة أسطرها"""
+        self._rows = None
+        self._lines = None
+
+    def apply(self, operations):
+        """تنفيذ مجموعة عمليات (op, item_id, quantity) بالترتيب"""
+        for op, item_id, quantity in operations:
+            if op == 'add':
+                self.add(item_id, quantity)
+            elif op == 'set':
+                if not self.set(item_id, quantity) and quantity > 0:
+                    self.add(item_id, quantity)
+            elif op == 'remove':
+                self.remove(item_id)
+
+    def get_rows(self):
+        """الأسطر الخام (تُقرأ مرة واحدة لكل طلب)"""
+        if self._rows is None:
+            self._rows = self.load_rows()
+        return self._rows
+
+    def _remember(self, item_id, quantity, notes=''):
+        """تحديث الأسطر المحفوظة في الذاكرة بعد تعديل"""
+        if self._rows is not None:
+            if quantity > 0:
+                self._rows[item_id] = (quantity, notes)
+            else:
+                self._rows.pop(item_id, None)
+        self._lines = None
+
+    def _forget_all(self):
+        self._rows = {}
+        self._lines = None
+
+    def _build_lines(self, catalog, rows):
+        if self._lines is not None and self._lines[0] == catalog.version:
+            return self._lines[1]
+        lines = []
+        for item_id, (quantity, notes) in rows.items():
+            item = catalog.get_item(item_id)
+            if item is not None:
+                lines.append(CartLine(item, quantity, notes))
+        self._lines = (catalog.version, lines)
+        return lines
+
+    @property
+    def lines(self):
+        """أسطر السلة المتوفرة في الكتالوج بترتيب الإضافة"""
+        catalog = self._catalog if self._catalog is not None else get_catalog()
+        return self._build_lines(catalog, self.get_rows())
+
+    @property
+    def total(self):
+        return sum((line.subtotal for line in self.lines), 0)
+
+    @property
+    def items_count(self):
+        return sum(line.quantity for line in self.lines)
+
+    # ---------- async ----------
+
+    async def aexists(self):
+        return await sync_to_async(self.exists)()
+
+    async def aversion(self):
+        return await sync_to_async(lambda: self.version)()
+
+    async def aload_rows(self):
+        return await sync_to_async(self.load_rows)()
+
+    async def aget_rows(self):
+        if self._rows is None:
+            self._rows = await self.aload_rows()
+        return self._rows
+
+    async def aadd(self, item_id, quantity=1):
+        await sync_to_async(self.add)(item_id, quantity)
+
+    async def aset(self, item_id, quantity):
+        return await sync_to_async(self.set)(item_id, quantity)
+
+    async def aremove(self, item_id):
+        await sync_to_async(self.remove)(item_id)
+
+    async def aclear(self):
+        await sync_to_async(self.clear)()
+
+    async def alines(self):
+        # لقطة الكتالوج تُثبَّت لبقية الطلب فلا تقرأ lines الكاش بشكل متزامن
+        self._catalog = await aget_catalog()
+        return self._build_lines(self._catalog, await self.aget_rows())
+
+    async def atotals(self):
+        """(عدد القطع، المجموع)"""
+        lines = await self.alines()
+        return sum(line.quantity for line in lines), sum((line.subtotal for line in lines), 0)
+
+    async def aprefetch(self):
+        """
+        تحميل كل ما تقرأه القوالب (exists و lines) مسبقاً، حتى يعمل
+        _cart_content.html داخل مشهد async بدون أي استعلام.
+        """
+        if not await self.aexists():
+            self._rows = {}
+        await self.alines()
+
+
+class DatabaseCartStore(CartStore):
+    """السلة في جدولي Cart و CartItem مرتبطة بمفتاح الجلسة"""
+
+    _missing = object()
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._updated_at = self._missing
+
+    def _session_key(self):
+        return self.request.session.session_key
+
+    def _get_or_create_cart(self):
+        if not self._session_key():
+            self.request.session.create()
+            self._rows = {}
+        cart, created = Cart.objects.get_or_create(session_key=self._session_key())
+        self._updated_at = cart.updated_at
+        return cart
+
+    def _items(self):
+        return CartItem.objects.filter(cart__session_key=self._session_key())
+
+    def _touch(self):
+        """تحديث updated_at للسلة (رقم النسخة وتاريخ آخر نشاط)"""
+        now = timezone.now()
+        if Cart.objects.filter(session_key=self._session_key()).update(updated_at=now):
+            self._updated_at = now
+
+    def _cart_updated_at(self):
+        if self._updated_at is self._missing:
+            session_key = self._session_key()
+            self._updated_at = session_key and Cart.objects.filter(
+                session_key=session_key
+            ).values_list('updated_at', flat=True).first()
+        return self._updated_at
+
+    def exists(self):
+        return bool(self._cart_updated_at())
+
+    @property
+    def version(self):
+        updated_at = self._cart_updated_at()
+        return updated_at.isoformat() if updated_at else ''
+
+    def load_rows(self):
+        if not self._session_key():
+            return {}
+        return {
+            item_id: (quantity, notes)
+            for item_id, quantity, notes in self._items().order_by('id').values_list(
+                'menu_item_id', 'quantity', 'notes'
+            )
+        }
+
+    def lock(self):
+        super().lock()
+        session_key = self._session_key()
+        if session_key:
+            list(Cart.objects.select_for_update().filter(session_key=session_key).values_list('pk'))
+
+    def apply(self, operations):
+        with transaction.atomic():
+            super().apply(operations)
+
+    def add(self, item_id, quantity=1):
+        # زيادة ذرية في قاعدة البيانات حتى لا تضيع النقرات المتزامنة
+        cart = self._get_or_create_cart()
+        increment = CartItem.objects.filter(cart=cart, menu_item_id=item_id)
+        self._touch()
+        if increment.update(quantity=F('quantity') + quantity):
+            self._rows = None
+            self._lines = None
+            return
+        try:
+            with transaction.atomic():
+                CartItem.objects.create(cart=cart, menu_item_id=item_id, quantity=quantity)
+        except IntegrityError:
+            increment.update(quantity=F('quantity') + quantity)
+            self._rows = None
+            self._lines = None
+        else:
+            self._remember(item_id, quantity)
+
+    def set(self, item_id, quantity):
+        if not self._session_key():
+            return False
+        items = self._items().filter(menu_item_id=item_id)
+        if quantity > 0:
+            found = items.update(quantity=quantity) > 0
+        else:
+            deleted, _ = items.delete()
+            found = deleted > 0
+        if found:
+            notes = self._rows.get(item_id, (0, ''))[1] if self._rows is not None else ''
+            self._remember(item_id, quantity, notes)
+            self._touch()
+        return found
+
+    def remove(self, item_id):
+        if self._session_key():
+            deleted, _ = self._items().filter(menu_item_id=item_id).delete()
+            self._remember(item_id, 0)
+            if deleted:
+                self._touch()
+
+    def clear(self):
+        if self._session_key():
+            self._items().delete()
+            self._forget_all()
+            self._touch()
+
+    # ---------- async (ORM async مباشرة) ----------
+
+    async def _atouch(self):
+        now = timezone.now()
+        if await Cart.objects.filter(session_key=self._session_key()).aupdate(updated_at=now):
+            self._updated_at = now
+
+    async def _acart_updated_at(self):
+        if self._updated_at is self._missing:
+            session_key = self._session_key()
+            self._updated_at = session_key and await Cart.objects.filter(
+                session_key=session_key
+            ).values_list('updated_at', flat=True).afirst()
+        return self._updated_at
+
+    async def aexists(self):
+        return bool(await self._acart_updated_at())
+
+    async def aversion(self):
+        updated_at = await self._acart_updated_at()
+        return updated_at.isoformat() if updated_at else ''
+
+    async def aload_rows(self):
+        if not self._session_key():
+            return {}
+        return {
+            item_id: (quantity, notes)
+            async for item_id, quantity, notes in self._items().order_by('id').values_list(
+                'menu_item_id', 'quantity', 'notes'
+            )
+        }
+
+    async def aadd(self, item_id, quantity=1):
+        if not self._session_key():
+            await sync_to_async(self.request.session.create)()
+            self._rows = {}
+        cart, _ = await Cart.objects.aget_or_create(session_key=self._session_key())
+        self._updated_at = cart.updated_at
+        increment = CartItem.objects.filter(cart=cart, menu_item_id=item_id)
+        await self._atouch()
+        if await increment.aupdate(quantity=F('quantity') + quantity):
+            self._rows = None
+            self._lines = None
+            return
+        try:
+            await CartItem.objects.acreate(cart=cart, menu_item_id=item_id, quantity=quantity)
+        except IntegrityError:
+            await increment.aupdate(quantity=F('quantity') + quantity)
+            self._rows = None
+            self._lines = None
+        else:
+            self._remember(item_id, quantity)
+
+    async def aset(self, item_id, quantity):
+        if not self._session_key():
+            return False
+        items = self._items().filter(menu_item_id=item_id)
+        if quantity > 0:
+            found = await items.aupdate(quantity=quantity) > 0
+        else:
+            deleted, _ = await items.adelete()
+            found = deleted > 0
+        if found:
+            notes = self._rows.get(item_id, (0, ''))[1] if self._rows is not None else ''
+            self._remember(item_id, quantity, notes)
+            await self._atouch()
+        return found
+
+    async def aremove(self, item_id):
+        if self._session_key():
+            deleted, _ = await self._items().filter(menu_item_id=item_id).adelete()
+            self._remember(item_id, 0)
+            if deleted:
+                await self._atouch()
+
+    async def aclear(self):
+        if self._session_key():
+            await self._items().adelete()
+            self._forget_all()
+            await self._atouch()
+
+
+class SessionCartStore(CartStore):
+    """السلة داخل بيانات الجلسة: {item_id: quantity}"""
+
+    session_key = 'cart'
+    version_key = 'cart_version'
+
+    def _data(self):
+        return self.request.session.get(self.session_key, {})
+
+    def _save(self, data):
+        session = self.request.session
+        session[self.session_key] = data
+        session[self.version_key] = session.get(self.version_key, 0) + 1
+        self._rows = None
+        self._lines = None
+
+    def exists(self):
+        return self.session_key in self.request.session
+
+    @property
+    def version(self):
+        if not self.exists():
+            return ''
+        return str(self.request.session.get(self.version_key, 0))
+
+    def load_rows(self):
+        return {int(item_id): (quantity, '') for item_id, quantity in self._data().items()}
+
+    def add(self, item_id, quantity=1):
+        data = dict(self._data())
+        key = str(item_id)
+        data[key] = data.get(key, 0) + quantity
+        self._save(data)
+
+    def set(self, item_id, quantity):
+        data = dict(self._data())
+        key = str(item_id)
+        if key not in data:
+            return False
+        if quantity > 0:
+            data[key] = quantity
+        else:
+            del data[key]
+        self._save(data)
+        return True
+
+    def remove(self, item_id):
+        data = dict(self._data())
+        if data.pop(str(item_id), None) is not None:
+            self._save(data)
+
+    def clear(self):
+        if self.exists():
+            self._save({})
+
+
+@lru_cache(maxsize=None)
+def _store_class(path):
+    return import_string(path)
+
+
+def get_cart(request):
+    """مخزن السلة المُعدّ في CART_STORE لهذا الطلب (نسخة واحدة لكل طلب)"""
+    store = getattr(request, '_cart_store', None)
+    if store is None:
+        store = _store_class(settings.CART_STORE)(request)
+        request._cart_store = store
+    return store
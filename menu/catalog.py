@@ -0,0 +1,197 @@
+"""
+كتالوج القائمة داخل العملية
+
+نسخة ثابتة (immutable) ومرقّمة من الأقسام النشطة والمنتجات المتوفرة،
+تُبنى مرة واحدة لكل عامل (worker) وتُقرأ منها كل الصفحات وواجهات السلة
+والطلبات بدون أي استعلام SQL. رقم النسخة محفوظ في الكاش المشترك بين كل
+العمال (caches['shared'])، وأي تعديل على الأقسام أو المنتجات يغيّره فيعيد كل
+عامل بناء نسخته عند أول قراءة.
+"""
+import threading
+import time
+import uuid
+from collections import namedtuple
+from types import MappingProxyType
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+
+from .images import responsive_image
+
+VERSION_KEY = 'menu:catalog:version'
+# كاش داخل العملية (LocMem) لا يوصل الإبطال لباقي العمال: menu.E001 في checks.py
+CACHE_ALIAS = 'shared'
+
+CatalogCategory = namedtuple('CatalogCategory', [
+    'id', 'name', 'icon', 'image_url', 'image', 'order',
+])
+
+CatalogItem = namedtuple('CatalogItem', [
+    'id', 'category_id', 'category_name', 'name', 'description', 'price',
+    'image_url', 'image', 'is_vegetarian', 'is_spicy', 'is_featured', 'order',
+    'created_at', 'updated_at',
+])
+
+
+def sort_key(item):
+    """مفتاح ترتيب القائمة (order ثم الأحدث ثم id)، يصلح مؤشراً للصفحات"""
+    return (item.order, -item.created_at.timestamp(), item.id)
+
+
+class Catalog:
+    """لقطة ثابتة من القائمة"""
+
+    __slots__ = ('version', 'last_modified', 'categories', 'items', 'images', '_by_id', '_by_category')
+
+    def __init__(self, version, categories, items, last_modified=None, images=None):
+        self.version = version
+        self.last_modified = last_modified
+        # (النوع، id، updated_at) -> ResponsiveImage، لإعادة استعمالها في البناء التالي
+        self.images = MappingProxyType(images or {})
+        self.categories = tuple(categories)
+        self.items = tuple(items)
+
+        by_category = {}
+        for item in self.items:
+            by_category.setdefault(item.category_id, []).append(item)
+
+        self._by_id = MappingProxyType({item.id: item for item in self.items})
+        self._by_category = MappingProxyType({
+            category_id: tuple(items) for category_id, items in by_category.items()
+        })
+
+    def __len__(self):
+        return len(self.items)
+
+    def get_item(self, item_id):
+        """المنتج المتوفر بهذا المعرف أو None"""
+        try:
+            return self._by_id.get(int(item_id))
+        except (TypeError, ValueError):
+            return None
+
+    def items_for_category(self, category_id):
+        """منتجات قسم معيّن بنفس ترتيب القائمة"""
+        try:
+            return self._by_category.get(int(category_id), ())
+        except (TypeError, ValueError):
+            return ()
+
+
+_lock = threading.Lock()
+_catalog = None
+_loaded_at = 0.0
+
+
+def _current_version():
+    """رقم النسخة الحالي من الكاش المشترك"""
+    cache = caches[CACHE_ALIAS]
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, timeout=None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def _is_fresh(catalog, version):
+    ttl = getattr(settings, 'MENU_CATALOG_TTL', 300)
+    return (
+        catalog is not None
+        and catalog.version == version
+        and time.monotonic() - _loaded_at < ttl
+    )
+
+
+def _build(version, previous=None):
+    """
+    بناء لقطة جديدة من قاعدة البيانات. صور الصفوف التي لم تتغير (نفس
+    updated_at) تؤخذ من اللقطة السابقة بدل قراءة ملف وصف لكل صورة من جديد.
+    """
+    from .models import Category, MenuItem
+
+    previous_images = previous.images if previous is not None else {}
+    images = {}
+
+    def image(kind, obj):
+        key = (kind, obj.id, obj.updated_at)
+        responsive = previous_images.get(key) or responsive_image(obj.image)
+        # بدون ملف وصف بعد (التوليد في الخلفية): يُقرأ من جديد في البناء التالي
+        if responsive.width is not None:
+            images[key] = responsive
+        return responsive
+
+    categories = [
+        CatalogCategory(
+            id=category.id,
+            name=category.name,
+            icon=category.icon,
+            image_url=category.image.url if category.image else '',
+            image=image('category', category),
+            order=category.order,
+        )
+        for category in Category.objects.filter(is_active=True)
+    ]
+
+    items = [
+        CatalogItem(
+            id=item.id,
+            category_id=item.category_id,
+            category_name=item.category.name,
+            name=item.name,
+            description=item.description,
+            price=item.price,
+            image_url=item.image.url if item.image else '',
+            image=image('item', item),
+            is_vegetarian=item.is_vegetarian,
+            is_spicy=item.is_spicy,
+            is_featured=item.is_featured,
+            order=item.order,
+            created_at=item.created_at,
+            updated_at=item.updated_at,
+        )
+        for item in MenuItem.objects.filter(is_available=True).select_related('category')
+        .order_by('order', '-created_at', 'id')
+    ]
+
+    # آخر تعديل على أي قسم أو منتج، حتى غير النشط أو غير المتوفر (جزء من ETag القائمة)
+    last_modified = max(filter(None, [
+        Category.objects.aggregate(last=Max('updated_at'))['last'],
+        MenuItem.objects.aggregate(last=Max('updated_at'))['last'],
+    ]), default=None)
+
+    return Catalog(version, categories, items, last_modified, images)
+
+
+def get_catalog():
+    """اللقطة الحالية، تُعاد بناؤها فقط إذا تغيّر رقم النسخة أو انتهت صلاحيتها"""
+    global _catalog, _loaded_at
+
+    version = _current_version()
+    catalog = _catalog
+    if _is_fresh(catalog, version):
+        return catalog
+
+    with _lock:
+        if _is_fresh(_catalog, version):
+            return _catalog
+        catalog = _build(version, _catalog)
+        _catalog = catalog
+        _loaded_at = time.monotonic()
+    return catalog
+
+
+async def aget_catalog():
+    """مثل get_catalog للمشاهد async: لا تلمس قاعدة البيانات إلا عند إعادة البناء"""
+    version = await caches[CACHE_ALIAS].aget(VERSION_KEY)
+    catalog = _catalog
+    if version is not None and _is_fresh(catalog, version):
+        return catalog
+    return await sync_to_async(get_catalog)()
+
+
+def invalidate():
+    """إبطال اللقطة في كل العمال"""
+    caches[CACHE_ALIAS].set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
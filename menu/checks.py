@@ -0,0 +1,31 @@
+"""فحوص الإعدادات عند التشغيل (manage.py check وكل أوامر الإدارة)"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+from .catalog import CACHE_ALIAS
+
+# كاش داخل العملية: كل عامل يرى رقم نسخة مختلفاً ولا يصله الإبطال
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+    'menu.backends.cache.LRUCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(CACHE_ALIAS, {}).get('BACKEND')
+    if backend is None:
+        return [Error(
+            f"CACHES['{CACHE_ALIAS}'] is missing.",
+            hint='The catalog version must live in a cache shared by all workers.',
+            id='menu.E001',
+        )]
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"CACHES['{CACHE_ALIAS}'] uses {backend}, which is local to each process.",
+            hint='Use FileBasedCache (one host) or RedisCache (SHARED_CACHE_URL), '
+                 'otherwise catalog invalidation never reaches the other workers.',
+            id='menu.E001',
+        )]
+    return []
@@ -0,0 +1,91 @@
+"""
+تنظيف السلات المهجورة
+
+السلة التي لم تُعدَّل منذ CART_MAX_AGE ثانية ولم تعد لها جلسة حية تُحذف مع
+أسطرها؛ السلة التي ما زالت جلستها حية تبقى مهما كان عمرها. الجلسات نفسها
+لا تُلمس (تنظيفها بـ python manage.py clearsessions). الحذف يتم على دفعات
+صغيرة، كل دفعة في معاملة قصيرة مستقلة، مع استراحة اختيارية بينها حتى لا
+يُقفَل SQLite طويلاً أمام طلبات الزوار.
+
+يُشغَّل فقط عبر: python manage.py cleanup_carts (من cron)
+"""
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Cart, CartItem
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE = 0.05
+
+
+def _uses_db_sessions():
+    return settings.SESSION_ENGINE in (
+        'django.contrib.sessions.backends.db',
+        'django.contrib.sessions.backends.cached_db',
+    )
+
+
+def _live_session_keys(keys):
+    """المفاتيح من keys التي ما زالت جلستها حية"""
+    if _uses_db_sessions():
+        from django.contrib.sessions.models import Session
+        return set(
+            Session.objects.filter(session_key__in=keys, expire_date__gt=timezone.now())
+            .values_list('session_key', flat=True)
+        )
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    return {key for key in keys if store.exists(key)}
+
+
+def _expired_carts(cutoff, batch_size):
+    """
+    دفعات مفاتيح السلات الأقدم من cutoff التي لم تعد جلستها حية.
+    المؤشر (updated_at، id) يتجاوز السلات الحية بدل قراءتها في كل دفعة.
+    """
+    # الترتيب على الفهرس نفسه: البحث لا يمر على السلات الحديثة
+    queryset = Cart.objects.filter(updated_at__lt=cutoff).order_by('updated_at', 'pk')
+    after = Q()
+    while True:
+        rows = list(queryset.filter(after).values_list('pk', 'session_key', 'updated_at')[:batch_size])
+        if not rows:
+            return
+        live = _live_session_keys([session_key for _, session_key, _ in rows])
+        pks = [pk for pk, session_key, _ in rows if session_key not in live]
+        if pks:
+            yield pks
+        if len(rows) < batch_size:
+            return
+        pk, _, updated_at = rows[-1]
+        after = Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk)
+
+
+def cleanup_expired(max_age=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False, pause=0):
+    """
+    حذف السلات القديمة التي لم تعد لها جلسة حية، مع أسطرها.
+    تُرجع {'carts': n, 'cart_items': n}
+    """
+    if max_age is None:
+        max_age = settings.CART_MAX_AGE
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    counts = {'carts': 0, 'cart_items': 0}
+
+    for pks in _expired_carts(cutoff, batch_size):
+        if dry_run:
+            counts['carts'] += len(pks)
+            counts['cart_items'] += CartItem.objects.filter(cart_id__in=pks).count()
+            continue
+        with transaction.atomic():
+            # إعادة شرط updated_at: السلة التي عاد صاحبها أثناء التنظيف تبقى
+            _, deleted = Cart.objects.filter(pk__in=pks, updated_at__lt=cutoff).delete()
+        counts['carts'] += deleted.get(Cart._meta.label, 0)
+        counts['cart_items'] += deleted.get(CartItem._meta.label, 0)
+        if pause:
+            time.sleep(pause)
+
+    return counts
@@ -0,0 +1,214 @@
+"""
+نسخ الصور المتجاوبة
+
+لكل صورة منتج أو قسم تُولَّد نسخ بعروض مختلفة (WebP، و AVIF إذا كان Pillow
+يدعمه) مع صورة صغيرة جداً كخلفية ضبابية أثناء التحميل. تُحفظ النسخ بجانب
+الأصل باسمه الكامل (soda.jpg و soda.png لا يتشاركان نسخاً)، مع ملف وصف
+(manifest) يحتوي بصمة الأصل حتى لا يُعاد التوليد إلا إذا تغيّرت الصورة:
+
+    products/soda.jpg
+    products/soda.jpg.120w.webp  products/soda.jpg.120w.avif  ...
+    products/soda.jpg.derivatives.json
+
+التوليد بعد الحفظ يتم في خيط خلفي واحد (ملفات فقط، بدون قاعدة البيانات)
+فلا ينتظر حفظ لوحة التحكم Pillow. عند تغيير الصورة أو حذف صاحبها تُحذف
+نسخ الصورة القديمة إذا لم يعد يستعملها أي منتج أو قسم.
+"""
+import base64
+import hashlib
+import io
+import json
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (120, 240, 400, 800)
+THUMBNAIL_WIDTH = 120
+PLACEHOLDER_WIDTH = 16
+QUALITY = {'webp': 80, 'avif': 55}
+
+ResponsiveImage = namedtuple('ResponsiveImage', [
+    'url', 'width', 'height', 'thumbnail_url', 'webp_srcset', 'avif_srcset', 'placeholder',
+])
+
+
+def supported_formats():
+    formats = ['webp']
+    try:
+        if features.check('avif'):
+            formats.insert(0, 'avif')
+    except ValueError:
+        pass
+    return formats
+
+
+def manifest_name(name):
+    return f'{name}.derivatives.json'
+
+
+def derivative_name(name, width, fmt):
+    return f'{name}.{width}w.{fmt}'
+
+
+def load_manifest(name, storage=None):
+    """ملف وصف النسخ لصورة معينة أو None إذا لم تُولَّد بعد"""
+    storage = storage or default_storage
+    path = manifest_name(name)
+    try:
+        with storage.open(path, 'rb') as fh:
+            return json.loads(fh.read().decode())
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def delete_derivatives(name, storage=None):
+    """حذف كل نسخ صورة وملف وصفها (الأصل يبقى)"""
+    storage = storage or default_storage
+    manifest = load_manifest(name, storage) or {}
+    paths = {path for variants in manifest.get('variants', {}).values() for path in variants.values()}
+    # بدون ملف وصف (توليد لم يكتمل): كل الأسماء الممكنة
+    paths.update(derivative_name(name, width, fmt) for width in WIDTHS for fmt in QUALITY)
+    paths.add(manifest_name(name))
+    for path in paths:
+        try:
+            storage.delete(path)
+        except OSError:
+            logger.warning('Could not delete image derivative %s', path)
+
+
+def delete_unused_derivatives(names):
+    """
+    حذف نسخ الصور التي لم يعد يستعملها أي منتج أو قسم. الفحص هنا (استعلامان)
+    والحذف في الخيط الخلفي.
+    """
+    from .models import Category, MenuItem
+
+    names = set(filter(None, names))
+    if not names:
+        return
+    used = set(MenuItem.objects.filter(image__in=names).values_list('image', flat=True))
+    used.update(Category.objects.filter(image__in=names).values_list('image', flat=True))
+    for name in sorted(names - used):
+        in_background(delete_derivatives, name)
+
+
+def _write(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def _resize(image, width):
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def build_derivatives(field_file, force=False):
+    """
+    توليد نسخ صورة (ImageFieldFile) إذا تغيّر الأصل.
+    تُرجع (manifest, generated) حيث generated تعني أن النسخ أُعيد توليدها.
+    """
+    storage = field_file.storage
+    name = field_file.name
+
+    with storage.open(name, 'rb') as fh:
+        source = fh.read()
+    digest = hashlib.sha1(source).hexdigest()
+
+    manifest = load_manifest(name, storage)
+    if manifest and manifest.get('hash') == digest and not force:
+        return manifest, False
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(source)))
+    image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    widths = [width for width in WIDTHS if width < image.width] or [image.width]
+    variants = {}
+    for fmt in supported_formats():
+        variants[fmt] = {}
+        for width in widths:
+            derivative = derivative_name(name, width, fmt)
+            _write(storage, derivative, _encode(_resize(image, width), fmt, quality=QUALITY[fmt]))
+            variants[fmt][str(width)] = derivative
+
+    placeholder = _encode(_resize(image, min(PLACEHOLDER_WIDTH, image.width)), 'webp', quality=30)
+
+    manifest = {
+        'source': name,
+        'hash': digest,
+        'width': image.width,
+        'height': image.height,
+        'variants': variants,
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(placeholder).decode(),
+    }
+    _write(storage, manifest_name(name), json.dumps(manifest).encode())
+    return manifest, True
+
+
+def ensure_derivatives(field_file):
+    """مثل build_derivatives لكن لا يفشل الحفظ إذا كانت الصورة تالفة"""
+    if not field_file:
+        return False
+    try:
+        _, generated = build_derivatives(field_file)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception('Could not build image derivatives for %s', field_file.name)
+        return False
+    return generated
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-derivatives')
+
+
+def in_background(func, *args):
+    """تشغيل عمل على الصور في الخيط الخلفي (الأخطاء تُسجَّل ولا تضيع)"""
+    def run():
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Image background task failed')
+    return _executor.submit(run)
+
+
+def _srcset(storage, variants):
+    return ', '.join(
+        f'{storage.url(path)} {width}w'
+        for width, path in sorted(variants.items(), key=lambda item: int(item[0]))
+    )
+
+
+def responsive_image(field_file):
+    """بيانات srcset والخلفية الضبابية لصورة، أو النسخة الأصلية فقط إن لم تُولَّد"""
+    if not field_file:
+        return ResponsiveImage('', None, None, '', '', '', '')
+
+    storage = field_file.storage
+    url = field_file.url
+    manifest = load_manifest(field_file.name, storage)
+    if not manifest:
+        return ResponsiveImage(url, None, None, url, '', '', '')
+
+    variants = manifest.get('variants', {})
+    webp = variants.get('webp', {})
+    thumbnail = webp.get(str(THUMBNAIL_WIDTH)) or (webp[min(webp, key=int)] if webp else None)
+    return ResponsiveImage(
+        url=url,
+        width=manifest.get('width'),
+        height=manifest.get('height'),
+        thumbnail_url=storage.url(thumbnail) if thumbnail else url,
+        webp_srcset=_srcset(storage, variants.get('webp', {})),
+        avif_srcset=_srcset(storage, variants.get('avif', {})),
+        placeholder=manifest.get('placeholder', ''),
+    )
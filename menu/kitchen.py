@@ -0,0 +1,156 @@
+"""
+بث الطلبات لشاشة المطبخ
+
+مصدر الأحداث هو قاعدة البيانات نفسها، فتصل لكل العمال (workers): كل حفظ
+لطلب أو لسطر منه يغيّر Order.updated_at، وشاشة المطبخ تطلب الطلبات المعدّلة
+بعد آخر مؤشر (updated_at، id) عبر Server-Sent Events، أو عبر long-poll إذا
+لم يتوفر EventSource. الانتظار بين الاستعلامات KITCHEN_POLL_INTERVAL ثانية،
+وتحت ASGI بدون حجز خيوط (await_events).
+
+معرّف الحدث "<generation>-<microseconds>-<id>". حذف طلب لا يترك صفاً يُقرأ،
+فيغيّر رقم الجيل (generation) في الكاش المشترك (caches['shared'])، ومعرّف من
+جيل آخر يُرجع reset فتعيد الشاشة تحميل الطلبات الحالية.
+"""
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from .catalog import CACHE_ALIAS
+
+ACTIVE_STATUSES = ('pending', 'confirmed', 'preparing', 'ready')
+GENERATION_KEY = 'menu:kitchen:generation'
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# أقصى عدد طلبات في دفعة واحدة، والباقي في الاستعلام التالي
+BATCH_SIZE = 100
+
+
+def generation():
+    """رقم الجيل الحالي (يتغير مع كل حذف لطلب)"""
+    return caches[CACHE_ALIAS].get_or_set(GENERATION_KEY, lambda: uuid.uuid4().hex[:8], timeout=None)
+
+
+def new_generation():
+    """جيل جديد: كل الشاشات تعيد التحميل"""
+    caches[CACHE_ALIAS].set(GENERATION_KEY, uuid.uuid4().hex[:8], timeout=None)
+
+
+def event_id(updated_at, order_id, current=None):
+    micros = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'{current or generation()}-{micros}-{order_id}'
+
+
+def last_id():
+    """مؤشر آخر طلب معدّل (نقطة البداية لشاشة جديدة)"""
+    from .models import Order
+
+    latest = Order.objects.order_by('-updated_at', '-id').values_list('updated_at', 'id').first()
+    return event_id(*(latest or (EPOCH, 0)))
+
+
+def _parse(last_event_id, current):
+    """(updated_at، id) من معرّف العميل، أو None إذا كان من جيل آخر"""
+    parts = str(last_event_id).split('-')
+    if len(parts) != 3 or parts[0] != current or not (parts[1].isdigit() and parts[2].isdigit()):
+        return None
+    return EPOCH + timedelta(microseconds=int(parts[1])), int(parts[2])
+
+
+def since(last_event_id):
+    """
+    الأحداث بعد last_event_id كقائمة (id, event, data)، أو None إذا لم يعد
+    ممكناً الاستئناف (يجب إعادة التحميل)
+    """
+    from .models import Order
+
+    current = generation()
+    cursor = _parse(last_event_id, current)
+    if cursor is None:
+        return None
+    updated_at, order_id = cursor
+    # الكتابات متسلسلة (BEGIN IMMEDIATE في SQLite، وقصيرة في PostgreSQL)، فترتيب
+    # updated_at هو ترتيب التثبيت تقريباً
+    orders = (
+        Order.objects.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=order_id))
+        .prefetch_related('items')
+        .order_by('updated_at', 'id')[:BATCH_SIZE]
+    )
+    return [
+        (event_id(order.updated_at, order.id, current), 'order', order_payload(order))
+        for order in orders
+    ]
+
+
+def wait(last_event_id, timeout):
+    """مثل since لكن يعيد الاستعلام حتى timeout ثانية إذا لم توجد أحداث جديدة"""
+    deadline = time.monotonic() + timeout
+    while True:
+        events = since(last_event_id)
+        remaining = deadline - time.monotonic()
+        if events is None or events or remaining <= 0:
+            return events
+        time.sleep(min(settings.KITCHEN_POLL_INTERVAL, remaining))
+
+
+async def await_events(last_event_id, timeout):
+    """نسخة async من wait: لا تحجز خيطاً أثناء الانتظار"""
+    deadline = time.monotonic() + timeout
+    while True:
+        events = await sync_to_async(since)(last_event_id)
+        remaining = deadline - time.monotonic()
+        if events is None or events or remaining <= 0:
+            return events
+        await asyncio.sleep(min(settings.KITCHEN_POLL_INTERVAL, remaining))
+
+
+def order_payload(order):
+    """بيانات الطلب كما تعرضها شاشة المطبخ (order.items محمّلة مسبقاً)"""
+    return {
+        'id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+        'status_display': order.get_status_display(),
+        'active': order.status in ACTIVE_STATUSES,
+        'delivery_type': order.delivery_type,
+        'delivery_display': order.get_delivery_type_display(),
+        'customer_name': order.customer_name,
+        'address': order.address,
+        'notes': order.notes,
+        'total': order.total,
+        'created_at': order.created_at,
+        'items': [
+            {'name': item.name, 'quantity': item.quantity, 'notes': item.notes}
+            for item in order.items.all()
+        ],
+    }
+
+
+def active_orders():
+    """الطلبات الجارية للعرض الأولي (استعلامان مهما كان عددها)"""
+    from .models import Order
+
+    orders = (
+        Order.objects.filter(status__in=ACTIVE_STATUSES)
+        .prefetch_related('items')
+        .order_by('created_at')
+    )
+    return [order_payload(order) for order in orders]
+
+
+def touch_order(order_id):
+    """تعديل سطر من الطلب يغيّر updated_at للطلب فتراه الشاشات"""
+    from .models import Order
+
+    Order.objects.filter(pk=order_id).update(updated_at=timezone.now())
+
+
+def encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from menu import catalog
+from menu.images import build_derivatives
+from menu.models import Category, MenuItem
+
+
+class Command(BaseCommand):
+    help = 'توليد نسخ الصور المتجاوبة (WebP/AVIF وخلفية ضبابية) للصور الموجودة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='إعادة التوليد حتى لو لم تتغير الصورة الأصلية')
+
+    def handle(self, *args, **options):
+        generated = skipped = failed = 0
+
+        for model in (Category, MenuItem):
+            for obj in model.objects.exclude(image='').exclude(image__isnull=True).iterator():
+                try:
+                    _, built = build_derivatives(obj.image, force=options['force'])
+                except (OSError, ValueError) as exc:
+                    failed += 1
+                    self.stderr.write(f'{obj.image.name}: {exc}')
+                    continue
+                if built:
+                    generated += 1
+                    self.stdout.write(f'  {obj.image.name}')
+                else:
+                    skipped += 1
+
+        if generated:
+            catalog.invalidate()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'تم توليد {generated} صورة، {skipped} بدون تغيير، {failed} فشلت'
+        ))
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from menu.cleanup import DEFAULT_BATCH_SIZE, DEFAULT_PAUSE, cleanup_expired
+
+
+class Command(BaseCommand):
+    help = 'حذف السلات المهجورة التي لم تعد لها جلسة حية، على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='عرض الأعداد فقط بدون حذف')
+        parser.add_argument('--max-age', type=int, default=None,
+                            help=f'عمر السلة بالثواني (الافتراضي CART_MAX_AGE = {settings.CART_MAX_AGE})')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='عدد الصفوف في كل دفعة')
+        parser.add_argument('--pause', type=float, default=DEFAULT_PAUSE,
+                            help='استراحة بالثواني بين الدفعات')
+
+    def handle(self, *args, **options):
+        counts = cleanup_expired(
+            max_age=options['max_age'],
+            batch_size=max(1, options['batch_size']),
+            dry_run=options['dry_run'],
+            pause=options['pause'],
+        )
+        verb = 'سيُحذف' if options['dry_run'] else 'تم حذف'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {counts['carts']} سلة، {counts['cart_items']} عنصر"
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from menu.importexport import COLUMNS, FORMATS, encode_rows, export_rows, guess_format
+
+
+class Command(BaseCommand):
+    help = 'تصدير الأقسام والمنتجات إلى CSV أو JSON Lines (نفس صيغة import_menu)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', default='-', help='مسار الملف، أو - للكتابة في stdout')
+        parser.add_argument('--format', choices=sorted(FORMATS),
+                            help='صيغة الملف (الافتراضي حسب الامتداد، أو csv)')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        fmt = options['format'] or guess_format(path)
+        lines = encode_rows(export_rows(), COLUMNS, fmt)
+
+        if path == '-':
+            # self.stdout: يُلتقط مع call_command(stdout=...) ويُكتب كما هو بدون سطر زائد
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as fh:
+            fh.writelines(lines)
@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu.importexport import FORMATS, export_orders, guess_format, orders_between
+from menu.models import Order
+
+
+def month(value):
+    return date.fromisoformat(f'{value}-01')
+
+
+class Command(BaseCommand):
+    help = 'تصدير الطلبات وأسطرها إلى CSV أو JSON Lines للمحاسبة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', default='-', help='مسار الملف، أو - للكتابة في stdout')
+        parser.add_argument('--format', choices=sorted(FORMATS),
+                            help='صيغة الملف (الافتراضي حسب الامتداد، أو csv)')
+        parser.add_argument('--from', dest='start', type=date.fromisoformat,
+                            help='من يوم YYYY-MM-DD (شامل)')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help='إلى يوم YYYY-MM-DD (شامل)')
+        parser.add_argument('--month', type=month, help='شهر كامل YYYY-MM (بدل --from و --to)')
+        parser.add_argument('--status', action='append', choices=[s for s, _ in Order.STATUS_CHOICES],
+                            help='حالة الطلب (يمكن تكراره، الافتراضي كل الحالات)')
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if options['month']:
+            if start or end:
+                raise CommandError('--month لا يُستعمل مع --from أو --to')
+            start = options['month']
+            end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+
+        orders = orders_between(start, end)
+        if options['status']:
+            orders = orders.filter(status__in=options['status'])
+
+        path = options['file']
+        lines = export_orders(orders, options['format'] or guess_format(path))
+        if path == '-':
+            # self.stdout: يُلتقط مع call_command(stdout=...) ويُكتب كما هو بدون سطر زائد
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as fh:
+            fh.writelines(lines)
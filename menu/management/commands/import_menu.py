@@ -0,0 +1,56 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from menu.importexport import BATCH_SIZE, FORMATS, MenuImportError, guess_format, import_menu, read_rows
+
+
+class Command(BaseCommand):
+    help = 'استيراد الأقسام والمنتجات من CSV أو JSON Lines (المفتاح: اسم القسم واسم المنتج)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='مسار الملف، أو - للقراءة من stdin')
+        parser.add_argument('--format', choices=sorted(FORMATS),
+                            help='صيغة الملف (الافتراضي حسب الامتداد، أو csv)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='عدد الصفوف في كل دفعة')
+        parser.add_argument('--images-dir',
+                            help='مجلد تُنسخ منه الصور غير الموجودة في مساحة الوسائط')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='عدد الخيوط لمعالجة الصور')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='التحقق من الملف وعرض الأعداد بدون حفظ')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        fmt = options['format'] or guess_format(path)
+        started = time.monotonic()
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(exc)
+        try:
+            counts = import_menu(
+                read_rows(stream, fmt),
+                batch_size=max(1, options['batch_size']),
+                images_dir=options['images_dir'],
+                workers=options['workers'],
+                dry_run=options['dry_run'],
+            )
+        except MenuImportError as exc:
+            raise CommandError(exc)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for name in counts.get('failed_images', []):
+            self.stderr.write(f'  صورة فشلت: {name}')
+        verb = 'سيُستورد' if options['dry_run'] else 'تم استيراد'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {counts['rows']} صف في {time.monotonic() - started:.1f} ثانية: "
+            f"{counts['categories_created']} قسم جديد، {counts['categories_updated']} قسم معدّل، "
+            f"{counts['items_created']} منتج جديد، {counts['items_updated']} منتج معدّل"
+            + (f"، {counts['images_built']} صورة" if 'images_built' in counts else '')
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from menu.reports import update_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'تحديث ملخصات المبيعات (اليومية، حسب الساعة، وحسب المنتج) تدريجياً'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='إعادة حساب كل الأيام من البداية')
+
+    def handle(self, *args, **options):
+        days = update_sales_rollups(rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(f'تم تحديث ملخصات {days} يوم'))
@@ -0,0 +1,265 @@
+"""
+قياس الأداء لكل طلب
+
+يُجمع لكل طلب: عدد استعلامات SQL وزمنها، زمن عرض كل قالب، وزمن كل
+context processor. تُرسل في رأس Server-Timing (تظهر في أدوات المطوّر)
+وتُضاف إلى هيستوغرامات لكل مشهد تُعرض بصيغة Prometheus على /metrics/.
+
+القياسات في ContextVar فتشمل ما يجري في خيوط sync_to_async تحت ASGI.
+الهيستوغرامات داخل العملية: مع عدة عمال gunicorn كل عامل له أرقامه.
+"""
+import functools
+import hmac
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+from django.template.loaders import base, cached
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = ContextVar('request_timings', default=None)
+
+
+# ============ الهيستوغرامات ============
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """هيستوغرام Prometheus بتسميات (labels) وحدود ثابتة"""
+
+    def __init__(self, name, documentation, labelnames, buckets=TIME_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(buckets) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.bounds), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self):
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, counts, total in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.bounds, counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, le=_number(bound))} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Counter:
+    """عدّاد Prometheus بتسميات"""
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + 1
+
+    def collect(self):
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in snapshot:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {value}'
+
+
+REQUEST_SECONDS = Histogram('menu_request_duration_seconds', 'Request duration in seconds', ['view'])
+RESPONSES = Counter('menu_responses_total', 'Responses by status code', ['view', 'status'])
+DB_SECONDS = Histogram('menu_db_duration_seconds', 'Time spent in SQL per request', ['view'])
+DB_QUERIES = Histogram('menu_db_queries', 'SQL queries per request', ['view'], COUNT_BUCKETS)
+TEMPLATE_SECONDS = Histogram('menu_template_render_seconds', 'Template render time', ['view', 'template'])
+CONTEXT_PROCESSOR_SECONDS = Histogram(
+    'menu_context_processor_seconds', 'Context processor time', ['view', 'processor'],
+)
+STEP_SECONDS = Histogram('menu_step_seconds', 'Time of named steps inside a view', ['view', 'step'])
+
+THROTTLED = Counter('menu_throttled_total', 'Requests rejected by rate limiting', ['view'])
+
+REGISTRY = [
+    REQUEST_SECONDS, RESPONSES, DB_SECONDS, DB_QUERIES, TEMPLATE_SECONDS, CONTEXT_PROCESSOR_SECONDS,
+    STEP_SECONDS, THROTTLED,
+]
+
+
+def has_token(request):
+    """الطلب يحمل Authorization: Bearer METRICS_TOKEN"""
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(authorization, f'Bearer {token}')
+
+
+def render_metrics():
+    """كل المقاييس بصيغة Prometheus النصية"""
+    return '\n'.join(line for metric in REGISTRY for line in metric.collect()) + '\n'
+
+
+# ============ قياسات الطلب ============
+
+class RequestTimings:
+    """أزمنة طلب واحد: (النوع، الاسم) -> [العدد، الثواني]"""
+
+    __slots__ = ('entries',)
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, kind, name, seconds):
+        entry = self.entries.get((kind, name))
+        if entry is None:
+            self.entries[(kind, name)] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def server_timing(self, total):
+        """قيمة رأس Server-Timing"""
+        parts = [f'total;dur={total * 1000:.1f}']
+        for (kind, name), (count, seconds) in self.entries.items():
+            if kind == 'db':
+                desc = f'{count} queries'
+            else:
+                desc = name if count == 1 else f'{name} x{count}'
+            desc = desc.replace('"', "'")
+            parts.append(f'{kind};desc="{desc}";dur={seconds * 1000:.1f}')
+        return ', '.join(parts)
+
+    def observe(self, view, status, total):
+        """إضافة الطلب إلى الهيستوغرامات"""
+        REQUEST_SECONDS.observe(total, view)
+        RESPONSES.inc(view, str(status))
+        queries, db_seconds = self.entries.get(('db', ''), (0, 0.0))
+        DB_QUERIES.observe(queries, view)
+        DB_SECONDS.observe(db_seconds, view)
+        for (kind, name), (_, seconds) in self.entries.items():
+            if kind == 'tpl':
+                TEMPLATE_SECONDS.observe(seconds, view, name)
+            elif kind == 'cp':
+                CONTEXT_PROCESSOR_SECONDS.observe(seconds, view, name)
+            elif kind == 'step':
+                STEP_SECONDS.observe(seconds, view, name)
+
+
+def start():
+    """بدء قياس طلب. تُرجع (timings, token) لـ finish"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+# ============ SQL ============
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', '', time.perf_counter() - started)
+
+
+def _install_query_timer(sender=None, connection=None, **kwargs):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def install_query_timer():
+    """قياس الاستعلامات على كل اتصال (الحالية والجديدة)"""
+    connection_created.connect(_install_query_timer, dispatch_uid='menu.metrics.queries')
+    for connection in connections.all(initialized_only=True):
+        _install_query_timer(connection=connection)
+
+
+# ============ القوالب و context processors ============
+
+class TimedTemplate(Template):
+    """قالب يسجّل زمن عرضه (يشمل القوالب المضمّنة فيه)"""
+
+    def render(self, context):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context)
+        started = time.perf_counter()
+        try:
+            return super().render(context)
+        finally:
+            timings.add('tpl', self.name or '<string>', time.perf_counter() - started)
+
+
+class TimedLoader(base.Loader):
+    def get_template(self, template_name, skip=None):
+        template = super().get_template(template_name, skip)
+        # نفس القالب المُجمَّع، فقط render مقيس
+        template.__class__ = TimedTemplate
+        return template
+
+
+class CachedLoader(cached.Loader, TimedLoader):
+    """cached.Loader تُنشأ قوالبه (مرة واحدة) كـ TimedTemplate"""
+
+
+@contextmanager
+def timed(name, kind='step'):
+    """تسجيل زمن كتلة داخل المشهد باسمها (مثلاً تحميل السلة)"""
+    timings = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add(kind, name, time.perf_counter() - started)
+
+
+def timed_context_processor(func):
+    """تسجيل زمن context processor باسمه"""
+
+    @functools.wraps(func)
+    def wrapper(request):
+        with timed(func.__name__, kind='cp'):
+            return func(request)
+
+    return wrapper
@@ -0,0 +1,292 @@
+"""
+وسائط (middleware) خاصة بالمشروع
+
+كلها تعمل مع WSGI و ASGI معاً حتى لا يُحوَّل كل طلب async إلى خيط.
+"""
+import math
+import mimetypes
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject, empty
+
+from . import metrics, ratelimit
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+SHORT_CACHE = 'public, max-age=300'
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+# ============ الملفات الثابتة ============
+
+class StaticFilesMiddleware:
+    """
+    تقديم الملفات الثابتة المجمّعة (collectstatic) من STATIC_ROOT مباشرة:
+    - النسخة .br أو .gz المضغوطة مسبقاً حسب Accept-Encoding
+    - الأسماء ذات البصمة تُخزَّن سنة كاملة (immutable)
+    - غيرها بمدة قصيرة مع Last-Modified
+    إذا لم يوجد الملف يمرّ الطلب كالعادة (في وضع التطوير تقدّمه config/urls.py).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = str(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        self._hashed = None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.static_response(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.static_response(request) or await self.get_response(request)
+
+    def static_response(self, request):
+        if self.root and request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            return self.serve(request, request.path[len(self.prefix):])
+        return None
+
+    def hashed_names(self):
+        """الأسماء ذات البصمة من ملف manifest (تُقرأ مرة واحدة)"""
+        if self._hashed is None:
+            try:
+                self._hashed = frozenset(staticfiles_storage.hashed_files.values())
+            except AttributeError:
+                self._hashed = frozenset()
+        return self._hashed
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except ValueError:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        immutable = name in self.hashed_names()
+
+        if not immutable:
+            since = request.headers.get('If-Modified-Since')
+            if since:
+                try:
+                    if int(parsedate_to_datetime(since).timestamp()) >= int(stat.st_mtime):
+                        response = HttpResponseNotModified()
+                        response['Last-Modified'] = last_modified
+                        return response
+                except (TypeError, ValueError):
+                    pass
+
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding = None
+        for candidate, suffix in ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                path, encoding = path + suffix, candidate
+                break
+
+        response = FileResponse(open(path, 'rb'), content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if encoding or os.path.isfile(path + '.gz'):
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['Cache-Control'] = IMMUTABLE_CACHE if immutable else SHORT_CACHE
+        response['Last-Modified'] = last_modified
+        return response
+
+
+class PreloadMiddleware:
+    """رأس Link لصفحات HTML حتى يبدأ المتصفح تحميل CSS و JS مبكراً"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._header = None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def header(self):
+        if self._header is None:
+            self._header = ', '.join(
+                f'<{staticfiles_storage.url(name)}>; rel=preload; as={kind}'
+                for name, kind in getattr(settings, 'STATIC_PRELOAD', [])
+            )
+        return self._header
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (
+            response.status_code == 200
+            and response.get('Content-Type', '').startswith('text/html')
+            and 'Link' not in response
+            and getattr(request.resolver_match, 'app_name', None) != 'admin'
+            and self.header()
+        ):
+            response['Link'] = self.header()
+        return response
+
+
+# ============ قياس الأداء ============
+
+class MetricsMiddleware:
+    """
+    إضافة كل طلب إلى هيستوغرامات /metrics/ (menu/metrics.py)، ورأس
+    Server-Timing (SQL، القوالب، context processors، الإجمالي) بنفس شروط
+    /metrics/ فقط: DEBUG، أو METRICS_TOKEN، أو موظف. يُعطَّل بـ PERFORMANCE_METRICS=False.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.install_query_timer()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = metrics.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish(token)
+        return self.process_response(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timings, token = metrics.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish(token)
+        return self.process_response(request, response, timings, time.perf_counter() - started)
+
+    def process_response(self, request, response, timings, total):
+        match = getattr(request, 'resolver_match', None)
+        # اسم المشهد لا المسار حتى لا تتضخم التسميات (404 كلها "unmatched")
+        view = match.view_name if match else 'unmatched'
+        timings.observe(view, response.status_code, total)
+        if self.show_timings(request):
+            response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+    def show_timings(self, request):
+        if settings.DEBUG or metrics.has_token(request):
+            return True
+        # المستخدم فقط إذا حمّله الطلب: بدون استعلام جلسة إضافي لكل زائر
+        # (ولا استعلام sync داخل __acall__)
+        user = getattr(request, 'user', None)
+        if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+            return False
+        return user.is_active and user.is_staff
+
+
+# ============ حدود الطلبات ============
+
+class RateLimitMiddleware:
+    """
+    حدود token bucket لكل جلسة ولكل IP على مسارات settings.RATE_LIMITS، في
+    الكاش المشترك بين العمال (menu/ratelimit.py). الرد 429 مع Retry-After قبل الجلسة و CSRF والمشهد،
+    فالطلبات المرفوضة لا تلمس قاعدة البيانات. يُعطَّل بـ RATE_LIMIT_ENABLED=False.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not (settings.RATE_LIMIT_ENABLED and settings.RATE_LIMITS):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._endpoints = None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        endpoint = self.limits(request)
+        if endpoint:
+            name, keys = endpoint
+            wait = ratelimit.buckets.take(keys)
+            if wait:
+                return self.throttled(name, wait)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        endpoint = self.limits(request)
+        if endpoint:
+            name, keys = endpoint
+            # الكاش المشترك (ملفات أو Redis) بعيداً عن حلقة الأحداث
+            wait = await sync_to_async(ratelimit.buckets.take)(keys)
+            if wait:
+                return self.throttled(name, wait)
+        return await self.get_response(request)
+
+    def endpoints(self):
+        """المسار -> (اسم المسار، [(النطاق، السعة، المعدل)]) من أسماء RATE_LIMITS"""
+        if self._endpoints is None:
+            self._endpoints = {
+                reverse(name): (name, [(scope, *ratelimit.parse_rate(rate)) for scope, rate in limits.items()])
+                for name, limits in settings.RATE_LIMITS.items()
+            }
+        return self._endpoints
+
+    def identity(self, request, scope):
+        if scope == 'session':
+            # الكوكي فقط: بدون تحميل الجلسة (بدون جلسة يبقى حد الـ IP)
+            return request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        address = request.META.get(settings.RATE_LIMIT_IP_HEADER) or request.META.get('REMOTE_ADDR', '')
+        # X-Forwarded-For: آخر عنوان هو الذي رآه البروكسي الموثوق
+        return address.rsplit(',', 1)[-1].strip()
+
+    def limits(self, request):
+        """(اسم المسار، [(المفتاح، السعة، المعدل)]) أو None لمسار بدون حدود"""
+        endpoint = self.endpoints().get(request.path)
+        if endpoint is None:
+            return None
+
+        name, limits = endpoint
+        keys = []
+        for scope, capacity, rate in limits:
+            identity = self.identity(request, scope)
+            if identity:
+                keys.append((f'{name}:{scope}:{identity}', capacity, rate))
+        return name, keys
+
+    def throttled(self, name, wait):
+        metrics.THROTTLED.inc(name)
+        response = JsonResponse({'success': False, 'error': 'طلبات كثيرة، حاول بعد قليل'}, status=429)
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='مفتاح عدم التكرار'),
+        ),
+    ]
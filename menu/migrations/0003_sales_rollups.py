@@ -0,0 +1,91 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('status', models.CharField(choices=[('pending', 'قيد الانتظار'), ('confirmed', 'مؤكد'), ('preparing', 'قيد التحضير'), ('ready', 'جاهز'), ('delivered', 'تم التوصيل'), ('cancelled', 'ملغي')], max_length=20, verbose_name='الحالة')),
+                ('delivery_type', models.CharField(choices=[('pickup', 'استلام من المطعم'), ('delivery', 'توصيل')], max_length=20, verbose_name='نوع التوصيل')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='الإيرادات')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='عدد الطلبات')),
+            ],
+            options={
+                'verbose_name': 'مبيعات يومية',
+                'verbose_name_plural': 'المبيعات اليومية',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('status', models.CharField(choices=[('pending', 'قيد الانتظار'), ('confirmed', 'مؤكد'), ('preparing', 'قيد التحضير'), ('ready', 'جاهز'), ('delivered', 'تم التوصيل'), ('cancelled', 'ملغي')], max_length=20, verbose_name='الحالة')),
+                ('delivery_type', models.CharField(choices=[('pickup', 'استلام من المطعم'), ('delivery', 'توصيل')], max_length=20, verbose_name='نوع التوصيل')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='الإيرادات')),
+                ('hour', models.PositiveSmallIntegerField(verbose_name='الساعة')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='عدد الطلبات')),
+            ],
+            options={
+                'verbose_name': 'مبيعات الساعة',
+                'verbose_name_plural': 'المبيعات حسب الساعة',
+                'ordering': ['-date', 'hour'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.DateTimeField(blank=True, null=True, verbose_name='آخر تحديث للطلبات')),
+                ('pending_dates', models.JSONField(blank=True, default=list, verbose_name='أيام بانتظار إعادة الحساب')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التشغيل')),
+            ],
+            options={
+                'verbose_name': 'حالة الملخصات',
+                'verbose_name_plural': 'حالة الملخصات',
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('status', models.CharField(choices=[('pending', 'قيد الانتظار'), ('confirmed', 'مؤكد'), ('preparing', 'قيد التحضير'), ('ready', 'جاهز'), ('delivered', 'تم التوصيل'), ('cancelled', 'ملغي')], max_length=20, verbose_name='الحالة')),
+                ('delivery_type', models.CharField(choices=[('pickup', 'استلام من المطعم'), ('delivery', 'توصيل')], max_length=20, verbose_name='نوع التوصيل')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='الإيرادات')),
+                ('name', models.CharField(max_length=200, verbose_name='اسم المنتج')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='الكمية')),
+                ('menu_item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='menu.menuitem', verbose_name='المنتج')),
+            ],
+            options={
+                'verbose_name': 'مبيعات منتج',
+                'verbose_name_plural': 'مبيعات المنتجات',
+                'ordering': ['-date', '-quantity'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hourlysales',
+            constraint=models.UniqueConstraint(fields=('date', 'hour', 'status', 'delivery_type'), name='unique_hourly_sales'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysales',
+            constraint=models.UniqueConstraint(fields=('date', 'status', 'delivery_type'), name='unique_daily_sales'),
+        ),
+        migrations.AddIndex(
+            model_name='itemsales',
+            index=models.Index(fields=['date'], name='item_sales_date_idx'),
+        ),
+    ]
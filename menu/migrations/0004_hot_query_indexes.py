@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['updated_at'], name='cart_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['order', 'name'], name='category_active_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['order', '-created_at'], name='item_available_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['category', 'order', '-created_at'], name='item_available_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='آخر تحديث'),
+            preserve_default=False,
+        ),
+    ]
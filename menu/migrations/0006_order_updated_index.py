@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ),
+    ]
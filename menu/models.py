@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
 from django.utils import timezone
 import uuid
 
@@ -12,11 +13,16 @@ class Category(models.Model):
     order = models.PositiveIntegerField('الترتيب', default=0)
     is_active = models.BooleanField('نشط', default=True)
     created_at = models.DateTimeField('تاريخ الإنشاء', auto_now_add=True)
+    updated_at = models.DateTimeField('آخر تحديث', auto_now=True)
 
     class Meta:
         verbose_name = 'قسم'
         verbose_name_plural = 'الأقسام'
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['order', 'name'], condition=models.Q(is_active=True),
+                         name='category_active_order_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -46,11 +52,32 @@ class MenuItem(models.Model):
         verbose_name = 'منتج'
         verbose_name_plural = 'المنتجات'
         ordering = ['order', '-created_at']
+        # فهارس جزئية للمنتجات المتوفرة فقط: الكتالوج وعدّاد الأقسام
+        indexes = [
+            models.Index(fields=['order', '-created_at'], condition=models.Q(is_available=True),
+                         name='item_available_order_idx'),
+            models.Index(fields=['category', 'order', '-created_at'],
+                         condition=models.Q(is_available=True),
+                         name='item_available_category_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.price} درهم"
 
 
+class CartQuerySet(models.QuerySet):
+
+    def with_totals(self):
+        """عدد القطع (items_quantity) والمجموع (items_total) لكل سلة في نفس الاستعلام"""
+        return self.annotate(
+            items_quantity=Sum('items__quantity'),
+            items_total=Sum(ExpressionWrapper(
+                F('items__quantity') * F('items__menu_item__price'),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            )),
+        )
+
+
 class Cart(models.Model):
     """سلة التسوق"""
     session_key = models.CharField('مفتاح الجلسة', max_length=100, unique=True)
@@ -60,17 +87,29 @@ class Cart(models.Model):
     class Meta:
         verbose_name = 'سلة'
         verbose_name_plural = 'السلات'
+        indexes = [models.Index(fields=['updated_at'], name='cart_updated_idx')]
+
+    objects = CartQuerySet.as_manager()
 
     def __str__(self):
         return f"سلة {self.session_key[:8]}"
 
+    def _totals(self):
+        """قيم with_totals()، أو استعلام واحد لسلة لم تُقرأ بها"""
+        if not hasattr(self, 'items_total'):
+            totals = Cart.objects.with_totals().filter(pk=self.pk).values('items_quantity', 'items_total').first() or {}
+            self.items_quantity = totals.get('items_quantity')
+            self.items_total = totals.get('items_total')
+
     @property
     def total(self):
-        return sum(item.subtotal for item in self.items.all())
+        self._totals()
+        return self.items_total or 0
 
     @property
     def items_count(self):
-        return sum(item.quantity for item in self.items.all())
+        self._totals()
+        return self.items_quantity or 0
 
 
 class CartItem(models.Model):
@@ -121,6 +160,8 @@ class Order(models.Model):
     total = models.DecimalField('المجموع', max_digits=10, decimal_places=2)
     status = models.CharField('الحالة', max_length=20, 
                              choices=STATUS_CHOICES, default='pending')
+    idempotency_key = models.CharField('مفتاح عدم التكرار', max_length=64, unique=True,
+                                       null=True, blank=True, editable=False)
     created_at = models.DateTimeField('تاريخ الطلب', auto_now_add=True)
     updated_at = models.DateTimeField('آخر تحديث', auto_now=True)
 
@@ -128,6 +169,13 @@ class Order(models.Model):
         verbose_name = 'طلب'
         verbose_name_plural = 'الطلبات'
         ordering = ['-created_at']
+        # قائمة الطلبات في الإدارة (مع فلتر الحالة أو بدونه) وشاشة المطبخ،
+        # و updated_at لنقطة تقدم ملخصات المبيعات (reports.update_sales_rollups)
+        indexes = [
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ]
 
     def __str__(self):
         return f"طلب #{self.order_number}"
@@ -159,3 +207,74 @@ class OrderItem(models.Model):
     @property
     def subtotal(self):
         return self.price * self.quantity
+
+
+# ============ ملخصات المبيعات ============
+
+class SalesRollupBase(models.Model):
+    """الحقول المشتركة لجداول ملخصات المبيعات (حسب اليوم المحلي)"""
+    date = models.DateField('التاريخ')
+    status = models.CharField('الحالة', max_length=20, choices=Order.STATUS_CHOICES)
+    delivery_type = models.CharField('نوع التوصيل', max_length=20, choices=Order.DELIVERY_CHOICES)
+    revenue = models.DecimalField('الإيرادات', max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(SalesRollupBase):
+    """عدد الطلبات والإيرادات لكل يوم"""
+    orders_count = models.PositiveIntegerField('عدد الطلبات', default=0)
+
+    class Meta:
+        verbose_name = 'مبيعات يومية'
+        verbose_name_plural = 'المبيعات اليومية'
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status', 'delivery_type'],
+                                    name='unique_daily_sales'),
+        ]
+
+
+class HourlySales(SalesRollupBase):
+    """عدد الطلبات والإيرادات لكل ساعة"""
+    hour = models.PositiveSmallIntegerField('الساعة')
+    orders_count = models.PositiveIntegerField('عدد الطلبات', default=0)
+
+    class Meta:
+        verbose_name = 'مبيعات الساعة'
+        verbose_name_plural = 'المبيعات حسب الساعة'
+        ordering = ['-date', 'hour']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'hour', 'status', 'delivery_type'],
+                                    name='unique_hourly_sales'),
+        ]
+
+
+class ItemSales(SalesRollupBase):
+    """الكميات المباعة من كل منتج في اليوم"""
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.SET_NULL, null=True,
+                                  related_name='+', verbose_name='المنتج')
+    name = models.CharField('اسم المنتج', max_length=200)
+    quantity = models.PositiveIntegerField('الكمية', default=0)
+
+    class Meta:
+        verbose_name = 'مبيعات منتج'
+        verbose_name_plural = 'مبيعات المنتجات'
+        ordering = ['-date', '-quantity']
+        indexes = [models.Index(fields=['date'], name='item_sales_date_idx')]
+
+
+class SalesRollupState(models.Model):
+    """نقطة التقدم (high-water mark) لتحديث الملخصات، والأيام المعلّقة"""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField('آخر تحديث للطلبات', null=True, blank=True)
+    pending_dates = models.JSONField('أيام بانتظار إعادة الحساب', default=list, blank=True)
+    updated_at = models.DateTimeField('تاريخ التشغيل', auto_now=True)
+
+    class Meta:
+        verbose_name = 'حالة الملخصات'
+        verbose_name_plural = 'حالة الملخصات'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,46 @@
+"""
+صفحات بمؤشر (keyset pagination)
+
+المؤشر هو مفتاح ترتيب آخر عنصر في الصفحة (مشفّر base64)، والصفحة التالية
+تبدأ بعده مباشرة بالبحث الثنائي في قائمة مرتبة. لا يوجد offset: زمن أي صفحة
+ثابت مهما كبرت القائمة، ولا تتكرر العناصر أو تضيع إذا أُضيف منتج أثناء التصفح.
+"""
+import base64
+import binascii
+import json
+from bisect import bisect_right
+
+
+def encode_cursor(key):
+    data = json.dumps(list(key), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """المفتاح من المؤشر، أو None إذا كان فارغاً. ValueError إذا كان تالفاً"""
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('invalid cursor')
+    if not isinstance(key, list) or not all(isinstance(part, (int, float)) for part in key):
+        raise ValueError('invalid cursor')
+    return tuple(key)
+
+
+def keyset_page(rows, after, limit, key):
+    """
+    الصفحة بعد المفتاح after من rows (مرتبة حسب key).
+    تُرجع (العناصر، مؤشر الصفحة التالية أو None)
+    """
+    start = 0
+    if after is not None:
+        try:
+            start = bisect_right(rows, after, key=key)
+        except TypeError:  # مؤشر بطول أو نوع لا يطابق هذا الترتيب
+            raise ValueError('invalid cursor')
+    page = rows[start:start + limit]
+    has_more = start + limit < len(rows)
+    return page, encode_cursor(key(page[-1])) if has_more and page else None
@@ -0,0 +1,122 @@
+"""
+حدود الطلبات (token bucket) في الكاش المشترك
+
+لكل مفتاح (اسم المسار + الجلسة أو IP) دلو سعته N يمتلئ بمعدل N في المدة:
+'30/m' = 30 طلباً متتالياً ثم طلب كل ثانيتين. الدلو محفوظ كوقت واحد (GCRA):
+موعد امتلائه النظري (TAT) في caches['shared']، فالحد واحد لكل العمال. القراءة
+والتحديث خطوة ذرية واحدة: سكربت Lua في Redis، وقفل ملف (flock) في مجلد
+FileBasedCache.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.redis import RedisCache
+
+from .catalog import CACHE_ALIAS
+
+try:
+    import fcntl
+except ImportError:  # Windows: بدون قفل بين العمليات
+    fcntl = None
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+KEY_PREFIX = 'menu:ratelimit:'
+
+# نفس gcra() داخل Redis: KEYS = الدلاء، ARGV = الآن ثم (الفاصل، السماح) لكل دلو
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local wait = 0
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local tat = math.max(tonumber(redis.call('GET', key) or now), now)
+    tats[i] = tat + tonumber(ARGV[2 * i])
+    wait = math.max(wait, tat - now - tonumber(ARGV[2 * i + 1]))
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(tats[i]), 'PX', math.ceil((tats[i] - now) * 1000))
+end
+return '0'
+"""
+
+
+def parse_rate(rate):
+    """'30/m' -> (السعة، الرموز في الثانية)"""
+    count, _, period = rate.partition('/')
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+def gcra(buckets, tats, now):
+    """
+    (الثواني حتى يتوفر رمز في كل الدلاء أو 0، {key: TAT الجديد}).
+    buckets [(key, الفاصل بين رمزين، السماح = (السعة - 1) × الفاصل)].
+    """
+    wait, updates = 0, {}
+    for key, interval, burst in buckets:
+        tat = max(tats.get(key, now), now)
+        wait = max(wait, tat - now - burst)
+        updates[key] = tat + interval
+    return wait, updates
+
+
+@contextmanager
+def file_lock(directory):
+    """قفل بين العمليات على مجلد FileBasedCache"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'ratelimit.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+class TokenBuckets:
+
+    def __init__(self, alias=CACHE_ALIAS):
+        self.alias = alias
+        # كاش بدون قفل بين العمليات (LocMem في الاختبارات): ذري داخل العملية فقط
+        self._lock = threading.Lock()
+
+    def take(self, limits):
+        """
+        سحب رمز من كل دلو في limits [(key, capacity, rate)] معاً.
+        تُرجع 0 إذا سُمح بالطلب، وإلا الثواني حتى يتوفر رمز في كل الدلاء.
+        الطلب المرفوض لا يسحب شيئاً (جلسة مغرقة لا تستهلك حصة باقي الـ IP).
+        """
+        if not limits:
+            return 0
+        cache = caches[self.alias]
+        now = time.time()
+        buckets = [
+            (KEY_PREFIX + hashlib.sha256(key.encode()).hexdigest()[:32], 1 / rate, (capacity - 1) / rate)
+            for key, capacity, rate in limits
+        ]
+        if isinstance(cache, RedisCache):
+            return self._take_redis(cache, buckets, now)
+
+        lock = file_lock(cache._dir) if isinstance(cache, FileBasedCache) else self._lock
+        with lock:
+            wait, updates = gcra(buckets, cache.get_many([key for key, *_ in buckets]), now)
+            if not wait:
+                for key, tat in updates.items():
+                    cache.set(key, tat, math.ceil(tat - now))
+        return wait
+
+    def _take_redis(self, cache, buckets, now):
+        client = cache._cache.get_client(write=True)
+        keys = [cache.make_and_validate_key(key) for key, *_ in buckets]
+        args = [now] + [value for _, interval, burst in buckets for value in (interval, burst)]
+        return float(client.register_script(GCRA_SCRIPT)(keys=keys, args=args))
+
+
+buckets = TokenBuckets()
@@ -0,0 +1,199 @@
+"""
+ملخصات المبيعات
+
+التقارير لا تقرأ جداول Order و OrderItem أبداً، بل جداول ملخصة حسب اليوم
+والساعة والمنتج (DailySales و HourlySales و ItemSales) لكل حالة ونوع توصيل.
+
+التحديث تدريجي: نقطة تقدم (high-water mark) على Order.updated_at تحدد
+الطلبات التي تغيّرت منذ آخر تشغيل، ثم يُعاد حساب أيامها فقط بالكامل. الطلبات
+المحذوفة تُسجَّل أيامها في pending_dates عبر إشارة post_delete.
+"""
+from datetime import date as date_type, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Q, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import DailySales, HourlySales, ItemSales, Order, OrderItem, SalesRollupState
+
+STATE_NAME = 'sales'
+# الطلبات التي حُفظت قبل نقطة التقدم بقليل لكن لم تُثبَّت معاملتها بعد
+OVERLAP = timedelta(minutes=5)
+DAYS_PER_BATCH = 31
+
+
+def get_state():
+    state, _ = SalesRollupState.objects.get_or_create(name=STATE_NAME)
+    return state
+
+
+def mark_dirty(day):
+    """تسجيل يوم يجب إعادة حسابه (مثلاً بعد حذف طلب)"""
+    with transaction.atomic():
+        state = get_state()
+        state = SalesRollupState.objects.select_for_update().get(pk=state.pk)
+        day = day.isoformat()
+        if day not in state.pending_dates:
+            state.pending_dates = state.pending_dates + [day]
+            state.save(update_fields=['pending_dates', 'updated_at'])
+
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _days_filter(days, field='created_at'):
+    """
+    شرط الأيام المحلية days على field: مجال [بداية اليوم، بداية اليوم التالي)
+    لكل سلسلة أيام متتالية مجمّعة بـ Q، حتى يُستعمل فهرس الحقل بدل __date
+    (مثل importexport.orders_between)
+    """
+    ranges = []
+    for day in sorted(days):
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+
+    condition = Q(pk__in=[])
+    for start, end in ranges:
+        condition |= Q(**{
+            f'{field}__gte': _local_midnight(start),
+            f'{field}__lt': _local_midnight(end + timedelta(days=1)),
+        })
+    return condition
+
+
+def _recompute(days):
+    """إعادة حساب كل الملخصات لمجموعة أيام في معاملة واحدة"""
+    orders = Order.objects.filter(_days_filter(days))
+    hourly = list(
+        orders.annotate(day=TruncDate('created_at'), hour=ExtractHour('created_at'))
+        .values('day', 'hour', 'status', 'delivery_type')
+        .annotate(orders_count=Count('id'), revenue=Sum('total'))
+        .order_by()
+    )
+
+    daily = {}
+    for row in hourly:
+        key = (row['day'], row['status'], row['delivery_type'])
+        count, revenue = daily.get(key, (0, 0))
+        daily[key] = (count + row['orders_count'], revenue + (row['revenue'] or 0))
+
+    items = (
+        OrderItem.objects.filter(_days_filter(days, 'order__created_at'))
+        .annotate(day=TruncDate('order__created_at'))
+        .values('day', 'menu_item_id', 'name', 'order__status', 'order__delivery_type')
+        .annotate(
+            quantity_sum=Sum('quantity'),
+            revenue=Sum(ExpressionWrapper(
+                F('price') * F('quantity'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        for model in (DailySales, HourlySales, ItemSales):
+            model.objects.filter(date__in=days).delete()
+        DailySales.objects.bulk_create(
+            DailySales(date=day, status=status, delivery_type=delivery_type,
+                       orders_count=count, revenue=revenue)
+            for (day, status, delivery_type), (count, revenue) in daily.items()
+        )
+        HourlySales.objects.bulk_create(
+            HourlySales(date=row['day'], hour=row['hour'], status=row['status'],
+                        delivery_type=row['delivery_type'], orders_count=row['orders_count'],
+                        revenue=row['revenue'] or 0)
+            for row in hourly
+        )
+        ItemSales.objects.bulk_create(
+            ItemSales(date=row['day'], menu_item_id=row['menu_item_id'], name=row['name'],
+                      status=row['order__status'], delivery_type=row['order__delivery_type'],
+                      quantity=row['quantity_sum'], revenue=row['revenue'] or 0)
+            for row in items
+        )
+
+
+def update_sales_rollups(rebuild=False):
+    """
+    تحديث الملخصات من نقطة التقدم. rebuild=True يعيد حساب كل الأيام.
+    تُرجع عدد الأيام التي أُعيد حسابها.
+    """
+    state = get_state()
+    # بدون ترتيب Meta (-created_at) حتى يُستعمل فهرس updated_at ولا يدخل created_at في DISTINCT
+    changed = Order.objects.order_by()
+    if state.position and not rebuild:
+        changed = changed.filter(updated_at__gt=state.position - OVERLAP)
+
+    high_water = changed.aggregate(Max('updated_at'))['updated_at__max']
+    days = set(changed.annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct())
+    pending = list(state.pending_dates)
+    days.update(date_type.fromisoformat(day) for day in pending)
+    if rebuild:
+        days.update(DailySales.objects.values_list('date', flat=True).distinct())
+
+    ordered = sorted(days)
+    for start in range(0, len(ordered), DAYS_PER_BATCH):
+        _recompute(ordered[start:start + DAYS_PER_BATCH])
+
+    with transaction.atomic():
+        state = SalesRollupState.objects.select_for_update().get(pk=state.pk)
+        if high_water and (state.position is None or high_water > state.position):
+            state.position = high_water
+        # الأيام التي سُجّلت أثناء التشغيل تبقى للمرة القادمة
+        state.pending_dates = [day for day in state.pending_dates if day not in pending]
+        state.save()
+    return len(ordered)
+
+
+# ============ القراءة ============
+
+def sales_summary(days=30, statuses=None):
+    """ملخص آخر days يوم من جداول الملخصات فقط"""
+    today = timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    if statuses is None:
+        statuses = [status for status, _ in Order.STATUS_CHOICES if status != 'cancelled']
+
+    daily = DailySales.objects.filter(date__gte=since, status__in=statuses)
+    totals = daily.aggregate(orders=Sum('orders_count'), revenue=Sum('revenue'))
+
+    by_day = {
+        row['date']: row
+        for row in daily.values('date').annotate(orders=Sum('orders_count'), revenue=Sum('revenue'))
+    }
+    by_delivery = list(
+        daily.values('delivery_type').annotate(orders=Sum('orders_count'), revenue=Sum('revenue'))
+        .order_by('-revenue')
+    )
+    hourly = dict(
+        HourlySales.objects.filter(date=today, status__in=statuses)
+        .values('hour').annotate(orders=Sum('orders_count')).values_list('hour', 'orders')
+    )
+    top_items = list(
+        ItemSales.objects.filter(date__gte=since, status__in=statuses)
+        .values('name').annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('-quantity')[:10]
+    )
+
+    delivery_labels = dict(Order.DELIVERY_CHOICES)
+    for row in by_delivery:
+        row['label'] = delivery_labels.get(row['delivery_type'], row['delivery_type'])
+
+    return {
+        'since': since,
+        'today': today,
+        'orders': totals['orders'] or 0,
+        'revenue': totals['revenue'] or 0,
+        'days': [
+            {'date': day, 'orders': by_day.get(day, {}).get('orders', 0),
+             'revenue': by_day.get(day, {}).get('revenue', 0)}
+            for day in (since + timedelta(days=offset) for offset in range(days))
+        ],
+        'by_delivery': by_delivery,
+        'hours': [{'hour': hour, 'orders': hourly.get(hour, 0)} for hour in range(24)],
+        'top_items': top_items,
+    }
@@ -0,0 +1,276 @@
+"""
+فهرس البحث في القائمة
+
+فهرس مقلوب (inverted index) داخل الذاكرة على اسم المنتج ووصفه، مع:
+- توحيد الكتابة العربية (التشكيل، الهمزات، الألف المقصورة، التاء المربوطة)
+- هيكل صوتي مشترك بين العربية واللاتينية حتى تتطابق "tajine" و"طاجين" و"طجين"
+- مطابقة تقريبية بالثلاثيات (trigrams) للأخطاء الإملائية
+يُحدَّث الفهرس تدريجياً من لقطة الكتالوج: تُعاد فهرسة المنتجات المتغيرة فقط.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from operator import itemgetter
+
+from .catalog import get_catalog, sort_key
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+PHONETIC_SCORE = 0.6
+PHONETIC_PREFIX_SCORE = 0.5
+FUZZY_SCORE = 0.5
+FUZZY_THRESHOLD = 0.4
+
+_TOKEN_RE = re.compile(r'\w+')
+_ARABIC_MARKS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+_ARABIC_FOLD = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه', 'ء': None,
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+
+# الحروف العربية إلى حرف لاتيني واحد، والحروف الصوتية تُحذف
+_ARABIC_PHONETIC = str.maketrans({
+    'ب': 'b', 'ت': 't', 'ث': 't', 'ج': 'j', 'ح': 'h', 'خ': 'k',
+    'د': 'd', 'ذ': 'd', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'x',
+    'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': None, 'غ': 'g',
+    'ف': 'f', 'ق': 'k', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n',
+    'ه': 'h', 'و': None, 'ي': None, 'ا': None,
+})
+
+_LATIN_DIGRAPHS = (
+    ('x', 'ks'), ('ch', 'x'), ('sh', 'x'), ('kh', 'k'), ('gh', 'g'),
+    ('th', 't'), ('dh', 'd'), ('ph', 'f'), ('ck', 'k'),
+)
+
+_LATIN_PHONETIC = str.maketrans({
+    'c': 'k', 'q': 'k', 'p': 'b', 'v': 'f',
+    'a': None, 'e': None, 'i': None, 'o': None, 'u': None, 'y': None, 'w': None,
+})
+
+_ARABIC_RANGE = re.compile('[\u0600-\u06ff]')
+_REPEATS_RE = re.compile(r'(.)\1+')
+
+
+def normalize(text):
+    """توحيد النص: حروف صغيرة، بدون تشكيل أو علامات، وأشكال عربية موحدة"""
+    text = _ARABIC_MARKS_RE.sub('', text.casefold())
+    text = text.translate(_ARABIC_FOLD)
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def phonetic(token):
+    """الهيكل الصوتي للكلمة (الحروف الساكنة فقط) مشترك بين العربية واللاتينية"""
+    if _ARABIC_RANGE.search(token):
+        if token.endswith('ه'):
+            token = token[:-1]
+        key = token.translate(_ARABIC_PHONETIC)
+    else:
+        for digraph, replacement in _LATIN_DIGRAPHS:
+            token = token.replace(digraph, replacement)
+        if token.endswith('h'):
+            token = token[:-1]
+        key = token.translate(_LATIN_PHONETIC)
+    return _REPEATS_RE.sub(r'\1', key)
+
+
+def trigrams(token):
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """فهرس مقلوب تدريجي فوق منتجات الكتالوج"""
+
+    def __init__(self):
+        self.version = None
+        self._lock = threading.Lock()
+        self._signatures = {}    # item_id -> updated_at
+        self._item_terms = {}    # item_id -> {term: weight}
+        self._words = {}         # word -> {item_id: weight}
+        self._phonetics = {}     # skeleton -> {item_id: weight}
+        self._trigrams = {}      # trigram -> {word}
+        self._sorted_words = None
+        self._sorted_phonetics = None
+
+    # ---------- الفهرسة ----------
+
+    def sync(self, catalog):
+        """مزامنة الفهرس مع لقطة الكتالوج: حذف وإضافة المتغيّر فقط"""
+        if self.version == catalog.version:
+            return
+        with self._lock:
+            if self.version == catalog.version:
+                return
+            current = {item.id: item for item in catalog.items}
+            for item_id in list(self._signatures):
+                if item_id not in current:
+                    self._remove(item_id)
+            for item_id, item in current.items():
+                if self._signatures.get(item_id) != item.updated_at:
+                    self._remove(item_id)
+                    self._add(item)
+            self.version = catalog.version
+
+    def _add(self, item):
+        terms = {}
+        for text, weight in ((item.name, NAME_WEIGHT), (item.description, DESCRIPTION_WEIGHT)):
+            for token in tokenize(text):
+                key = ('w', token)
+                terms[key] = max(terms.get(key, 0), weight)
+                skeleton = phonetic(token)
+                if len(skeleton) >= 2:
+                    key = ('p', skeleton)
+                    terms[key] = max(terms.get(key, 0), weight)
+
+        for (kind, term), weight in terms.items():
+            if kind == 'w':
+                if term not in self._words:
+                    self._sorted_words = None
+                    for gram in trigrams(term):
+                        self._trigrams.setdefault(gram, set()).add(term)
+                self._words.setdefault(term, {})[item.id] = weight
+            else:
+                if term not in self._phonetics:
+                    self._sorted_phonetics = None
+                self._phonetics.setdefault(term, {})[item.id] = weight
+
+        self._item_terms[item.id] = terms
+        self._signatures[item.id] = item.updated_at
+
+    def _remove(self, item_id):
+        terms = self._item_terms.pop(item_id, None)
+        self._signatures.pop(item_id, None)
+        if not terms:
+            return
+        for kind, term in terms:
+            postings = self._words if kind == 'w' else self._phonetics
+            items = postings.get(term)
+            if items is None:
+                continue
+            items.pop(item_id, None)
+            if items:
+                continue
+            del postings[term]
+            if kind == 'w':
+                self._sorted_words = None
+                for gram in trigrams(term):
+                    words = self._trigrams.get(gram)
+                    if words is not None:
+                        words.discard(term)
+                        if not words:
+                            del self._trigrams[gram]
+            else:
+                self._sorted_phonetics = None
+
+    # ---------- البحث ----------
+
+    def _prefixed(self, sorted_terms, prefix):
+        for position in range(bisect_left(sorted_terms, prefix), len(sorted_terms)):
+            term = sorted_terms[position]
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def _match_token(self, token):
+        """أفضل درجة لكل منتج يطابق كلمة واحدة من الاستعلام"""
+        scores = {}
+
+        def collect(postings, factor):
+            for item_id, weight in postings.items():
+                score = weight * factor
+                if score > scores.get(item_id, 0):
+                    scores[item_id] = score
+
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self._words)
+        if self._sorted_phonetics is None:
+            self._sorted_phonetics = sorted(self._phonetics)
+
+        if token in self._words:
+            collect(self._words[token], EXACT_SCORE)
+        for word in self._prefixed(self._sorted_words, token):
+            if word != token:
+                collect(self._words[word], PREFIX_SCORE)
+
+        skeleton = phonetic(token)
+        if len(skeleton) >= 2:
+            if skeleton in self._phonetics:
+                collect(self._phonetics[skeleton], PHONETIC_SCORE)
+            for key in self._prefixed(self._sorted_phonetics, skeleton):
+                if key != skeleton:
+                    collect(self._phonetics[key], PHONETIC_PREFIX_SCORE)
+
+        if len(token) >= 3:
+            grams = trigrams(token)
+            shared = {}
+            for gram in grams:
+                for word in self._trigrams.get(gram, ()):
+                    shared[word] = shared.get(word, 0) + 1
+            for word, count in shared.items():
+                similarity = count / (len(grams) + len(trigrams(word)) - count)
+                if similarity >= FUZZY_THRESHOLD:
+                    collect(self._words[word], FUZZY_SCORE * similarity)
+
+        return scores
+
+    def rank(self, catalog, query):
+        """
+        المنتجات المطابقة كأزواج (مفتاح، منتج) مرتبة حسب المفتاح: عدد الكلمات
+        المطابقة ثم الدرجة ثم ترتيب القائمة. المفتاح يصلح مؤشراً للصفحات.
+        """
+        self.sync(catalog)
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            matched = {}
+            totals = {}
+            for token in tokens:
+                for item_id, score in self._match_token(token).items():
+                    matched[item_id] = matched.get(item_id, 0) + 1
+                    totals[item_id] = totals.get(item_id, 0) + score
+
+        ranked = []
+        for item_id, count in matched.items():
+            item = catalog.get_item(item_id)
+            if item is not None:
+                ranked.append(((-count, -totals[item_id], *sort_key(item)), item))
+        ranked.sort(key=itemgetter(0))
+        return ranked
+
+    def search(self, catalog, query, limit=None):
+        """المنتجات المطابقة مرتبة حسب عدد الكلمات المطابقة ثم الدرجة ثم ترتيب القائمة"""
+        ranked = self.rank(catalog, query)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [item for _, item in ranked]
+
+
+_index = SearchIndex()
+
+
+def search_items(query, catalog=None, limit=None):
+    """البحث في المنتجات المتوفرة"""
+    if catalog is None:
+        catalog = get_catalog()
+    return _index.search(catalog, query, limit=limit)
+
+
+def search_ranked(query, catalog=None):
+    """مثل search_items لكن مع مفتاح الترتيب لكل منتج (للصفحات)"""
+    if catalog is None:
+        catalog = get_catalog()
+    return _index.rank(catalog, query)
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import catalog, images, kitchen, reports
+from .models import Category, MenuItem, Order, OrderItem
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_catalog(sender, **kwargs):
+    """إبطال كتالوج القائمة بعد أي تعديل على الأقسام أو المنتجات"""
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=MenuItem)
+def remember_previous_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    """اسم الصورة قبل الحفظ، لحذف نسخها إذا تغيّرت (None: الصورة لا تُحفظ)"""
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        instance._previous_image = None
+        return
+    if instance.pk is None:
+        instance._previous_image = ''
+        return
+    instance._previous_image = (
+        sender.objects.filter(pk=instance.pk).values_list('image', flat=True).first() or ''
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=MenuItem)
+def build_image_derivatives(sender, instance, raw=False, **kwargs):
+    """توليد نسخ الصورة المتجاوبة في الخيط الخلفي بعد الحفظ (فقط إذا تغيّرت الصورة)"""
+    previous = getattr(instance, '_previous_image', None)
+    image = instance.image
+    if raw or previous is None or previous == image.name:
+        return
+
+    def build():
+        if images.ensure_derivatives(image):
+            catalog.invalidate()
+
+    def after_commit():
+        if previous:
+            images.delete_unused_derivatives([previous])
+        if image:
+            images.in_background(build)
+
+    transaction.on_commit(after_commit)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=MenuItem)
+def delete_image_derivatives(sender, instance, **kwargs):
+    """حذف نسخ صورة الصف المحذوف إذا لم يعد يستعملها صف آخر"""
+    name = instance.image.name
+    transaction.on_commit(lambda: images.delete_unused_derivatives([name]))
+
+
+@receiver(post_delete, sender=Order)
+def mark_sales_day_dirty(sender, instance, **kwargs):
+    """يوم الطلب المحذوف يُعاد حساب ملخصاته في التحديث القادم"""
+    day = timezone.localdate(instance.created_at)
+    transaction.on_commit(lambda: reports.mark_dirty(day))
+
+
+@receiver(post_delete, sender=Order)
+def reset_kitchen(sender, **kwargs):
+    """الطلب المحذوف لا يظهر في استعلام الشاشات: جيل جديد فتعيد التحميل"""
+    transaction.on_commit(kitchen.new_generation)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def touch_order(sender, instance, raw=False, origin=None, **kwargs):
+    """تعديل سطر يصل لشاشة المطبخ عبر updated_at الطلب"""
+    # حذف الطلب نفسه يحذف أسطره: reset_kitchen يكفي
+    if raw or getattr(origin, 'model', type(origin)) is Order:
+        return
+    kitchen.touch_order(instance.order_id)
+
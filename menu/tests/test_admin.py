@@ -0,0 +1,64 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.urls import reverse
+
+from menu.models import Cart, CartItem, Category, MenuItem, Order, OrderItem
+
+ROWS = 30
+LINES = 5
+
+
+class AdminQueryBudgetTests(TestCase):
+    """
+    عدد استعلامات كل صفحة في الإدارة ثابت مهما كان عدد الصفوف: ROWS صف في كل
+    قائمة (أكثر من صفحة) و LINES سطر في كل طلب وسلة، فأي استعلام لكل سطر يكسر الحد.
+    الجلسة والمستخدم استعلامان من كل حد.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        categories = [Category.objects.create(name=f'قسم {i}', order=i) for i in range(3)]
+        items = [
+            MenuItem.objects.create(category=categories[i % 3], name=f'منتج {i}', price=Decimal('12.50'))
+            for i in range(ROWS)
+        ]
+        for i in range(ROWS):
+            order = Order.objects.create(customer_name='زبون', customer_phone='0600000000', total=Decimal('125'))
+            cart = Cart.objects.create(session_key=f'session-{i}')
+            for item in items[:LINES]:
+                OrderItem.objects.create(order=order, menu_item=item, name=item.name, price=item.price, quantity=2)
+                CartItem.objects.create(cart=cart, menu_item=item, quantity=2)
+        cls.category, cls.item, cls.order, cls.cart = categories[0], items[0], order, cart
+
+    def setUp(self):
+        # كاش ContentType داخل العملية: نفس العدد مهما كان ترتيب الاختبارات
+        ContentType.objects.clear_cache()
+        self.client.force_login(self.user)
+
+    def assertPageQueries(self, budget, url):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_changelists(self):
+        for model, budget in ((Category, 7), (MenuItem, 8), (Order, 9), (Cart, 7)):
+            with self.subTest(model=model.__name__):
+                self.assertPageQueries(budget, reverse(f'admin:menu_{model._meta.model_name}_changelist'))
+
+    def test_change_views(self):
+        for obj, budget in ((self.category, 8), (self.item, 9), (self.order, 9), (self.cart, 9)):
+            with self.subTest(model=type(obj).__name__):
+                self.assertPageQueries(budget, reverse(f'admin:menu_{obj._meta.model_name}_change', args=[obj.pk]))
+
+    def test_cart_totals(self):
+        # نفس القيم من with_totals() (قائمة الإدارة) أو من سلة وحدها باستعلام واحد
+        annotated = Cart.objects.with_totals().get(pk=self.cart.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual((annotated.items_count, annotated.total), (2 * LINES, Decimal('125')))
+        cart = Cart.objects.get(pk=self.cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual((cart.items_count, cart.total), (2 * LINES, Decimal('125')))
@@ -0,0 +1,62 @@
+import sys
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from menu.backends.cache import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def make_cache(self, **options):
+        cache = LRUCache(f'test-{self.id()}', {'OPTIONS': options})
+        cache.clear()
+        return cache
+
+    def test_evicts_least_recently_used_entry(self):
+        cache = self.make_cache(MAX_ENTRIES=3)
+        for key in 'abc':
+            cache.set(key, key.upper())
+        self.assertEqual(cache.get('a'), 'A')  # a صار الأحدث استعمالاً
+
+        cache.set('d', 'D')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([cache.get(key) for key in 'acd'], ['A', 'C', 'D'])
+
+    def test_max_bytes_evicts_one_at_a_time(self):
+        size = sys.getsizeof('x' * 1000)
+        cache = self.make_cache(MAX_ENTRIES=100, MAX_BYTES=size * 3)
+        for key in 'abc':
+            cache.set(key, key * 1000)
+        cache.get('a')
+
+        cache.set('d', 'd' * 1000)
+        self.assertEqual([key for key in 'abcd' if cache.has_key(key)], ['a', 'c', 'd'])
+        self.assertEqual(cache._usage.total, size * 3)
+
+        # قيمة أكبر من الحد وحدها: تبقى هي فقط
+        cache.set('big', 'x' * 5000)
+        self.assertEqual([key for key in ('a', 'c', 'd', 'big') if cache.has_key(key)], ['big'])
+
+    def test_usage_follows_overwrite_and_delete(self):
+        cache = self.make_cache(MAX_BYTES=10 ** 6)
+        cache.set('a', 'x' * 100)
+        cache.set('a', 'x' * 10)
+        cache.set('b', 'y')
+        self.assertEqual(cache._usage.total, sys.getsizeof('x' * 10) + sys.getsizeof('y'))
+        cache.delete('a')
+        self.assertEqual(cache._usage.total, sys.getsizeof('y'))
+        cache.clear()
+        self.assertEqual(cache._usage.total, 0)
+
+    def test_strings_are_not_pickled(self):
+        cache = self.make_cache()
+        with mock.patch('menu.backends.cache.pickle') as pickle:
+            cache.set('html', '<li>طاجين</li>')
+            self.assertEqual(cache.get('html'), '<li>طاجين</li>')
+        pickle.dumps.assert_not_called()
+        pickle.loads.assert_not_called()
+
+        cache.set('data', {'price': 45})
+        self.assertEqual(cache.get('data'), {'price': 45})
+        self.assertFalse(cache.add('data', {}))
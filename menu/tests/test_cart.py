@@ -0,0 +1,99 @@
+import json
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from menu import catalog
+from menu.models import Category, MenuItem
+
+
+class CartTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='أطباق')
+        cls.tajine, cls.couscous, cls.tea = [
+            MenuItem.objects.create(category=category, name=name, price=price)
+            for name, price in (('طاجين', Decimal('45')), ('كسكس', Decimal('50')), ('أتاي', Decimal('8')))
+        ]
+
+    def setUp(self):
+        catalog.invalidate()
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), json.dumps(data), content_type='application/json')
+
+    def batch(self, *operations):
+        return self.post('cart_batch', {'operations': [
+            {'op': op, 'item_id': item.id, 'quantity': quantity} for op, item, quantity in operations
+        ]})
+
+
+class CartBatchTests(CartTestCase):
+
+    def test_add_set_remove_in_one_request(self):
+        for store in ('menu.cart.DatabaseCartStore', 'menu.cart.SessionCartStore'):
+            with self.subTest(store=store), override_settings(CART_STORE=store):
+                self.client.cookies.clear()
+                self.post('cart_add', {'item_id': self.tajine.id})
+                self.post('cart_add', {'item_id': self.couscous.id})
+
+                response = self.batch(('add', self.tajine, 2), ('set', self.couscous, 3),
+                                      ('remove', self.tajine, 0), ('set', self.tea, 2))
+                data = response.json()
+                self.assertEqual(data['quantities'], {str(self.couscous.id): 3, str(self.tea.id): 2})
+                self.assertEqual((data['cart_count'], data['cart_total']), (5, 166))
+
+                # set بكمية 0 يحذف السطر
+                data = self.batch(('set', self.couscous, 0)).json()
+                self.assertEqual(data['quantities'], {str(self.tea.id): 2})
+
+    def test_invalid_batch_changes_nothing(self):
+        self.batch(('add', self.tajine, 1))
+        hidden = MenuItem.objects.create(category=self.tajine.category, name='مخفي',
+                                         price=Decimal('10'), is_available=False)
+        catalog.invalidate()
+        for operations, status in (
+            ([('add', self.couscous, 1), ('add', hidden, 1)], 404),
+            ([('add', self.couscous, 1), ('add', self.tea, 0)], 400),
+            ([('add', self.couscous, 1), ('move', self.tea, 1)], 400),
+            ([], 400),
+        ):
+            with self.subTest(operations=operations):
+                self.assertEqual(self.batch(*operations).status_code, status)
+        cart = self.client.get(reverse('cart_content'), {'format': 'json'}).json()
+        self.assertEqual([(line['id'], line['quantity']) for line in cart['lines']], [(self.tajine.id, 1)])
+
+
+class CartContentETagTests(CartTestCase):
+
+    def test_not_modified_until_cart_changes(self):
+        self.post('cart_add', {'item_id': self.tajine.id})
+        url = reverse('cart_content')
+        for fmt in ('json', 'html'):
+            with self.subTest(format=fmt):
+                first = self.client.get(url, {'format': fmt})
+                self.assertIn('no-cache', first['Cache-Control'])
+                self.assertEqual(self.client.get(url, {'format': fmt}, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+                self.post('cart_add', {'item_id': self.tea.id})
+                response = self.client.get(url, {'format': fmt}, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_price_change_changes_etag(self):
+        # الأسعار تأتي من الكتالوج: تعديل السعر يغيّر المجموع بدون تعديل السلة
+        self.post('cart_add', {'item_id': self.tajine.id})
+        url = reverse('cart_content')
+        first = self.client.get(url, {'format': 'json'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tajine.price = Decimal('60')
+            self.tajine.save()
+        response = self.client.get(url, {'format': 'json'}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['cart_total'], 60)
+
+    def test_json_and_html_etags_differ(self):
+        url = reverse('cart_content')
+        self.assertNotEqual(self.client.get(url, {'format': 'json'})['ETag'], self.client.get(url)['ETag'])
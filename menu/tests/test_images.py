@@ -0,0 +1,64 @@
+import io
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from menu import images
+from menu.models import Category, MenuItem
+
+
+def image_file(fmt):
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), 'red').save(buffer, format=fmt)
+    return ContentFile(buffer.getvalue())
+
+
+class DerivativesTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.category = Category.objects.create(name='مشروبات')
+
+    def wait_for_background(self):
+        images._executor.submit(lambda: None).result()
+
+    def test_same_stem_different_extension(self):
+        # soda.jpg و soda.png: نسخ وملف وصف لكل واحدة
+        names = [default_storage.save(f'products/soda.{ext}', image_file(fmt)) for ext, fmt in (('jpg', 'JPEG'), ('png', 'PNG'))]
+        for name in names:
+            images.build_derivatives(MenuItem(image=name).image)
+        self.assertEqual(images.manifest_name(names[0]), 'products/soda.jpg.derivatives.json')
+        self.assertEqual(images.derivative_name(names[1], 120, 'webp'), 'products/soda.png.120w.webp')
+        self.assertEqual([images.load_manifest(name)['source'] for name in names], names)
+
+        # حذف نسخ الأولى لا يمس نسخ الثانية التي ما زال منتج يستعملها
+        MenuItem.objects.create(category=self.category, name='صودا', price=Decimal('10'), image=names[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            images.delete_unused_derivatives(names)
+        self.wait_for_background()
+        self.assertIsNone(images.load_manifest(names[0]))
+        self.assertIsNotNone(images.load_manifest(names[1]))
+        self.assertTrue(default_storage.exists(images.derivative_name(names[1], 120, 'webp')))
+
+    @mock.patch('menu.images.in_background')
+    def test_save_without_image_change_skips_derivatives(self, in_background):
+        name = default_storage.save('products/tea.jpg', image_file('JPEG'))
+        with self.captureOnCommitCallbacks(execute=True):
+            item = MenuItem.objects.create(category=self.category, name='أتاي', price=Decimal('8'), image=name)
+        self.assertEqual(in_background.call_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            item.price = Decimal('9')
+            item.save()
+            item.save(update_fields=['name'])
+        self.assertEqual(in_background.call_count, 1)
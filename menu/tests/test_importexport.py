@@ -0,0 +1,89 @@
+import csv
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from menu import importexport
+from menu.models import Category, MenuItem, Order, OrderItem
+
+
+def rows(*dicts):
+    return list(enumerate(dicts, 2))
+
+
+class ImportMenuTests(TestCase):
+
+    def test_new_category_repeated(self):
+        # القسم الجديد في عدة صفوف، في نفس الدفعة أو في دفعات متتالية: قيم كل الصفوف تصل
+        for batch_size, name in ((500, 'حلويات'), (1, 'عصائر')):
+            with self.subTest(batch_size=batch_size):
+                counts = importexport.import_menu(rows(
+                    {'category': name, 'category_icon': 'bx-cake'},
+                    {'category': name, 'category_order': '7'},
+                    {'category': name, 'category_active': 'false'},
+                ), batch_size=batch_size)
+
+                category = Category.objects.get(name=name)
+                self.assertEqual((category.icon, category.order, category.is_active), ('bx-cake', 7, False))
+                self.assertEqual(counts['categories_created'], 1)
+
+    def test_existing_category_fields_accumulate(self):
+        Category.objects.create(name='مشروبات', icon='bx-drink', order=1)
+        counts = importexport.import_menu(rows(
+            {'category': 'مشروبات', 'category_icon': 'bx-coffee'},
+            {'category': 'مشروبات', 'category_order': '3'},
+        ))
+        category = Category.objects.get(name='مشروبات')
+        self.assertEqual((category.icon, category.order), ('bx-coffee', 3))
+        self.assertEqual(counts['categories_updated'], 1)
+
+
+class ExportMenuCommandTests(TestCase):
+
+    def test_stdout(self):
+        category = Category.objects.create(name='مشروبات')
+        MenuItem.objects.create(category=category, name='أتاي', price=Decimal('8'))
+        out = io.StringIO()
+        call_command('export_menu', stdout=out)
+        exported = list(csv.DictReader(io.StringIO(out.getvalue().lstrip('\ufeff'))))
+        self.assertEqual([(row['category'], row['name'], row['price']) for row in exported], [('مشروبات', 'أتاي', '8.00')])
+
+
+class ImportViewTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def upload(self, content):
+        return self.client.post(reverse('admin:menu_menuitem_import'), {
+            'file': SimpleUploadedFile('menu.csv', content.encode(), content_type='text/csv'),
+        })
+
+    def test_import(self):
+        response = self.upload('category,category_icon\nسلطات,bx-bowl-hot\n')
+        self.assertRedirects(response, reverse('admin:menu_menuitem_changelist'))
+        self.assertTrue(Category.objects.filter(name='سلطات', icon='bx-bowl-hot').exists())
+
+    @override_settings(MENU_IMPORT_MAX_BYTES=16)
+    def test_large_file_goes_to_command(self):
+        response = self.upload('category,category_icon\nسلطات,bx-bowl-hot\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'manage.py import_menu')
+        self.assertFalse(Category.objects.exists())
+
+
+class ExportOrdersCommandTests(TestCase):
+
+    def test_stdout(self):
+        order = Order.objects.create(customer_name='زبون', customer_phone='0600000000', total=Decimal('16'))
+        OrderItem.objects.create(order=order, name='أتاي', price=Decimal('8'), quantity=2)
+        out = io.StringIO()
+        call_command('export_orders', '--format', 'jsonl', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn(order.order_number, lines[0])
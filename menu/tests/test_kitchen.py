@@ -0,0 +1,86 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from menu import kitchen
+from menu.models import Order, OrderItem
+
+
+def parse_sse(chunk):
+    """رسائل text/event-stream كقواميس (id، event، data)"""
+    messages = []
+    for block in chunk.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'data' in fields:
+            fields['data'] = json.loads(fields['data'])
+        messages.append(fields)
+    return messages
+
+
+@override_settings(KITCHEN_POLL_INTERVAL=0.01)
+class KitchenEventsTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('chef', password='password', is_staff=True))
+        self.start = kitchen.last_id()
+
+    def create_order(self, name='زبون'):
+        order = Order.objects.create(customer_name=name, customer_phone='0600000000', total=Decimal('45'))
+        OrderItem.objects.create(order=order, name='طاجين', price=Decimal('45'), quantity=1)
+        return order
+
+    def poll(self, last_event_id):
+        return self.client.get(reverse('kitchen_poll'), {'last_event_id': last_event_id}).json()
+
+    def test_sse_framing(self):
+        order = self.create_order()
+        response = self.client.get(reverse('kitchen_events'), HTTP_LAST_EVENT_ID=self.start)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b'retry: 3000\n\n')
+        [message] = parse_sse(next(chunks).decode())
+        self.assertEqual(message['id'], kitchen.last_id())
+        response.close()
+
+        self.assertEqual(message['event'], 'order')
+        self.assertEqual(message['data']['order_number'], order.order_number)
+        self.assertEqual([item['name'] for item in message['data']['items']], ['طاجين'])
+
+    def test_resume_after_last_event_id(self):
+        first = self.create_order('الأول')
+        second = self.create_order('الثاني')
+        events = self.poll(self.start)['events']
+        self.assertEqual([event['data']['id'] for event in events], [first.id, second.id])
+
+        # الاستئناف بعد الحدث الأول لا يعيد إلا ما بعده
+        resumed = self.poll(events[0]['id'])
+        self.assertFalse(resumed['reset'])
+        self.assertEqual([event['data']['id'] for event in resumed['events']], [second.id])
+
+        # تعديل سطر يعيد إرسال طلبه
+        OrderItem.objects.create(order=first, name='أتاي', price=Decimal('8'), quantity=2)
+        resumed = self.poll(resumed['last_event_id'])
+        self.assertEqual([event['data']['id'] for event in resumed['events']], [first.id])
+        self.assertEqual(len(resumed['events'][0]['data']['items']), 2)
+
+    def test_delete_resets(self):
+        order = self.create_order()
+        last_event_id = kitchen.last_id()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertTrue(self.poll(last_event_id)['reset'])
+
+        response = self.client.get(reverse('kitchen_events'), HTTP_LAST_EVENT_ID=last_event_id)
+        chunks = list(response.streaming_content)
+        self.assertEqual(chunks[-1], b'event: reset\ndata: {}\n\n')
+
+    @mock.patch('menu.views.KITCHEN_POLL_TIMEOUT', 0.05)
+    def test_long_poll_timeout(self):
+        data = self.poll(self.start)
+        self.assertEqual((data['reset'], data['events']), (False, []))
+        self.assertEqual(data['last_event_id'], self.start)
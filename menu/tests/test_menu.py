@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from menu import catalog
+from menu.models import Category, MenuItem
+
+
+class ConditionalMenuTests(TestCase):
+    """ETag القائمة يتغير مع كل تعديل، حتى الحذف الذي لا يغيّر آخر updated_at"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='أطباق')
+        cls.items = [
+            MenuItem.objects.create(category=category, name=name, price=Decimal('45'))
+            for name in ('طاجين', 'كسكس')
+        ]
+
+    def setUp(self):
+        catalog.invalidate()
+
+    def test_page_has_no_cart(self):
+        # السلة تُحمَّل من /api/cart/content/: الصفحة المخزّنة واحدة لكل الزوار
+        response = self.client.get(reverse('menu'))
+        self.assertContains(response, 'class="cart-loading"')
+        self.assertNotContains(response, 'class="cart-empty"')
+
+    def test_delete_changes_etag(self):
+        for url, item in zip((reverse('menu'), reverse('menu_items')), self.items):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertNotIn('Last-Modified', first)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    item.delete()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], first['ETag'])
+                # بدون Last-Modified لا يكفي If-Modified-Since وحده لرد 304
+                self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date()).status_code, 200)
@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+@override_settings(DEBUG=False, METRICS_TOKEN='secret', PERFORMANCE_METRICS=True)
+class ServerTimingTests(TestCase):
+    """Server-Timing بنفس شروط /metrics/: DEBUG، أو METRICS_TOKEN، أو موظف"""
+
+    def test_hidden_from_visitors(self):
+        response = self.client.get(reverse('menu'))
+        self.assertNotIn('Server-Timing', response)
+        response = self.client.get(reverse('menu'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_metrics_token(self):
+        response = self.client.get(reverse('menu'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_debug(self):
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse('menu'))
+        self.assertIn('Server-Timing', response)
+
+    def test_staff(self):
+        self.client.force_login(User.objects.create_user('staff', password='password', is_staff=True))
+        response = self.client.get(reverse('admin:index'))
+        self.assertIn('db;desc=', response['Server-Timing'])
+
+    def test_cart_step(self):
+        response = self.client.get(reverse('cart_content'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertIn('step;desc="cart', response['Server-Timing'])
+
+    def test_metrics_view(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertContains(response, 'menu_request_duration_seconds')
@@ -0,0 +1,117 @@
+import json
+import threading
+from decimal import Decimal
+from unittest import skipIf
+
+from django.db import OperationalError, connection, connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from menu import catalog
+from menu.models import Category, MenuItem, Order, OrderItem
+
+THREADS = 8
+ORDER = {'name': 'زبون', 'phone': '0600000000', 'delivery_type': 'pickup'}
+
+
+@skipIf(connection.vendor == 'sqlite' and connection.is_in_memory_db(), 'يحتاج قاعدة SQLite في ملف (TEST NAME)')
+@override_settings(RATE_LIMIT_ENABLED=False)
+class ConcurrentOrderTests(TransactionTestCase):
+    """طلبات متزامنة من عدة خيوط على نفس القاعدة: كلها تُحفظ بدون "database is locked"."""
+
+    def setUp(self):
+        category = Category.objects.create(name='أطباق')
+        self.item = MenuItem.objects.create(category=category, name='طاجين', price=Decimal('45'))
+        catalog.invalidate()
+
+    def test_concurrent_create_order(self):
+        barrier = threading.Barrier(THREADS)
+        statuses, errors = [], []
+
+        def customer(number):
+            client = Client()
+            try:
+                client.post(reverse('cart_add'), {'item_id': self.item.id, 'quantity': 2},
+                            content_type='application/json')
+                # كل الخيوط تكتب في نفس اللحظة
+                barrier.wait(timeout=30)
+                response = client.post(reverse('create_order'), {
+                    'name': f'زبون {number}', 'phone': '0600000000', 'delivery_type': 'pickup',
+                }, content_type='application/json')
+                statuses.append(response.status_code)
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=customer, args=(number,)) for number in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(statuses, [200] * THREADS)
+        self.assertEqual(Order.objects.count(), THREADS)
+        self.assertEqual(OrderItem.objects.filter(quantity=2).count(), THREADS)
+        self.assertEqual(set(Order.objects.values_list('total', flat=True)), {Decimal('90')})
+
+    def test_concurrent_duplicate_submit(self):
+        # نقرتان على "تأكيد" من نفس الجلسة بنفس المفتاح في نفس اللحظة
+        first = Client()
+        first.post(reverse('cart_add'), {'item_id': self.item.id}, content_type='application/json')
+        second = Client()
+        second.cookies = first.cookies
+        barrier = threading.Barrier(2)
+        responses, errors = [], []
+
+        def submit(client):
+            try:
+                barrier.wait(timeout=30)
+                responses.append(client.post(reverse('create_order'), ORDER, content_type='application/json',
+                                             HTTP_IDEMPOTENCY_KEY='submit-1'))
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=submit, args=(client,)) for client in (first, second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual([response.status_code for response in responses], [200, 200])
+        order = Order.objects.get()
+        self.assertEqual({response.json()['order_number'] for response in responses}, {order.order_number})
+
+
+@override_settings(RATE_LIMIT_ENABLED=False)
+class IdempotentOrderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='أطباق')
+        cls.item = MenuItem.objects.create(category=category, name='طاجين', price=Decimal('45'))
+
+    def setUp(self):
+        catalog.invalidate()
+
+    def order(self, client, key):
+        client.post(reverse('cart_add'), {'item_id': self.item.id}, content_type='application/json')
+        return client.post(reverse('create_order'), ORDER, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_returns_the_same_order(self):
+        first = self.order(self.client, 'submit-1')
+        retry = self.client.post(reverse('create_order'), ORDER, content_type='application/json',
+                                 HTTP_IDEMPOTENCY_KEY='submit-1')
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()['order_number'], first.json()['order_number'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_is_scoped_to_the_session(self):
+        first = self.order(self.client, 'submit-1')
+        other = self.order(Client(), 'submit-1')
+        self.assertNotEqual(other.json()['order_number'], first.json()['order_number'])
+        self.assertEqual(Order.objects.count(), 2)
@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from menu import catalog
+from menu.models import Category, MenuItem
+from menu.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        key = (2, -1700000000.123456, 15)
+        self.assertEqual(decode_cursor(encode_cursor(key)), key)
+        self.assertIsNone(decode_cursor(''))
+
+    def test_invalid_cursor(self):
+        for cursor in ('%%%', encode_cursor(['x']), 'bm90IGpzb24'):
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_last_page_has_no_cursor(self):
+        rows = [(number,) for number in range(6)]
+        self.assertEqual(keyset_page(rows, None, 3, key=lambda row: row), (rows[:3], encode_cursor(rows[2])))
+        self.assertEqual(keyset_page(rows, rows[2], 3, key=lambda row: row), (rows[3:], None))
+
+
+class MenuItemsPagesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='أطباق')
+        other = Category.objects.create(name='مشروبات')
+        # نفس order ونفس created_at لنصفها: الترتيب يُحسم بالـ id
+        now = timezone.now()
+        for number in range(25):
+            item = MenuItem.objects.create(category=cls.category if number % 3 else other,
+                                           name=f'طبق {number}', price=Decimal('45'), order=number % 4)
+            if number % 2:
+                MenuItem.objects.filter(pk=item.pk).update(created_at=now)
+
+    def setUp(self):
+        catalog.invalidate()
+
+    def walk(self, params=None, limit=4):
+        """كل الصفحات: (المعرفات بالترتيب، عدد الصفحات)"""
+        ids, cursor, pages = [], None, 0
+        while True:
+            data = self.client.get(reverse('menu_items'), {**(params or {}), 'limit': limit,
+                                                            **({'cursor': cursor} if cursor else {})}).json()
+            ids += [item['id'] for item in data['items']]
+            pages += 1
+            cursor = data['next_cursor']
+            if cursor is None:
+                return ids, pages
+
+    def test_no_duplicates_or_gaps(self):
+        expected = list(MenuItem.objects.order_by('order', '-created_at', 'id').values_list('id', flat=True))
+        for limit in (1, 4, 25, 60):
+            with self.subTest(limit=limit):
+                ids, pages = self.walk(limit=limit)
+                self.assertEqual(ids, expected)
+                self.assertEqual(pages, -(-len(expected) // limit))
+
+    def test_category_filter(self):
+        expected = list(self.category.items.order_by('order', '-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk({'category': self.category.id})[0], expected)
+
+    def test_search_pages(self):
+        # البحث مرتب حسب الصلة، والمؤشر يحمل الدرجة
+        everything = self.client.get(reverse('menu_items'), {'search': 'طبق', 'limit': 60}).json()
+        ids, pages = self.walk({'search': 'طبق'}, limit=7)
+        self.assertEqual(ids, [item['id'] for item in everything['items']])
+        self.assertEqual((len(ids), pages), (25, 4))
+
+    def test_new_item_while_browsing(self):
+        # منتج يُضاف قبل المؤشر لا يزيح الصفحات التالية
+        first = self.client.get(reverse('menu_items'), {'limit': 10}).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(category=self.category, name='جديد', price=Decimal('10'), order=0)
+        rest, cursor = [], first['next_cursor']
+        while cursor:
+            data = self.client.get(reverse('menu_items'), {'limit': 10, 'cursor': cursor}).json()
+            rest += [item['id'] for item in data['items']]
+            cursor = data['next_cursor']
+        seen = [item['id'] for item in first['items']] + rest
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), set(MenuItem.objects.exclude(name='جديد').values_list('id', flat=True)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('menu_items'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['success'])
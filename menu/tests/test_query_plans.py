@@ -0,0 +1,99 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory, TestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from menu import catalog, cleanup, reports
+from menu.models import Cart, Category, MenuItem, Order
+
+
+def query_plan(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[3] for row in cursor.fetchall()]
+
+
+@skipUnlessDBFeature('supports_partial_indexes')
+class QueryPlanTests(TestCase):
+    """
+    خطة SQLite لكل استعلام ساخن: يمر على فهرسه، بدون SCAN للجدول كله وبدون
+    ترتيب كامل في TEMP B-TREE. "SCAN ... USING INDEX" مقبول للقوائم بدون
+    فلتر (الكتالوج كله، صفحة الطلبات مع LIMIT): قراءة الفهرس بالترتيب.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='أطباق')
+        MenuItem.objects.create(category=category, name='طاجين', price=Decimal('45'))
+        Order.objects.create(customer_name='زبون', customer_phone='0600000000', total=Decimal('45'))
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN خاص بـ SQLite')
+
+    def assertUsesIndex(self, plan, index):
+        self.assertTrue(any(index in step for step in plan), f'{index} not in {plan}')
+        for step in plan:
+            self.assertFalse(step.startswith('SCAN') and 'INDEX' not in step, f'full scan: {plan}')
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', step)
+
+    def captured(self, table, func):
+        """الاستعلامات المفلترة (WHERE) على table أثناء func()"""
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return [
+            query['sql'] for query in queries.captured_queries
+            if f'FROM "{table}"' in query['sql'] and 'WHERE' in query['sql']
+        ]
+
+    def test_catalog(self):
+        build = lambda: catalog._build('test')
+        categories, items = self.captured('menu_category', build), self.captured('menu_menuitem', build)
+        self.assertTrue(categories and items)
+        for sql in categories:
+            self.assertUsesIndex(query_plan(sql), 'category_active_order_idx')
+        for sql in items:
+            self.assertUsesIndex(query_plan(sql), 'item_available_order_idx')
+
+        by_category = MenuItem.objects.filter(is_available=True, category_id=1)
+        self.assertUsesIndex(query_plan(*by_category.query.sql_with_params()), 'item_available_category_idx')
+
+    def test_admin_order_list(self):
+        request = RequestFactory().get('/admin/menu/order/')
+        request.user = User(is_superuser=True, is_staff=True)
+        changelist = site._registry[Order].get_changelist_instance(request)
+        orders = changelist.get_queryset(request)
+        # ترتيب الإدارة (-created_at، -pk): الفهرس يرتب created_at ولا يبقى إلا فرز التعادلات
+        self.assertUsesIndex(query_plan(*orders[:20].query.sql_with_params()), 'order_created_idx')
+        pending = orders.filter(status='pending')[:20]
+        self.assertUsesIndex(query_plan(*pending.query.sql_with_params()), 'order_status_created_idx')
+
+    def test_cart_cleanup(self):
+        old = timezone.now() - timedelta(days=30)
+        Cart.objects.bulk_create(Cart(session_key=f'session-{i}') for i in range(3))
+        Cart.objects.update(updated_at=old)
+        cutoff = timezone.now() - timedelta(days=1)
+
+        # دفعة من اثنين: الاستعلام الثاني بمؤشر (updated_at، id)
+        queries = self.captured('menu_cart', lambda: list(cleanup._expired_carts(cutoff, 2)))
+        self.assertEqual(len(queries), 2)
+        for sql in queries:
+            self.assertUsesIndex(query_plan(sql), 'cart_updated_idx')
+
+    def test_sales_rollups(self):
+        state = reports.get_state()
+        state.position = timezone.now() - timedelta(hours=1)
+        state.save()
+        queries = self.captured('menu_order', reports.update_sales_rollups)
+        changed = [sql for sql in queries if '"updated_at" >' in sql]
+        recompute = [sql for sql in queries if '"created_at" >=' in sql]
+        self.assertTrue(changed and recompute)
+        for sql in changed:
+            self.assertUsesIndex(query_plan(sql), 'order_updated_idx')
+        for sql in recompute:
+            self.assertUsesIndex(query_plan(sql), 'order_created_idx')
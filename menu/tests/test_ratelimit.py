@@ -0,0 +1,178 @@
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from menu import catalog, ratelimit
+from menu.models import Category, MenuItem
+
+
+class SharedCacheMixin:
+    """caches['shared'] في FileBasedCache مؤقت (نفس الكاش المشترك الافتراضي)"""
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+        override = override_settings(CACHES=dict(settings.CACHES, shared=shared))
+        override.enable()
+        cls.addClassCleanup(override.disable)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        caches['shared'].clear()
+
+
+@mock.patch('menu.ratelimit.time')
+class TokenBucketsTests(SharedCacheMixin, SimpleTestCase):
+
+    def test_parse_rate(self, clock):
+        self.assertEqual(ratelimit.parse_rate('30/m'), (30, 0.5))
+        self.assertEqual(ratelimit.parse_rate('5/s'), (5, 5))
+
+    def test_rejected_request_takes_nothing(self, clock):
+        clock.time.return_value = 6000.0
+        limiter = ratelimit.TokenBuckets()
+        session, ip = ('session', 2, 1.0), ('ip', 10, 1.0)
+        self.assertEqual(limiter.take([session, ip]), 0)
+        self.assertEqual(limiter.take([session, ip]), 0)
+        self.assertEqual(limiter.take([session, ip]), 1.0)
+        # الجلسة المرفوضة لم تُعدّ على الـ IP: 8 طلبات من جلسات أخرى
+        for number in range(8):
+            self.assertEqual(limiter.take([(f'other-{number}', 2, 1.0), ip]), 0)
+        self.assertGreater(limiter.take([('last', 2, 1.0), ip]), 0)
+
+        clock.time.return_value = 6001.0
+        self.assertEqual(limiter.take([session]), 0)
+
+    def test_refill(self, clock):
+        clock.time.return_value = 6000.0
+        limiter = ratelimit.TokenBuckets()
+        bucket = ('key', 10, 2.0)
+        for _ in range(10):
+            self.assertEqual(limiter.take([bucket]), 0)
+        self.assertEqual(limiter.take([bucket]), 0.5)
+
+        # بعد ثانيتين: 4 رموز جديدة فقط
+        clock.time.return_value = 6002.0
+        for _ in range(4):
+            self.assertEqual(limiter.take([bucket]), 0)
+        self.assertEqual(limiter.take([bucket]), 0.5)
+
+    def test_limit_holds_across_workers(self, clock):
+        # كل خيط بنسخته كعامل مستقل: الدلو كله في الكاش المشترك
+        clock.time.return_value = 6000.0
+        allowed, barrier = [], threading.Barrier(8)
+
+        def worker():
+            limiter = ratelimit.TokenBuckets()
+            barrier.wait(timeout=30)
+            for _ in range(10):
+                if not limiter.take([('shared', 20, 1.0)]):
+                    allowed.append(1)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(allowed), 20)
+
+
+@override_settings(RATE_LIMIT_ENABLED=True)
+class RateLimitMiddlewareTests(SharedCacheMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='أطباق')
+        cls.item = MenuItem.objects.create(category=category, name='طاجين', price=Decimal('45'))
+
+    def setUp(self):
+        super().setUp()
+        catalog.invalidate()
+
+    def test_flood_gets_429_and_menu_still_works(self):
+        capacity, _ = ratelimit.parse_rate(settings.RATE_LIMITS['cart_add']['session'])
+        for attempt in range(1, 1000):
+            response = self.client.post(reverse('cart_add'), {'item_id': self.item.id},
+                                        content_type='application/json')
+            if response.status_code == 429:
+                break
+            self.assertEqual(response.status_code, 200)
+        else:
+            self.fail('cart_add was never throttled')
+
+        # الجلسة تحصل على حصتها كاملة (الطلب الأول بدون كوكي يُحسب على الـ IP فقط)
+        self.assertGreaterEqual(attempt, capacity + 1)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertFalse(response.json()['success'])
+
+        # باقي الموقع يعمل لنفس الزائر
+        self.assertEqual(self.client.get(reverse('menu')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('cart_content')).status_code, 200)
+
+    @mock.patch('menu.ratelimit.time')
+    def test_flood_does_not_slow_the_menu(self, clock):
+        # الساعة ثابتة: الدلو لا يمتلئ، فكل طلبات الإغراق 429 من الوسيط بدون قاعدة البيانات
+        clock.time.return_value = 6000.0
+        flooder = Client()
+        while flooder.post(reverse('cart_add'), {'item_id': self.item.id},
+                           content_type='application/json').status_code != 429:
+            pass
+
+        def menu_times():
+            times = []
+            for _ in range(30):
+                start = time.perf_counter()
+                self.assertEqual(self.client.get(reverse('menu')).status_code, 200)
+                times.append(time.perf_counter() - start)
+            return statistics.median(times)
+
+        self.client.get(reverse('menu'))
+        baseline = menu_times()
+
+        stop, statuses = threading.Event(), []
+
+        def flood():
+            while not stop.is_set():
+                statuses.append(flooder.post(reverse('cart_add'), {'item_id': self.item.id},
+                                             content_type='application/json').status_code)
+
+        thread = threading.Thread(target=flood)
+        thread.start()
+        try:
+            while len(statuses) < 20:
+                time.sleep(0.001)
+            during = menu_times()
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertEqual(set(statuses), {429})
+        # خيط الإغراق يقاسم الـ GIL فقط، فالهامش واسع لكنه يكشف أي انتظار على قفل أو قاعدة
+        self.assertLess(during, baseline * 3 + 0.01, f'menu median {during:.4f}s during flood, {baseline:.4f}s before')
+
+    @mock.patch('menu.ratelimit.time')
+    def test_sessions_share_the_ip_limit(self, clock):
+        # جلسة جديدة لكل طلب (سكربت يرمي الكوكي): حد الـ IP يوقفها
+        clock.time.return_value = 6000.0
+        capacity, _ = ratelimit.parse_rate(settings.RATE_LIMITS['cart_add']['ip'])
+        for _ in range(capacity):
+            self.client.cookies.clear()
+            response = self.client.post(reverse('cart_add'), {'item_id': self.item.id},
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+        self.client.cookies.clear()
+        response = self.client.post(reverse('cart_add'), {'item_id': self.item.id},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 429)
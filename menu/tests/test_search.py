@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from menu import catalog
+from menu.models import Category, MenuItem
+from menu.search import normalize, phonetic, search_items
+
+
+class NormalizeTests(SimpleTestCase):
+
+    def test_arabic_forms(self):
+        self.assertEqual(normalize('أَحْمَد'), normalize('احمد'))
+        self.assertEqual(normalize('سلطة'), 'سلطه')
+        self.assertEqual(normalize('Crème Brûlée'), 'creme brulee')
+
+    def test_phonetic_across_scripts(self):
+        self.assertEqual(phonetic('tajine'), phonetic(normalize('طاجين')))
+        self.assertEqual(phonetic('couscous'), phonetic('كسكس'))
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        dishes = Category.objects.create(name='أطباق')
+        cls.tajine = MenuItem.objects.create(category=dishes, name='طاجين لحم', price=Decimal('60'))
+        cls.couscous = MenuItem.objects.create(category=dishes, name='كسكس بالخضر', price=Decimal('50'),
+                                               description='يقدم مع طاجين صغير')
+        cls.pizza = MenuItem.objects.create(category=dishes, name='Pizza Margherita', price=Decimal('55'))
+        cls.hidden = MenuItem.objects.create(category=dishes, name='طاجين دجاج', price=Decimal('55'), is_available=False)
+
+    def setUp(self):
+        catalog.invalidate()
+
+    def names(self, query):
+        return [item.name for item in search_items(query)]
+
+    def test_name_ranks_before_description(self):
+        self.assertEqual(self.names('طاجين'), ['طاجين لحم', 'كسكس بالخضر'])
+
+    def test_more_matched_words_first(self):
+        self.assertEqual(self.names('طاجين لحم')[0], 'طاجين لحم')
+
+    def test_phonetic_match(self):
+        self.assertIn('طاجين لحم', self.names('tajine'))
+        self.assertIn('طاجين لحم', self.names('طجين'))
+        self.assertIn('كسكس بالخضر', self.names('couscous'))
+
+    def test_misspelled(self):
+        self.assertEqual(self.names('margarita'), ['Pizza Margherita'])
+        self.assertEqual(self.names('piza'), ['Pizza Margherita'])
+
+    def test_unavailable_and_unknown(self):
+        self.assertNotIn('طاجين دجاج', self.names('دجاج'))
+        self.assertEqual(self.names('سوشي'), [])
+
+    def test_index_follows_catalog_changes(self):
+        self.assertEqual(self.names('برتقال'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(category=self.tajine.category, name='عصير برتقال', price=Decimal('15'))
+        self.assertEqual(self.names('برتقال'), ['عصير برتقال'])
+
+    def test_typeahead(self):
+        response = self.client.get(reverse('menu_search'), {'q': 'tajine', 'limit': 1})
+        self.assertEqual([result['id'] for result in response.json()['results']], [self.tajine.id])
+        self.assertEqual(self.client.get(reverse('menu_search'), {'q': ''}).json()['results'], [])
@@ -1,20 +1,40 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# تحت ASGI (ASYNC_VIEWS) تُستعمل نسخ async من القائمة والسلة وشاشة المطبخ
+ASYNC = settings.ASYNC_VIEWS
+
 urlpatterns = [
     # الصفحات
-    path('', views.menu_view, name='menu'),
+    path('', views.amenu_view if ASYNC else views.menu_view, name='menu'),
     path('about/', views.about_view, name='about'),
     path('checkout/', views.checkout_view, name='checkout'),
     
+    # API القائمة
+    path('api/menu/', views.amenu_items if ASYNC else views.menu_items, name='menu_items'),
+    path('api/menu/search/', views.menu_search, name='menu_search'),
+    
     # API السلة
-    path('api/cart/add/', views.cart_add, name='cart_add'),
-    path('api/cart/update/', views.cart_update, name='cart_update'),
-    path('api/cart/remove/', views.cart_remove, name='cart_remove'),
-    path('api/cart/content/', views.cart_content, name='cart_content'),
-    path('api/cart/clear/', views.cart_clear, name='cart_clear'),
+    path('api/cart/add/', views.acart_add if ASYNC else views.cart_add, name='cart_add'),
+    path('api/cart/update/', views.acart_update if ASYNC else views.cart_update, name='cart_update'),
+    path('api/cart/remove/', views.acart_remove if ASYNC else views.cart_remove, name='cart_remove'),
+    path('api/cart/batch/', views.cart_batch, name='cart_batch'),
+    path('api/cart/content/', views.acart_content if ASYNC else views.cart_content, name='cart_content'),
+    path('api/cart/clear/', views.acart_clear if ASYNC else views.cart_clear, name='cart_clear'),
     
     # الطلبات
     path('api/order/create/', views.create_order, name='create_order'),
     path('order/whatsapp/<int:item_id>/', views.order_whatsapp, name='order_whatsapp'),
+    
+    # شاشة المطبخ
+    path('kitchen/', views.kitchen_view, name='kitchen'),
+    path('kitchen/events/', views.akitchen_events if ASYNC else views.kitchen_events, name='kitchen_events'),
+    path('kitchen/poll/', views.akitchen_poll if ASYNC else views.kitchen_poll, name='kitchen_poll'),
+    
+    # Service Worker (من الجذر حتى يشمل كل الصفحات)
+    path('sw.js', views.service_worker, name='service_worker'),
+    
+    # مقاييس Prometheus
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
@@ -1,46 +1,237 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.shortcuts import render, redirect
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.views import redirect_to_login
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import condition, require_POST
 from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.conf import settings
-from urllib.parse import quote
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.db import IntegrityError, transaction
+from asgiref.sync import sync_to_async
+from functools import wraps
+from operator import itemgetter
+from urllib.parse import quote, urlencode
+import hashlib
 import json
+import time
 
-from .models import Category, MenuItem, Cart, CartItem, Order, OrderItem
+from . import kitchen, metrics
+from .cart import CartLine, get_cart
+from .catalog import aget_catalog, get_catalog, sort_key
+from .pagination import decode_cursor, keyset_page
+from .search import search_items, search_ranked
+from .models import Order, OrderItem
 
 
-def get_or_create_cart(request):
-    """الحصول على السلة أو إنشاء واحدة جديدة"""
-    if not request.session.session_key:
-        request.session.create()
-    
-    session_key = request.session.session_key
-    cart, created = Cart.objects.get_or_create(session_key=session_key)
-    return cart
+# عدد الكروت في كل صفحة من القائمة (الأولى مع HTML والبقية من menu_items)
+MENU_PAGE_SIZE = 24
+MENU_PAGE_MAX = 60
 
+# معاملات الطلب التي تغيّر صفحة القائمة (والبقية لا تدخل في مفتاح الكاش)
+MENU_PAGE_PARAMS = ('category', 'search', 'cursor')
 
-def menu_view(request):
-    """صفحة القائمة الرئيسية"""
-    categories = Category.objects.filter(is_active=True).prefetch_related('items')
-    items = MenuItem.objects.filter(is_available=True).select_related('category')
-    
-    # تصفية حسب القسم
+# عرض صورة الكرت حسب أعمدة .menu-grid (2 ثم 3 ثم 4، بحد أقصى 1200px)
+CARD_IMAGE_SIZES = '(min-width: 1200px) 300px, (min-width: 1024px) 25vw, (min-width: 768px) 33vw, 50vw'
+
+
+def get_available_item(item_id):
+    """منتج متوفر من الكتالوج أو 404"""
+    menu_item = get_catalog().get_item(item_id)
+    if menu_item is None:
+        raise Http404('المنتج غير متوفر')
+    return menu_item
+
+
+def menu_page(request, catalog, cursor=None, limit=MENU_PAGE_SIZE):
+    """
+    صفحة من منتجات القائمة حسب فلاتر الطلب (search و category).
+    تُرجع (المنتجات، مؤشر الصفحة التالية). ValueError إذا كان المؤشر تالفاً.
+    """
+    search = request.GET.get('search', '').strip()
     category_id = request.GET.get('category')
-    if category_id:
-        items = items.filter(category_id=category_id)
+    after = decode_cursor(cursor)
     
-    # البحث
-    search = request.GET.get('search', '').strip()
+    # البحث (مرتب حسب الصلة، والمفتاح يشمل الدرجة)
     if search:
-        items = items.filter(name__icontains=search)
+        ranked = search_ranked(search, catalog)
+        if category_id:
+            ranked = [row for row in ranked if str(row[1].category_id) == category_id]
+        page, next_cursor = keyset_page(ranked, after, limit, key=itemgetter(0))
+        return [item for _, item in page], next_cursor
     
-    context = {
-        'categories': categories,
+    items = catalog.items_for_category(category_id) if category_id else catalog.items
+    return keyset_page(items, after, limit, key=sort_key)
+
+
+def menu_context(request, catalog):
+    search = request.GET.get('search', '').strip()
+    category_id = request.GET.get('category')
+    
+    # الصفحة الأولى فقط (أو بعد cursor بدون JavaScript)، والبقية من menu_items
+    try:
+        items, next_cursor = menu_page(request, catalog, request.GET.get('cursor'))
+    except ValueError:
+        items, next_cursor = menu_page(request, catalog)
+    
+    filters = {key: value for key, value in (('category', category_id), ('search', search)) if value}
+    return {
+        'categories': catalog.categories,
+        'card_image_sizes': CARD_IMAGE_SIZES,
         'items': items,
+        'next_cursor': next_cursor,
+        'filter_query': urlencode(filters),
         'selected_category': category_id,
         'search_query': search,
     }
-    return render(request, 'menu.html', context)
+
+
+# ============ التحقق الشرطي (ETag) ============
+# بدون Last-Modified: آخر updated_at لا يتغير عند حذف قسم أو منتج، فيرد
+# If-Modified-Since بـ 304 على قائمة قديمة. نسخة الكتالوج في ETag تتغير مع كل تعديل.
+
+def catalog_etag(request, catalog, *parts):
+    """ETag من نسخة الكتالوج وآخر تعديل والفلاتر، مع أجزاء إضافية حسب الرد"""
+    last_modified = catalog.last_modified.isoformat() if catalog.last_modified else ''
+    raw = ':'.join([catalog.version, last_modified, request.GET.urlencode(), *map(str, parts)])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def menu_page_etag(request, catalog):
+    # الصفحة تحمل روابط الملفات الثابتة ذات البصمة
+    return catalog_etag(request, catalog, 'html', getattr(staticfiles_storage, 'manifest_hash', ''))
+
+
+def menu_view_etag(request):
+    return menu_page_etag(request, get_catalog())
+
+
+# ============ كاش صفحة القائمة ============
+# الصفحة لا تحمل شيئاً من الجلسة: السلة تُحمَّل بـ JSON (app.js) ورمز CSRF
+# من الكوكي، فتُعرض مرة واحدة لكل قسم/بحث وتُشارك بين كل الزوار.
+# المفتاح يشمل نسخة الكتالوج، فأي تعديل في القائمة يتجاوز النسخ القديمة.
+
+def menu_page_cache_key(request, catalog):
+    params = urlencode([(name, request.GET[name]) for name in MENU_PAGE_PARAMS if request.GET.get(name)])
+    raw = ':'.join([catalog.version, getattr(staticfiles_storage, 'manifest_hash', ''), params])
+    return f'menu:page:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def render_menu_page(request, catalog):
+    return render_to_string('menu.html', menu_context(request, catalog), request)
+
+
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=menu_view_etag)
+def menu_view(request):
+    """صفحة القائمة الرئيسية (من الكاش، و 304 إذا لم يتغير الكتالوج)"""
+    catalog = get_catalog()
+    key = menu_page_cache_key(request, catalog)
+    html = cache.get(key)
+    if html is None:
+        html = render_menu_page(request, catalog)
+        cache.set(key, html, settings.MENU_PAGE_CACHE_TIMEOUT)
+    return HttpResponse(html)
+
+
+async def amenu_view(request):
+    """صفحة القائمة (async): الكتالوج يُحمّل قبل الـ render"""
+    catalog = await aget_catalog()
+    etag = quote_etag(menu_page_etag(request, catalog))
+    
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        key = menu_page_cache_key(request, catalog)
+        html = await cache.aget(key)
+        if html is None:
+            html = render_menu_page(request, catalog)
+            await cache.aset(key, html, settings.MENU_PAGE_CACHE_TIMEOUT)
+        response = HttpResponse(html)
+    response.headers.setdefault('ETag', etag)
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def menu_items_response(request, catalog):
+    try:
+        limit = min(max(int(request.GET.get('limit', MENU_PAGE_SIZE)), 1), MENU_PAGE_MAX)
+        items, next_cursor = menu_page(request, catalog, request.GET.get('cursor'), limit)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'مؤشر الصفحة غير صحيح'}, status=400)
+    html = render_to_string('partials/_menu_cards.html', {
+        'items': items,
+        'card_image_sizes': CARD_IMAGE_SIZES,
+    })
+    return JsonResponse({
+        'items': [
+            {
+                'id': item.id,
+                'name': item.name,
+                'description': item.description,
+                'category_id': item.category_id,
+                'category': item.category_name,
+                'price': str(item.price),
+                'image': item.image.thumbnail_url,
+                'is_vegetarian': item.is_vegetarian,
+                'is_spicy': item.is_spicy,
+                'is_featured': item.is_featured,
+            }
+            for item in items
+        ],
+        'html': html,
+        'next_cursor': next_cursor,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def menu_items_etag(request):
+    return catalog_etag(request, get_catalog(), 'json')
+
+
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=menu_items_etag)
+def menu_items(request):
+    """صفحة من المنتجات بمؤشر (cursor) مع فلاتر القسم والبحث، للتمرير اللانهائي"""
+    return menu_items_response(request, get_catalog())
+
+
+async def amenu_items(request):
+    catalog = await aget_catalog()
+    etag = quote_etag(catalog_etag(request, catalog, 'json'))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = menu_items_response(request, catalog)
+    response.headers.setdefault('ETag', etag)
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def menu_search(request):
+    """اقتراحات البحث الفوري (typeahead)"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    
+    results = search_items(query, limit=limit) if query else []
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'id': item.id,
+                'name': item.name,
+                'category': item.category_name,
+                'price': str(item.price),
+                'image': item.image.thumbnail_url,
+            }
+            for item in results
+        ],
+    })
 
 
 def about_view(request):
@@ -50,88 +241,147 @@ def about_view(request):
 
 # ============ API للسلة ============
 
-@require_POST
-def cart_add(request):
-    """إضافة منتج للسلة"""
+CART_BATCH_OPS = ('add', 'set', 'remove')
+CART_BATCH_MAX_OPS = 50
+
+
+def bad_request():
+    return JsonResponse({'success': False, 'error': 'بيانات غير صحيحة'}, status=400)
+
+
+def parse_cart_request(request, default_quantity=1):
+    """(item_id, quantity) من جسم الطلب، أو None إذا كانت البيانات غير صحيحة"""
     try:
         data = json.loads(request.body)
-        item_id = data.get('item_id')
-        quantity = int(data.get('quantity', 1))
-    except (json.JSONDecodeError, ValueError):
-        return JsonResponse({'success': False, 'error': 'بيانات غير صحيحة'}, status=400)
-    
-    menu_item = get_object_or_404(MenuItem, id=item_id, is_available=True)
-    cart = get_or_create_cart(request)
-    
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        menu_item=menu_item,
-        defaults={'quantity': quantity}
-    )
-    
-    if not created:
-        cart_item.quantity += quantity
-        cart_item.save()
-    
+        return int(data.get('item_id')), int(data.get('quantity', default_quantity))
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        return None
+
+
+def cart_summary(items_count, total, **extra):
     return JsonResponse({
         'success': True,
-        'message': f'تم إضافة {menu_item.name}',
-        'cart_count': cart.items_count,
-        'cart_total': float(cart.total),
+        **extra,
+        'cart_count': items_count,
+        'cart_total': float(total),
     })
 
 
+@require_POST
+def cart_add(request):
+    """إضافة منتج للسلة"""
+    params = parse_cart_request(request)
+    if params is None or params[1] < 1:
+        return bad_request()
+    
+    item_id, quantity = params
+    menu_item = get_available_item(item_id)
+    cart = get_cart(request)
+    cart.add(menu_item.id, quantity)
+    
+    return cart_summary(cart.items_count, cart.total, message=f'تم إضافة {menu_item.name}')
+
+
 @require_POST
 def cart_update(request):
     """تحديث كمية منتج في السلة"""
-    try:
-        data = json.loads(request.body)
-        item_id = data.get('item_id')
-        quantity = int(data.get('quantity', 1))
-    except (json.JSONDecodeError, ValueError):
-        return JsonResponse({'success': False, 'error': 'بيانات غير صحيحة'}, status=400)
-    
-    cart = get_or_create_cart(request)
+    params = parse_cart_request(request)
+    if params is None:
+        return bad_request()
     
-    try:
-        cart_item = CartItem.objects.get(cart=cart, menu_item_id=item_id)
-        if quantity > 0:
-            cart_item.quantity = quantity
-            cart_item.save()
-        else:
-            cart_item.delete()
-    except CartItem.DoesNotExist:
+    cart = get_cart(request)
+    if not cart.set(*params):
         return JsonResponse({'success': False, 'error': 'المنتج غير موجود في السلة'}, status=404)
     
-    return JsonResponse({
-        'success': True,
-        'cart_count': cart.items_count,
-        'cart_total': float(cart.total),
-    })
+    return cart_summary(cart.items_count, cart.total)
 
 
 @require_POST
 def cart_remove(request):
     """حذف منتج من السلة"""
+    params = parse_cart_request(request)
+    if params is None:
+        return bad_request()
+    
+    cart = get_cart(request)
+    cart.remove(params[0])
+    
+    return cart_summary(cart.items_count, cart.total)
+
+
+@require_POST
+def cart_batch(request):
+    """تنفيذ عدة عمليات على السلة دفعة واحدة (add / set / remove)"""
     try:
         data = json.loads(request.body)
-        item_id = data.get('item_id')
-    except json.JSONDecodeError:
+        operations = []
+        for operation in data.get('operations', []):
+            op = operation['op']
+            item_id = int(operation['item_id'])
+            quantity = int(operation.get('quantity', 1 if op == 'add' else 0))
+            if op not in CART_BATCH_OPS or quantity < 0 or (op == 'add' and quantity < 1):
+                raise ValueError(op)
+            operations.append((op, item_id, quantity))
+    except (json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError):
         return JsonResponse({'success': False, 'error': 'بيانات غير صحيحة'}, status=400)
     
-    cart = get_or_create_cart(request)
-    CartItem.objects.filter(cart=cart, menu_item_id=item_id).delete()
+    if not operations or len(operations) > CART_BATCH_MAX_OPS:
+        return JsonResponse({'success': False, 'error': 'بيانات غير صحيحة'}, status=400)
+    
+    # لا يمكن إضافة منتج غير متوفر
+    catalog = get_catalog()
+    for op, item_id, quantity in operations:
+        if op != 'remove' and quantity > 0 and catalog.get_item(item_id) is None:
+            return JsonResponse({'success': False, 'error': 'المنتج غير متوفر'}, status=404)
+    
+    cart = get_cart(request)
+    cart.apply(operations)
     
     return JsonResponse({
         'success': True,
         'cart_count': cart.items_count,
         'cart_total': float(cart.total),
+        'quantities': {line.item.id: line.quantity for line in cart.lines},
     })
 
 
-def cart_content(request):
-    """محتوى السلة (للـ Modal)"""
-    cart = get_or_create_cart(request)
+def cart_etag(request, cart_version, catalog_version):
+    fmt = request.GET.get('format', 'html')
+    raw = f'{fmt}:{cart_version}:{catalog_version}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def cart_content_etag(request):
+    """ETag للسلة: يتغير مع تعديل السلة أو تغيّر الأسعار في الكتالوج"""
+    with metrics.timed('cart'):
+        version = get_cart(request).version
+    return cart_etag(request, version, get_catalog().version)
+
+
+def cart_json(cart):
+    """تمثيل السلة كـ JSON (للتحديث الجزئي في الواجهة)"""
+    return {
+        'cart_count': cart.items_count,
+        'cart_total': float(cart.total),
+        'total_display': str(cart.total),
+        'lines': [
+            {
+                'id': line.item.id,
+                'name': line.item.name,
+                'image': line.item.image.thumbnail_url,
+                'price': str(line.item.price),
+                'quantity': line.quantity,
+                'subtotal': str(line.subtotal),
+            }
+            for line in cart.lines
+        ],
+    }
+
+
+def cart_content_response(request, cart):
+    if request.GET.get('format') == 'json':
+        return JsonResponse(cart_json(cart))
+    
     html = render_to_string('partials/_cart_content.html', {'cart': cart}, request)
     return JsonResponse({
         'html': html,
@@ -140,11 +390,106 @@ def cart_content(request):
     })
 
 
+@ensure_csrf_cookie
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=cart_content_etag)
+def cart_content(request):
+    """
+    محتوى السلة (للـ Modal): HTML أو JSON مع 304 إذا لم تتغير.
+    أول طلب في كل صفحة (app.js)، ومنه كوكي CSRF للصفحات المخزّنة.
+    زمن تحميل السلة في Server-Timing كـ step "cart".
+    """
+    with metrics.timed('cart'):
+        return cart_content_response(request, get_cart(request))
+
+
 @require_POST
 def cart_clear(request):
     """تفريغ السلة"""
-    cart = get_or_create_cart(request)
-    cart.items.all().delete()
+    get_cart(request).clear()
+    return JsonResponse({'success': True, 'cart_count': 0, 'cart_total': 0})
+
+
+# ============ نسخ async للسلة (ASGI) ============
+# نفس الردود، مع ORM الـ async عبر نسخ a* في مخزن السلة.
+# (مزخرفات Django 4.2 مثل require_POST و condition لا تدعم المشاهد async)
+
+def async_require_POST(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def aget_available_item(item_id):
+    menu_item = (await aget_catalog()).get_item(item_id)
+    if menu_item is None:
+        raise Http404('المنتج غير متوفر')
+    return menu_item
+
+
+@async_require_POST
+async def acart_add(request):
+    params = parse_cart_request(request)
+    if params is None or params[1] < 1:
+        return bad_request()
+    
+    item_id, quantity = params
+    menu_item = await aget_available_item(item_id)
+    cart = get_cart(request)
+    await cart.aadd(menu_item.id, quantity)
+    
+    return cart_summary(*await cart.atotals(), message=f'تم إضافة {menu_item.name}')
+
+
+@async_require_POST
+async def acart_update(request):
+    params = parse_cart_request(request)
+    if params is None:
+        return bad_request()
+    
+    cart = get_cart(request)
+    if not await cart.aset(*params):
+        return JsonResponse({'success': False, 'error': 'المنتج غير موجود في السلة'}, status=404)
+    
+    return cart_summary(*await cart.atotals())
+
+
+@async_require_POST
+async def acart_remove(request):
+    params = parse_cart_request(request)
+    if params is None:
+        return bad_request()
+    
+    cart = get_cart(request)
+    await cart.aremove(params[0])
+    
+    return cart_summary(*await cart.atotals())
+
+
+async def acart_content(request):
+    get_token(request)  # مثل ensure_csrf_cookie في cart_content
+    cart = get_cart(request)
+    catalog = await aget_catalog()
+    with metrics.timed('cart'):
+        version = await cart.aversion()
+    etag = quote_etag(cart_etag(request, version, catalog.version))
+    
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        with metrics.timed('cart'):
+            await cart.aprefetch()
+            response = cart_content_response(request, cart)
+    response.headers.setdefault('ETag', etag)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@async_require_POST
+async def acart_clear(request):
+    await get_cart(request).aclear()
     return JsonResponse({'success': True, 'cart_count': 0, 'cart_total': 0})
 
 
@@ -152,65 +497,117 @@ def cart_clear(request):
 
 def checkout_view(request):
     """صفحة إتمام الطلب"""
-    cart = get_or_create_cart(request)
-    if cart.items_count == 0:
+    cart = get_cart(request)
+    if not cart.exists() or cart.items_count == 0:
         return redirect('menu')
     return render(request, 'checkout.html', {'cart': cart})
 
 
+def order_idempotency_key(request, data):
+    """مفتاح عدم التكرار من العميل، مربوط بالجلسة حتى لا يُستعمل من جلسة أخرى (بدون جلسة لا مفتاح)"""
+    key = request.headers.get('Idempotency-Key') or data.get('idempotency_key') or ''
+    key = str(key).strip()
+    session_key = request.session.session_key
+    if not key or not session_key:
+        return None
+    scope = f"{session_key}:{key}"
+    return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def order_response(order, items=None):
+    """رد إنشاء الطلب (نفسه عند إعادة المحاولة بنفس المفتاح)"""
+    whatsapp_message = generate_whatsapp_message(order, items)
+    whatsapp_url = f"https://wa.me/{settings.RESTAURANT_WHATSAPP.replace('+', '')}?text={quote(whatsapp_message)}"
+    
+    return JsonResponse({
+        'success': True,
+        'order_number': order.order_number,
+        'whatsapp_url': whatsapp_url,
+    })
+
+
 @require_POST
 def create_order(request):
     """إنشاء طلب جديد"""
-    cart = get_or_create_cart(request)
-    
-    if cart.items_count == 0:
-        return JsonResponse({'success': False, 'error': 'السلة فارغة'}, status=400)
-    
     try:
         data = json.loads(request.body)
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'error': 'بيانات غير صحيحة'}, status=400)
     
-    # إنشاء الطلب
-    order = Order.objects.create(
-        customer_name=data.get('name', ''),
-        customer_phone=data.get('phone', ''),
-        delivery_type=data.get('delivery_type', 'pickup'),
-        address=data.get('address', ''),
-        notes=data.get('notes', ''),
-        total=cart.total,
-    )
+    # إعادة المحاولة بنفس المفتاح تُرجع الطلب الأصلي
+    idempotency_key = order_idempotency_key(request, data)
+    if idempotency_key:
+        existing = Order.objects.filter(idempotency_key=idempotency_key).first()
+        if existing:
+            return order_response(existing)
     
-    # نقل عناصر السلة للطلب
-    for cart_item in cart.items.all():
-        OrderItem.objects.create(
-            order=order,
-            menu_item=cart_item.menu_item,
-            name=cart_item.menu_item.name,
-            price=cart_item.menu_item.price,
-            quantity=cart_item.quantity,
-            notes=cart_item.notes,
-        )
-    
-    # تفريغ السلة
-    cart.items.all().delete()
-    
-    # إنشاء رسالة واتساب
-    whatsapp_message = generate_whatsapp_message(order)
-    whatsapp_url = f"https://wa.me/{settings.RESTAURANT_WHATSAPP.replace('+', '')}?text={quote(whatsapp_message)}"
+    cart = get_cart(request)
+    catalog = get_catalog()
     
-    return JsonResponse({
-        'success': True,
-        'order_number': order.order_number,
-        'whatsapp_url': whatsapp_url,
-    })
+    try:
+        with transaction.atomic():
+            cart.lock()
+            
+            # طلب متزامن بنفس المفتاح انتظر القفل: السلة فُرّغت والطلب موجود
+            if idempotency_key:
+                existing = Order.objects.filter(idempotency_key=idempotency_key).first()
+                if existing:
+                    return order_response(existing)
+            
+            # الأسعار والأسماء من لقطة واحدة للكتالوج
+            lines = []
+            for item_id, (quantity, notes) in cart.get_rows().items():
+                menu_item = catalog.get_item(item_id)
+                if menu_item is None:
+                    return JsonResponse({'success': False, 'error': 'بعض المنتجات لم تعد متوفرة'}, status=400)
+                lines.append(CartLine(menu_item, quantity, notes))
+            
+            if not lines:
+                return JsonResponse({'success': False, 'error': 'السلة فارغة'}, status=400)
+            
+            # إنشاء الطلب
+            order = Order.objects.create(
+                customer_name=data.get('name', ''),
+                customer_phone=data.get('phone', ''),
+                delivery_type=data.get('delivery_type', 'pickup'),
+                address=data.get('address', ''),
+                notes=data.get('notes', ''),
+                total=sum(line.subtotal for line in lines),
+                idempotency_key=idempotency_key,
+            )
+            
+            # نقل عناصر السلة للطلب
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    menu_item_id=line.item.id,
+                    name=line.item.name,
+                    price=line.item.price,
+                    quantity=line.quantity,
+                    notes=line.notes,
+                )
+                for line in lines
+            ])
+            
+            # تفريغ السلة
+            cart.clear()
+    except IntegrityError:
+        # طلب متزامن بنفس المفتاح سبقنا
+        existing = idempotency_key and Order.objects.filter(idempotency_key=idempotency_key).first()
+        if not existing:
+            raise
+        return order_response(existing)
+    
+    return order_response(order, order_items)
 
 
-def generate_whatsapp_message(order):
+def generate_whatsapp_message(order, items=None):
     """إنشاء رسالة واتساب للطلب"""
+    if items is None:
+        items = order.items.all()
     items_text = "\n".join([
         f"• {item.quantity}x {item.name} - {item.subtotal} درهم"
-        for item in order.items.all()
+        for item in items
     ])
     
     delivery_text = "استلام من المطعم" if order.delivery_type == 'pickup' else f"توصيل إلى: {order.address}"
@@ -235,7 +632,157 @@ def generate_whatsapp_message(order):
 
 def order_whatsapp(request, item_id):
     """طلب منتج مباشرة عبر واتساب"""
-    item = get_object_or_404(MenuItem, id=item_id, is_available=True)
+    item = get_available_item(item_id)
     message = f"مرحباً، أريد طلب:\n\n• {item.name} - {item.price} درهم"
     whatsapp_url = f"https://wa.me/{settings.RESTAURANT_WHATSAPP.replace('+', '')}?text={quote(message)}"
     return redirect(whatsapp_url)
+
+
+# ============ شاشة المطبخ ============
+
+# مدة اتصال SSE قبل أن يعيد المتصفح الاتصال (بـ Last-Event-ID)
+KITCHEN_STREAM_DURATION = 300
+KITCHEN_KEEPALIVE = 15
+KITCHEN_POLL_TIMEOUT = 25
+
+
+@staff_member_required
+def kitchen_view(request):
+    """شاشة المطبخ: الطلبات الجارية ثم التحديثات الحية"""
+    # مؤشر آخر طلب قبل قراءة الطلبات: ما يتغير بينهما يصل مرة ثانية فقط
+    last_event_id = kitchen.last_id()
+    context = {
+        'orders': kitchen.active_orders(),
+        'last_event_id': last_event_id,
+    }
+    return render(request, 'kitchen.html', context)
+
+
+def kitchen_last_event_id(request):
+    """معرّف آخر حدث عند العميل، أو مؤشر الآن لاتصال بدونه"""
+    return request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or kitchen.last_id()
+
+
+@staff_member_required
+def kitchen_events(request):
+    """بث الطلبات عبر Server-Sent Events"""
+    last_event_id = kitchen_last_event_id(request)
+
+    def stream(last_event_id):
+        yield 'retry: 3000\n\n'
+        deadline = time.monotonic() + KITCHEN_STREAM_DURATION
+        while time.monotonic() < deadline:
+            events = kitchen.wait(last_event_id, KITCHEN_KEEPALIVE)
+            yield sse_messages(events)
+            if events is None:
+                return
+            if events:
+                last_event_id = events[-1][0]
+
+    return sse_response(stream(last_event_id))
+
+
+def sse_messages(events):
+    """الأحداث بصيغة text/event-stream (None = reset، [] = keepalive)"""
+    if events is None:
+        return 'event: reset\ndata: {}\n\n'
+    if not events:
+        return ': keepalive\n\n'
+    return ''.join(
+        f'id: {event_id}\nevent: {event}\ndata: {kitchen.encode(data)}\n\n'
+        for event_id, event, data in events
+    )
+
+
+def sse_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+def kitchen_poll(request):
+    """بديل long-poll لـ SSE: ينتظر حتى تصل أحداث أو تنتهي المهلة"""
+    last_event_id = kitchen_last_event_id(request)
+    events = kitchen.wait(last_event_id, KITCHEN_POLL_TIMEOUT)
+    return kitchen_poll_response(last_event_id, events)
+
+
+def kitchen_poll_response(last_event_id, events):
+    if events is None:
+        return JsonResponse({'reset': True, 'last_event_id': '', 'events': []})
+    return JsonResponse({
+        'reset': False,
+        'last_event_id': events[-1][0] if events else last_event_id,
+        'events': [
+            {'id': event_id, 'event': event, 'data': data}
+            for event_id, event, data in events
+        ],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+async def astaff_required(request):
+    """مثل staff_member_required للمشاهد async: None أو تحويل لصفحة الدخول"""
+    is_staff = await sync_to_async(lambda: request.user.is_active and request.user.is_staff)()
+    if not is_staff:
+        return redirect_to_login(request.get_full_path(), reverse('admin:login'))
+    return None
+
+
+async def akitchen_events(request):
+    """بث SSE بدون حجز خيط أثناء الانتظار (ASGI)"""
+    denied = await astaff_required(request)
+    if denied:
+        return denied
+    last_event_id = await sync_to_async(kitchen_last_event_id)(request)
+
+    async def stream(last_event_id):
+        yield 'retry: 3000\n\n'
+        deadline = time.monotonic() + KITCHEN_STREAM_DURATION
+        while time.monotonic() < deadline:
+            events = await kitchen.await_events(last_event_id, KITCHEN_KEEPALIVE)
+            yield sse_messages(events)
+            if events is None:
+                return
+            if events:
+                last_event_id = events[-1][0]
+
+    return sse_response(stream(last_event_id))
+
+
+async def akitchen_poll(request):
+    denied = await astaff_required(request)
+    if denied:
+        return denied
+    last_event_id = await sync_to_async(kitchen_last_event_id)(request)
+    events = await kitchen.await_events(last_event_id, KITCHEN_POLL_TIMEOUT)
+    return kitchen_poll_response(last_event_id, events)
+
+
+# ============ Service Worker ============
+
+@cache_control(no_cache=True)
+def service_worker(request):
+    """sw.js: نسخته بصمة الملفات الثابتة، فيتجدد كاشه مع كل collectstatic"""
+    response = render(request, 'sw.js', {
+        'version': getattr(staticfiles_storage, 'manifest_hash', '') or 'dev',
+        'precache': json.dumps([staticfiles_storage.url(name) for name in settings.SERVICE_WORKER_PRECACHE]),
+        'static_url': settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}',
+        'media_url': settings.MEDIA_URL if settings.MEDIA_URL.startswith('/') else f'/{settings.MEDIA_URL}',
+        'menu_url': reverse('menu'),
+        'menu_api_url': reverse('menu_items'),
+    }, content_type='application/javascript; charset=utf-8')
+    response['Service-Worker-Allowed'] = '/'
+    return response
+
+
+# ============ المقاييس ============
+
+def metrics_view(request):
+    """مقاييس الأداء بصيغة Prometheus (للموظفين أو بـ METRICS_TOKEN)"""
+    if not (metrics.has_token(request) or (request.user.is_active and request.user.is_staff)):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    response = HttpResponse(metrics.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -7,12 +7,20 @@
 const $ = (selector) => document.querySelector(selector);
 const $$ = (selector) => document.querySelectorAll(selector);
 
+// رمز CSRF من الكوكي (الصفحات مخزّنة ومشتركة فلا تحمله)
+function csrfToken() {
+    const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]*)/);
+    return match ? decodeURIComponent(match[1]) : '';
+}
+
 // API Helper
 async function api(url, options = {}) {
+    // الكوكي يُضبط مع أول طلب للسلة (Cart.hydrate)
+    await Cart.hydrated;
     const defaultOptions = {
         headers: {
             'Content-Type': 'application/json',
-            'X-CSRFToken': CSRF_TOKEN,
+            'X-CSRFToken': csrfToken(),
         },
     };
     
@@ -35,6 +43,11 @@ function showToast(message, duration = 2500) {
 
 // ============ Cart Functions ============
 const Cart = {
+    // عمليات معلّقة تُجمع وتُرسل دفعة واحدة: itemId -> {op, quantity}
+    pending: new Map(),
+    flushTimer: null,
+    flushDelay: 300,
+    
     // تحديث عداد السلة
     updateCount(count) {
         const cartCount = $('#cart-count');
@@ -44,76 +57,138 @@ const Cart = {
         }
     },
     
-    // إضافة للسلة
-    async add(itemId, quantity = 1) {
-        try {
-            const result = await api('/api/cart/add/', {
-                method: 'POST',
-                body: JSON.stringify({ item_id: itemId, quantity }),
-            });
-            
-            if (result.success) {
-                this.updateCount(result.cart_count);
-                showToast(result.message);
-                this.showQuantityControls(itemId, quantity);
+    // إضافة عملية للطابور مع دمجها مع ما سبقها لنفس المنتج
+    queue(itemId, op, quantity = 0) {
+        const key = String(itemId);
+        const previous = this.pending.get(key);
+        
+        if (op === 'add' && previous) {
+            if (previous.op === 'add') {
+                quantity += previous.quantity;
+            } else {
+                op = 'set';
+                quantity += previous.op === 'set' ? previous.quantity : 0;
             }
-            
-            return result;
-        } catch (error) {
-            console.error('Error adding to cart:', error);
-            showToast('حدث خطأ');
         }
+        
+        this.pending.set(key, { op, quantity });
+        clearTimeout(this.flushTimer);
+        this.flushTimer = setTimeout(() => this.flush(), this.flushDelay);
     },
     
-    // تحديث الكمية
-    async update(itemId, quantity) {
+    // إرسال كل العمليات المعلّقة في طلب واحد
+    async flush(options = {}) {
+        clearTimeout(this.flushTimer);
+        if (!this.pending.size) return;
+        
+        const operations = [...this.pending].map(([itemId, { op, quantity }]) => ({
+            op,
+            item_id: itemId,
+            quantity,
+        }));
+        this.pending.clear();
+        
         try {
-            const result = await api('/api/cart/update/', {
+            const result = await api('/api/cart/batch/', {
                 method: 'POST',
-                body: JSON.stringify({ item_id: itemId, quantity }),
+                body: JSON.stringify({ operations }),
+                ...options,
             });
             
             if (result.success) {
                 this.updateCount(result.cart_count);
-                
-                if (quantity <= 0) {
-                    this.hideQuantityControls(itemId);
-                } else {
-                    this.updateQuantityDisplay(itemId, quantity);
-                }
-                
-                // تحديث محتوى السلة في المودال
-                this.refreshModalContent();
+                this.syncQuantities(result.quantities);
+                if (Modal.isOpen()) this.refreshModalContent();
+            } else {
+                showToast(result.error || 'حدث خطأ');
             }
             
             return result;
         } catch (error) {
             console.error('Error updating cart:', error);
+            showToast('حدث خطأ');
         }
     },
     
-    // حذف من السلة
-    async remove(itemId) {
+    // آخر كميات معروفة من السيرفر (للكروت المحمّلة لاحقاً)
+    quantities: {},
+    
+    // تحميل السلة بعد الصفحة (العداد وأزرار الكمية في الكروت)
+    hydrated: Promise.resolve(),
+    
+    async hydrate() {
         try {
-            const result = await api('/api/cart/remove/', {
-                method: 'POST',
-                body: JSON.stringify({ item_id: itemId }),
-            });
-            
-            if (result.success) {
-                this.updateCount(result.cart_count);
+            const response = await fetch('/api/cart/content/?format=json', { cache: 'no-store' });
+            const data = await response.json();
+            if (!this.pending.size) this.updateCount(data.cart_count);
+            this.syncQuantities(Object.fromEntries(data.lines.map(line => [line.id, line.quantity])));
+        } catch (error) {
+            console.error('Error loading cart:', error);
+        }
+    },
+    
+    // مطابقة أزرار الكمية في الكروت مع حالة السلة على السيرفر
+    syncQuantities(quantities) {
+        this.quantities = quantities;
+        for (const [itemId, quantity] of Object.entries(quantities)) {
+            if (!this.pending.has(itemId)) this.showQuantityControls(itemId, quantity);
+        }
+        $$('.card__quantity:not(.hidden)').forEach(el => {
+            const itemId = el.id.replace('qty-', '');
+            if (!(itemId in quantities) && !this.pending.has(itemId)) {
                 this.hideQuantityControls(itemId);
-                this.refreshModalContent();
             }
-            
-            return result;
-        } catch (error) {
-            console.error('Error removing from cart:', error);
+        });
+    },
+    
+    // الكمية المعروضة حالياً (في الكرت أو في المودال)
+    displayedQuantity(itemId) {
+        const qtyEl = $(`#qty-value-${itemId}`) || $(`#cart-content .cart-item[data-id="${itemId}"] .qty-value`);
+        return parseInt(qtyEl?.textContent) || 0;
+    },
+    
+    // إضافة للسلة
+    add(itemId, quantity = 1) {
+        const current = this.displayedQuantity(itemId);
+        const name = $(`.card[data-id="${itemId}"] .card__title`)?.textContent;
+        
+        this.queue(itemId, 'add', quantity);
+        this.updateCount((parseInt($('#cart-count')?.textContent) || 0) + quantity);
+        this.showQuantityControls(itemId, current + quantity);
+        showToast(name ? `تم إضافة ${name}` : 'تمت الإضافة');
+    },
+    
+    // تحديث الكمية
+    update(itemId, quantity) {
+        const current = this.displayedQuantity(itemId);
+        
+        this.queue(itemId, 'set', Math.max(quantity, 0));
+        this.updateCount(Math.max((parseInt($('#cart-count')?.textContent) || 0) + quantity - current, 0));
+        
+        if (quantity <= 0) {
+            this.hideQuantityControls(itemId);
+        } else {
+            this.updateQuantityDisplay(itemId, quantity);
         }
+        
+        // تحديث الكمية في المودال مباشرة
+        const modalQty = $(`#cart-content .cart-item[data-id="${itemId}"] .qty-value`);
+        if (modalQty) modalQty.textContent = quantity;
+        if (quantity <= 0) $(`#cart-content .cart-item[data-id="${itemId}"]`)?.remove();
+    },
+    
+    // حذف من السلة
+    remove(itemId) {
+        this.queue(itemId, 'remove');
+        this.hideQuantityControls(itemId);
+        $(`#cart-content .cart-item[data-id="${itemId}"]`)?.remove();
     },
     
     // تفريغ السلة
     async clear() {
+        clearTimeout(this.flushTimer);
+        this.pending.clear();
+        
         try {
             const result = await api('/api/cart/clear/', {
                 method: 'POST',
@@ -121,6 +196,7 @@ const Cart = {
             
             if (result.success) {
                 this.updateCount(0);
+                this.quantities = {};
                 this.refreshModalContent();
                 // إخفاء كل أزرار الكمية
                 $$('.card__quantity').forEach(el => el.classList.add('hidden'));
@@ -133,20 +209,79 @@ const Cart = {
         }
     },
     
-    // تحديث محتوى المودال
+    // آخر نسخة معروفة من السلة (ETag)
+    contentEtag: null,
+    
+    // تحديث محتوى المودال: JSON مشروط، ولا يُعاد بناء إلا ما تغيّر
     async refreshModalContent() {
         try {
-            const result = await api('/api/cart/content/');
+            const headers = this.contentEtag ? { 'If-None-Match': this.contentEtag } : {};
+            const response = await fetch('/api/cart/content/?format=json', { headers, cache: 'no-store' });
+            if (response.status === 304) return;
+            
+            const data = await response.json();
+            this.contentEtag = response.headers.get('ETag');
+            this.updateCount(data.cart_count);
+            
             const cartContent = $('#cart-content');
-            if (cartContent && result.html) {
-                cartContent.innerHTML = result.html;
-                this.bindModalEvents();
+            const itemsEl = cartContent?.querySelector('.cart-items');
+            
+            // تغيّر الهيكل (فارغة <-> غير فارغة): نطلب HTML كاملاً
+            if (!itemsEl || !data.lines.length) {
+                const result = await api('/api/cart/content/');
+                if (cartContent && result.html) {
+                    cartContent.innerHTML = result.html;
+                    this.bindModalEvents();
+                }
+                return;
             }
+            
+            this.patchModalLines(itemsEl, data);
         } catch (error) {
             console.error('Error refreshing cart:', error);
         }
     },
     
+    // مطابقة أسطر المودال مع السيرفر: الترتيب، والاسم والصورة والسعر والكمية لكل سطر
+    // (نسخة الكتالوج في ETag: تغيّر السعر يصل هنا حتى للأسطر الموجودة)
+    patchModalLines(itemsEl, data) {
+        const rows = new Map([...itemsEl.querySelectorAll('.cart-item')].map(row => [row.dataset.id, row]));
+        const template = $('#cart-item-template');
+        const setText = (el, text) => {
+            if (el && el.textContent !== text) el.textContent = text;
+        };
+        
+        data.lines.forEach(line => {
+            const id = String(line.id);
+            let row = rows.get(id);
+            rows.delete(id);
+            
+            if (!row) {
+                if (!template) return;
+                row = template.content.firstElementChild.cloneNode(true);
+                row.dataset.id = id;
+                row.querySelectorAll('[data-id]').forEach(el => { el.dataset.id = id; });
+            }
+            
+            const img = row.querySelector('.cart-item__image');
+            if (img && img.getAttribute('src') !== line.image) img.src = line.image;
+            if (img) img.alt = line.name;
+            setText(row.querySelector('.cart-item__name'), line.name);
+            setText(row.querySelector('.cart-item__price'), `${line.price} درهم`);
+            setText(row.querySelector('.qty-value'), String(line.quantity));
+            
+            // appendChild ينقل السطر الموجود: نفس ترتيب السيرفر
+            itemsEl.appendChild(row);
+        });
+        
+        // أسطر لم تعد في السلة
+        rows.forEach(row => row.remove());
+        
+        const totalEl = $('#modal-total');
+        if (totalEl) totalEl.textContent = `${data.total_display} درهم`;
+        this.bindModalEvents();
+    },
+    
     // إظهار أزرار الكمية
     showQuantityControls(itemId, quantity) {
         const card = $(`.card[data-id="${itemId}"]`);
@@ -168,9 +303,11 @@ const Cart = {
         
         const actions = card.querySelector('.card__actions');
         const qtyControls = card.querySelector('.card__quantity');
+        const qtyValue = card.querySelector('.qty-value');
         
         if (actions) actions.classList.remove('hidden');
         if (qtyControls) qtyControls.classList.add('hidden');
+        if (qtyValue) qtyValue.textContent = 0;
     },
     
     // تحديث عرض الكمية
@@ -206,11 +343,14 @@ const Cart = {
         });
         
         // زر تفريغ السلة
-        $('#clear-cart')?.addEventListener('click', () => {
-            if (confirm('هل تريد تفريغ السلة؟')) {
-                this.clear();
-            }
-        });
+        const clearBtn = $('#clear-cart');
+        if (clearBtn) {
+            clearBtn.onclick = () => {
+                if (confirm('هل تريد تفريغ السلة؟')) {
+                    this.clear();
+                }
+            };
+        }
     }
 };
 
@@ -252,6 +392,54 @@ const Modal = {
     }
 };
 
+// ============ Infinite Menu ============
+const InfiniteMenu = {
+    sentinel: null,
+    loading: false,
+    
+    init() {
+        this.sentinel = $('#menu-more');
+        if (!this.sentinel || !('IntersectionObserver' in window)) return;
+        
+        // التحميل يبدأ قبل الوصول لآخر كرت بمسافة شاشة تقريباً
+        this.sentinel.classList.add('menu-more--auto');
+        this.observer = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting)) this.load();
+        }, { rootMargin: '800px 0px' });
+        this.observer.observe(this.sentinel);
+    },
+    
+    async load() {
+        const cursor = this.sentinel?.dataset.cursor;
+        if (this.loading || !cursor) return;
+        this.loading = true;
+        
+        try {
+            const response = await fetch(`${this.sentinel.dataset.url}&cursor=${encodeURIComponent(cursor)}`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const data = await response.json();
+            
+            $('.menu-grid')?.insertAdjacentHTML('beforeend', data.html);
+            Cart.syncQuantities(Cart.quantities);
+            
+            if (data.next_cursor) {
+                this.sentinel.dataset.cursor = data.next_cursor;
+            } else {
+                this.observer.disconnect();
+                this.sentinel.remove();
+                this.sentinel = null;
+            }
+        } catch (error) {
+            // يبقى رابط "عرض المزيد" ظاهراً كبديل
+            console.error('Error loading menu:', error);
+            this.sentinel?.classList.remove('menu-more--auto');
+            this.observer.disconnect();
+        } finally {
+            this.loading = false;
+        }
+    }
+};
+
 // ============ Scroll Functions ============
 const ScrollManager = {
     init() {
@@ -274,45 +462,30 @@ const ScrollManager = {
 // ============ Initialize ============
 document.addEventListener('DOMContentLoaded', () => {
     // تهيئة المكونات
+    Cart.hydrated = Cart.hydrate();
     Modal.init();
     ScrollManager.init();
     Cart.bindModalEvents();
     
-    // أزرار إضافة للسلة
-    $$('.card__btn--cart').forEach(btn => {
-        btn.addEventListener('click', () => {
-            const itemId = btn.dataset.id;
+    // أزرار الكروت (بتفويض الأحداث: تشمل الكروت المحمّلة لاحقاً)
+    document.addEventListener('click', (e) => {
+        const btn = e.target.closest('.card__btn--cart, .card .qty-btn--plus, .card .qty-btn--minus');
+        if (!btn) return;
+        
+        const itemId = btn.dataset.id;
+        if (btn.classList.contains('card__btn--cart')) {
             Cart.add(itemId);
-        });
+            return;
+        }
+        const current = parseInt($(`#qty-value-${itemId}`).textContent) || 0;
+        const delta = btn.classList.contains('qty-btn--plus') ? 1 : -1;
+        Cart.update(itemId, Math.max(current + delta, 0));
     });
     
-    // أزرار + في الكروت
-    $$('.card .qty-btn--plus').forEach(btn => {
-        btn.addEventListener('click', () => {
-            const itemId = btn.dataset.id;
-            const qtyEl = $(`#qty-value-${itemId}`);
-            const newQty = parseInt(qtyEl.textContent) + 1;
-            Cart.update(itemId, newQty);
-            qtyEl.textContent = newQty;
-        });
-    });
+    InfiniteMenu.init();
     
-    // أزرار - في الكروت
-    $$('.card .qty-btn--minus').forEach(btn => {
-        btn.addEventListener('click', () => {
-            const itemId = btn.dataset.id;
-            const qtyEl = $(`#qty-value-${itemId}`);
-            const currentQty = parseInt(qtyEl.textContent);
-            const newQty = currentQty - 1;
-            
-            if (newQty <= 0) {
-                Cart.update(itemId, 0);
-            } else {
-                Cart.update(itemId, newQty);
-                qtyEl.textContent = newQty;
-            }
-        });
-    });
+    // إرسال العمليات المعلّقة قبل مغادرة الصفحة
+    window.addEventListener('pagehide', () => Cart.flush({ keepalive: true }));
 
     // تأثير الظل على شريط الأقسام
     const categoriesNav = $('.categories');
@@ -0,0 +1,91 @@
+/**
+ * So Bnin - Service Worker
+ * مولَّد من menu.views.service_worker (نسخة {{ version }})
+ *
+ * - الملفات الثابتة ذات البصمة: تُحمَّل عند التثبيت وتُقرأ من الكاش دائماً
+ * - القائمة و /api/menu/ وصور المنتجات: من الكاش فوراً مع تحديث في الخلفية
+ *   (الصفحة لا تحمل شيئاً من الجلسة، والسلة تُحمَّل من app.js)
+ * - كل ما عدا ذلك (السلة، الطلب، المطبخ، لوحة التحكم) من الشبكة مباشرة
+ */
+const VERSION = '{{ version }}';
+const STATIC_CACHE = `static-${VERSION}`;
+const PAGES_CACHE = 'pages-v2';
+const MEDIA_CACHE = 'media-v1';
+
+const PRECACHE = {{ precache|safe }};
+const STATIC_URL = '{{ static_url }}';
+const MEDIA_URL = '{{ media_url }}';
+const MENU_URL = '{{ menu_url }}';
+const MENU_API_URL = '{{ menu_api_url }}';
+
+const PAGES_LIMIT = 30;
+const MEDIA_LIMIT = 300;
+const HASHED_RE = /\.[0-9a-f]{12}\.\w+$/;
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE)
+            .then(cache => cache.addAll(PRECACHE))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    // حذف كاش النسخ السابقة
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => ![STATIC_CACHE, PAGES_CACHE, MEDIA_CACHE].includes(key))
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// إبقاء آخر limit عنصر فقط
+async function trim(cache, limit) {
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(keys.length - limit, 0)).map(key => cache.delete(key)));
+}
+
+async function cacheFirst(request) {
+    const cache = await caches.open(STATIC_CACHE);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+
+    const response = await fetch(request);
+    if (response.ok) cache.put(request, response.clone());
+    return response;
+}
+
+async function staleWhileRevalidate(event, cacheName, limit) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request);
+    const network = fetch(event.request).then(async (response) => {
+        if (response.ok) {
+            await cache.put(event.request, response.clone());
+            await trim(cache, limit);
+        }
+        return response;
+    });
+
+    if (!cached) return network;
+    event.waitUntil(network.catch(() => null));
+    return cached;
+}
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (url.pathname.startsWith(STATIC_URL) && HASHED_RE.test(url.pathname)) {
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname.startsWith(MEDIA_URL) && request.destination === 'image') {
+        event.respondWith(staleWhileRevalidate(event, MEDIA_CACHE, MEDIA_LIMIT));
+    } else if ((request.mode === 'navigate' && url.pathname === MENU_URL) || url.pathname === MENU_API_URL) {
+        event.respondWith(staleWhileRevalidate(event, PAGES_CACHE, PAGES_LIMIT));
+    }
+});